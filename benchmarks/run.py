@@ -0,0 +1,547 @@
+#!/usr/bin/env python
+"""Benchmarks of the waterfurnace hot paths, saved as JSON to compare releases.
+
+    uv run python benchmarks/run.py -o before.json
+    uv run python benchmarks/run.py -o after.json --compare before.json
+
+Every benchmark is timed in ``--rounds`` rounds of as many calls as
+take about 0.2 seconds, and reports the per-call min, median and mean
+in seconds. With ``--compare``, each median is checked against the
+same benchmark in an earlier result and the run fails if any is more
+than ``--threshold`` percent slower.
+
+Benchmarks of a whole round trip run against a local SymphonySimulator
+with a fixed latency, and are skipped without aiohttp. Those named
+``[...]`` alike, e.g. ``poll.sequential[20x20ms]`` and
+``poll.account[20x20ms]``, are the same work done two ways.
+"""
+
+import copy
+import inspect
+import io
+import json
+import logging
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from collections import deque
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import click
+
+import waterfurnace
+from waterfurnace import cli
+from waterfurnace.codec import CODECS, DEFAULT_CODEC, orjson
+from waterfurnace.energy_cache import EnergyCache
+from waterfurnace.fleet import FleetWriter
+from waterfurnace.history import ReadingHistory
+from waterfurnace.instrumentation import MetricsRegistry
+from waterfurnace.poller import AccountPoller
+from waterfurnace.waterfurnace import (
+    DATA_REQUEST,
+    READ_RLIST,
+    SENSOR_PROFILES,
+    WF_BASE_URL,
+    WF_LOGIN_URL,
+    WF_WS_URL,
+    SymphonyGeothermal,
+    WFEnergyData,
+    WFEnergyReading,
+    WFReading,
+    WSMultiplexer,
+    energy_events,
+)
+
+try:
+    from waterfurnace.simulator import SymphonySimulator, run_benchmark
+except ImportError:
+    SymphonySimulator = run_benchmark = None
+
+PAYLOADS = Path(__file__).parent / "payloads"
+
+ENERGY_COLUMNS = (
+    "total_heat_1",
+    "total_heat_2",
+    "total_cool_1",
+    "total_cool_2",
+    "total_electric_heat",
+    "total_fan_only",
+    "total_loop_pump",
+    "total_dehumidification",
+    "runtime_heat_1",
+    "runtime_heat_2",
+    "runtime_cool_1",
+    "runtime_cool_2",
+    "runtime_electric_heat",
+    "runtime_fan_only",
+    "runtime_dehumidification",
+    "total_records",
+    "cool_runtime",
+    "heat_runtime",
+    "total_power",
+)
+
+ENERGY_SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+
+# name -> setup returning the callable to time, or a generator yielding
+# it that cleans up once it's timed
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+def simulated(name):
+    """Register a benchmark needing a SymphonySimulator, if it can run."""
+    if SymphonySimulator is None:
+        return lambda setup: setup
+    return benchmark(name)
+
+
+def read_reply():
+    return (PAYLOADS / "read_reply.json").read_text()
+
+
+def energy_response(rows):
+    """An hourly energy response with ``rows`` rows, newest first."""
+    rng = random.Random(rows)
+    start = 1767578400000
+    data = []
+    for _ in range(rows):
+        row = [round(rng.uniform(0, 2), 2) for _ in ENERGY_COLUMNS]
+        row[ENERGY_COLUMNS.index("total_records")] = 168
+        data.append(row)
+    return {
+        "columns": list(ENERGY_COLUMNS),
+        "index": [start - n * 3600000 for n in range(rows)],
+        "data": data,
+    }
+
+
+def _client():
+    client = SymphonyGeothermal(
+        WF_BASE_URL, WF_LOGIN_URL, WF_WS_URL, "bench@example.com", "password"
+    )
+    client.gwid = "ABC123456"
+    return client
+
+
+class EchoWebsocket:
+    """Answers every read request at once with a canned reply."""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.tids = []
+        self.closed = False
+
+    def send(self, message):
+        with self.cond:
+            self.tids.append(json.loads(message)["tid"])
+            self.cond.notify_all()
+
+    def recv(self):
+        with self.cond:
+            self.cond.wait_for(lambda: self.tids or self.closed)
+            if self.closed:
+                raise ConnectionError("closed")
+            tid = self.tids.pop(0)
+        return json.dumps({"err": "", "tid": tid, "totalunitpower": tid})
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    abort = close
+
+
+@benchmark("reading.construct")
+def reading_construct():
+    data = json.loads(read_reply())
+    return lambda: WFReading(data)
+
+
+for _codec in CODECS:
+    if _codec == "orjson" and orjson is None:
+        continue
+
+    @benchmark(f"reading.decode[{_codec}]")
+    def reading_decode(codec=_codec):
+        loads = CODECS[codec]().loads
+        payload = read_reply()
+        return lambda: loads(payload)
+
+    @benchmark(f"request.encode[{_codec}]")
+    def request_encode(codec=_codec):
+        dumps = CODECS[codec]().dumps
+        req = dict(DATA_REQUEST, tid=20, awlid="ABC123456")
+        return lambda: dumps(req)
+
+    @benchmark(f"energy.decode[{_codec}-10k]")
+    def energy_decode(codec=_codec):
+        loads = CODECS[codec]().loads
+        body = json.dumps(energy_response(10_000)).encode()
+        return lambda: loads(body)
+
+
+HISTORY_READINGS = 1440
+HISTORY_WINDOW = 3600
+
+
+def _history_list(data):
+    kept = deque()
+    for n, raw in enumerate(data):
+        now = n * 15
+        kept.append((now, WFReading(raw)))
+        recent = [r.totalunitpower for t, r in kept if t >= now - HISTORY_WINDOW]
+        stats = statistics.fmean(recent), min(recent), max(recent)
+    return stats
+
+
+def _history_ring(data):
+    history = ReadingHistory(len(data))
+    rolling = history.window("totalunitpower", HISTORY_WINDOW)
+    for n, raw in enumerate(data):
+        history.append(WFReading(raw), timestamp=n * 15)
+        stats = rolling.mean, rolling.min, rolling.max
+    return stats
+
+
+for _store, _fill in (("list", _history_list), ("ring", _history_ring)):
+
+    @benchmark(f"history.rolling[{_store}-{HISTORY_READINGS}]")
+    def history_rolling(fill=_fill):
+        """6 hours of 15s readings, an hourly mean, min and max after each."""
+        reply = json.loads(read_reply())
+        data = [
+            dict(reply, totalunitpower=1500 + n % 300) for n in range(HISTORY_READINGS)
+        ]
+        return lambda: fill(data)
+
+
+@benchmark("request.read[all]")
+def request_read_all():
+    client = _client()
+    return lambda: client._read_request(20, rlist=READ_RLIST)
+
+
+@benchmark("request.read[deepcopy]")
+def request_read_deepcopy():
+    """A read request built as before the cached template, to compare with."""
+    client = _client()
+
+    def build():
+        req = copy.deepcopy(DATA_REQUEST)
+        req["tid"] = 20
+        req["awlid"] = client.gwid
+        return json.dumps(req)
+
+    return build
+
+
+@benchmark("request.read[power]")
+def request_read_power():
+    client = _client()
+    rlist = SENSOR_PROFILES["power"]
+    return lambda: client._read_request(20, rlist=rlist)
+
+
+@benchmark("request.write")
+def request_write():
+    client = _client()
+    return lambda: client._write_request(20, activemode_write=2)
+
+
+for _hooks in ("none", "registry"):
+
+    @benchmark(f"read.roundtrip[{_hooks}]")
+    def read_roundtrip(hooks=_hooks):
+        client = _client()
+        if hooks == "registry":
+            client.instrumentation = MetricsRegistry()
+        client.ws = EchoWebsocket()
+        client._mux = WSMultiplexer(client.ws, instrumentation=client.instrumentation)
+        return client.read
+
+
+for _size, _rows in ENERGY_SIZES.items():
+
+    @benchmark(f"energy.construct[{_size}]")
+    def energy_construct(rows=_rows):
+        data = energy_response(rows)
+        return lambda: WFEnergyData(data)
+
+    @benchmark(f"energy.construct_rows[{_size}]")
+    def energy_construct_rows(rows=_rows):
+        """A WFEnergyReading per row, as before the columns, to compare with."""
+        data = energy_response(rows)
+        return lambda: [
+            WFEnergyReading(ts, row, data["columns"])
+            for ts, row in zip(data["index"], data["data"], strict=True)
+        ]
+
+    @benchmark(f"energy.mean[{_size}]")
+    def energy_mean(rows=_rows):
+        data = WFEnergyData(energy_response(rows))
+        return lambda: data.mean("total_power")
+
+    @benchmark(f"energy.summary[{_size}]")
+    def energy_summary(rows=_rows):
+        data = WFEnergyData(energy_response(rows))
+        return lambda: cli.energy_summary(data)
+
+
+@benchmark("energy.stream_parse[10k]")
+def energy_stream_parse():
+    body = json.dumps(energy_response(10_000)).encode()
+
+    def parse():
+        stream = io.BytesIO(body)
+        chunks = iter(lambda: stream.read(64 * 1024), b"")
+        return WFEnergyData.from_events(energy_events(chunks))
+
+    return parse
+
+
+@simulated("poll.sequential[20x20ms]")
+def poll_sequential():
+    """A client per gateway, read one after another."""
+    with SymphonySimulator(gateways=20, latency=0.02) as sim:
+        clients = [sim.client(device=n) for n in range(20)]
+        try:
+            for client in clients:
+                client.login()
+            yield lambda: [client.read() for client in clients]
+        finally:
+            for client in clients:
+                if client._mux is not None:
+                    client._mux.close()
+
+
+@simulated("poll.account[20x20ms]")
+def poll_account():
+    """Every gateway of the account, pipelined over one login."""
+    with SymphonySimulator(gateways=20, latency=0.02) as sim:
+        poller = AccountPoller(sim.client())
+        try:
+            poller.login()
+            yield poller.poll
+        finally:
+            poller.close()
+
+
+for _workers in (1, 4):
+
+    @simulated(f"energy.bulk[{_workers}x50ms]")
+    def energy_bulk(workers=_workers):
+        """Three months of hourly data in 14 weekly chunks."""
+        with SymphonySimulator(latency=0.05) as sim:
+            client = sim.client()
+            try:
+                client.login()
+                yield lambda: client.get_energy_data_bulk(
+                    "2026-01-01", "2026-04-01", chunk_days=7, max_workers=workers
+                )
+            finally:
+                client._mux.close()
+
+
+for _state in ("cold", "warm"):
+
+    @simulated(f"energy.cached[{_state}-90d]")
+    def energy_cached(state=_state):
+        """The last 90 days of hourly data through an EnergyCache.
+
+        Cold starts from an empty cache each time, warm only fetches
+        the days that aren't closed yet.
+        """
+        end = date.today()
+        start = end - timedelta(days=89)
+        with (
+            SymphonySimulator(latency=0.05) as sim,
+            tempfile.TemporaryDirectory() as directory,
+        ):
+            cache = EnergyCache(directory)
+            client = sim.client(energy_cache=cache)
+
+            def fetch():
+                if state == "cold":
+                    cache.invalidate()
+                return client.get_energy_data(start, end)
+
+            try:
+                client.login()
+                fetch()
+                yield fetch
+            finally:
+                client._mux.close()
+
+
+def _readings(name, client, interval):
+    if name == "stream":
+        yield from client.stream(interval)
+    while True:
+        yield client.read()
+        time.sleep(interval)
+
+
+for _loop in ("read", "stream"):
+
+    @simulated(f"{_loop}.cadence[20ms+40ms]")
+    def cadence(loop=_loop):
+        """A reading every 50ms, 20ms latency and 40ms of work per reading.
+
+        The read loop takes 110ms a reading, stream() keeps to 50ms as
+        the next request goes out while the caller works.
+        """
+        with SymphonySimulator(latency=0.02) as sim:
+            client = sim.client()
+            readings = _readings(loop, client, 0.05)
+
+            def tick():
+                time.sleep(0.04)
+                return next(readings)
+
+            try:
+                client.login()
+                yield tick
+            finally:
+                readings.close()
+                client._mux.close()
+
+
+@simulated("read.load[20x10ms]")
+def read_load():
+    """20 gateways on their own websockets, 50 reads each, 10ms +-5ms a reply.
+
+    Includes each client's login, as run_benchmark logs them all in.
+    """
+    with SymphonySimulator(gateways=20, latency=0.01, jitter=0.005) as sim:
+        yield lambda: run_benchmark(sim, reads=50)
+
+
+for _concurrency in (10, 50):
+
+    @simulated(f"fleet.write[c{_concurrency}-50x20ms]")
+    def fleet_write(concurrency=_concurrency):
+        """Mode, setpoint and fan mode to 50 gateways, 20ms a reply."""
+        settings = {"mode": 2, "cooling_setpoint": 72, "fan_mode": 1}
+        with SymphonySimulator(gateways=50, latency=0.02) as sim:
+            client = sim.client()
+            writer = FleetWriter(client, concurrency=concurrency)
+            units = [(gwid, settings) for gwid in sim.gwids]
+            try:
+                client.login()
+                yield lambda: writer.write(units)
+            finally:
+                client._mux.close()
+
+
+def measure(func, rounds):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    times = [t / number for t in timer.repeat(rounds, number)]
+    return {
+        "number": number,
+        "rounds": rounds,
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+    }
+
+
+def run(setup, rounds):
+    if not inspect.isgeneratorfunction(setup):
+        return measure(setup(), rounds)
+    fixture = setup()
+    try:
+        return measure(next(fixture), rounds)
+    finally:
+        fixture.close()
+
+
+def environment():
+    return {
+        "waterfurnace": waterfurnace.__version__,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "codec": DEFAULT_CODEC.name,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print the change of each median, returning the names that regressed."""
+    regressed = []
+    for name, stats in results.items():
+        before = baseline.get(name)
+        if before is None:
+            click.echo(f"{name:32} {'new':>10}")
+            continue
+        change = (stats["median"] / before["median"] - 1) * 100
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressed.append(name)
+        click.echo(f"{name:32} {change:+9.1f}%{flag}")
+    return regressed
+
+
+@click.command()
+@click.option(
+    "-o", "--output", type=click.Path(dir_okay=False), help="Write the results here"
+)
+@click.option(
+    "--compare",
+    "baseline",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Earlier results to compare with",
+)
+@click.option(
+    "--threshold",
+    type=float,
+    default=10.0,
+    show_default=True,
+    help="Percent slower than the baseline that fails the run",
+)
+@click.option("--rounds", type=click.IntRange(min=1), default=5, show_default=True)
+@click.option("-k", "match", default=None, help="Only run benchmarks containing this")
+def main(output, baseline, threshold, rounds, match):
+    """Time the waterfurnace hot paths."""
+    # cli turns on INFO logging, the simulator would log every request
+    logging.getLogger().setLevel(logging.WARNING)
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if match and match not in name:
+            continue
+        stats = run(setup, rounds)
+        results[name] = stats
+        click.echo(
+            f"{name:32} {stats['median'] * 1e6:12.2f}us  "
+            f"(min {stats['min'] * 1e6:.2f}us, {stats['number']} calls x {rounds})"
+        )
+    if output:
+        report = {"environment": environment(), "benchmarks": results}
+        Path(output).write_text(json.dumps(report, indent=2) + "\n")
+    if baseline:
+        click.echo(f"\nCompared with {baseline}:")
+        before = json.loads(Path(baseline).read_text())["benchmarks"]
+        if compare(results, before, threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
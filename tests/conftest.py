@@ -1,6 +1,7 @@
 """Shared test fixtures for waterfurnace tests."""
 
 import json
+import threading
 from unittest import mock
 
 import pytest
@@ -36,25 +37,43 @@ class MockResponse:
 
 
 class MockWebSocket:
-    """Mock WebSocket connection."""
+    """Mock WebSocket connection.
+
+    Replies come from ``recv_data`` in order. Like the real service, each
+    JSON object reply carries the tid of the request it answers, so the
+    client's tid matching sees them as answers to what it sent.
+    """
 
     def __init__(self, recv_data=None):
         self.recv_data = recv_data or []
         self.recv_index = 0
         self.sent_messages = []
         self.connected = True
+        self._unanswered = []
+        self._sent = threading.Condition()
 
     def send(self, message):
         """Mock send method."""
-        self.sent_messages.append(message)
+        with self._sent:
+            self.sent_messages.append(message)
+            try:
+                self._unanswered.append(json.loads(message).get("tid"))
+            except (ValueError, AttributeError):
+                pass
+            self._sent.notify_all()
 
     def recv(self):
         """Mock recv method."""
+        with self._sent:
+            # the receive thread can get here before the request is sent
+            self._sent.wait_for(lambda: self._unanswered, timeout=1)
+            tid = self._unanswered.pop(0) if self._unanswered else None
         if self.recv_index < len(self.recv_data):
             data = self.recv_data[self.recv_index]
             self.recv_index += 1
-            return data
-        return json.dumps({"err": ""})
+        else:
+            data = json.dumps({"err": ""})
+        return _with_tid(data, tid)
 
     def close(self):
         """Mock close method."""
@@ -65,6 +84,16 @@ class MockWebSocket:
         self.connected = False
 
 
+def _with_tid(data, tid):
+    try:
+        decoded = json.loads(data)
+    except (TypeError, ValueError):
+        return data
+    if not isinstance(decoded, dict) or tid is None:
+        return data
+    return json.dumps(dict(decoded, tid=tid))
+
+
 # ============================================================================
 # Sample Data Fixtures
 # ============================================================================
@@ -420,7 +449,7 @@ def mock_session_id():
 @pytest.fixture
 def mock_requests_post(mock_session_id):
     """Mock requests.post for login."""
-    with mock.patch("requests.post") as mock_post:
+    with mock.patch("requests.Session.post") as mock_post:
         mock_post.return_value = MockResponse(cookies={"sessionid": mock_session_id})
         yield mock_post
 
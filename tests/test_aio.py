@@ -0,0 +1,331 @@
+"""Tests for the asyncio client."""
+
+import asyncio
+import contextlib
+import json
+import time
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web  # noqa: E402
+
+from waterfurnace import aio  # noqa: E402
+from waterfurnace import waterfurnace as wf  # noqa: E402
+from waterfurnace.instrumentation import MetricsRegistry  # noqa: E402
+
+
+class FakeSymphony:
+    """aiohttp app standing in for the Symphony login, energy and websocket."""
+
+    def __init__(self, login_response, reading, energy, delay=0.0):
+        self.login_response = login_response
+        self.reading = reading
+        self.energy = energy
+        self.delay = delay
+        self.received = []
+        self.app = web.Application()
+        self.app.router.add_post("/account/login", self.handle_login)
+        self.app.router.add_get("/api.php/user", self.handle_user)
+        self.app.router.add_get("/api.php/v2/gateway/{gwid}/energy", self.handle_energy)
+        self.app.router.add_get("/ws", self.handle_ws)
+
+    async def handle_login(self, request):
+        form = await request.post()
+        if form["password"] != "password":
+            return web.Response(text=wf.FAILED_LOGIN)
+        response = web.Response(text="")
+        response.set_cookie("sessionid", "async-session")
+        return response
+
+    async def handle_user(self, request):
+        if request.cookies.get("sessionid") != "async-session":
+            return web.json_response({})
+        return web.json_response({"emailaddress": "test@example.com"})
+
+    async def handle_energy(self, request):
+        return web.json_response(self.energy)
+
+    async def handle_ws(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for msg in ws:
+            req = json.loads(msg.data)
+            self.received.append(req)
+            if req["cmd"] == "login":
+                await ws.send_str(json.dumps(self.login_response))
+            elif req["cmd"] == "read":
+                await asyncio.sleep(self.delay)
+                await ws.send_str(json.dumps(dict(self.reading, tid=req["tid"])))
+            else:
+                await ws.send_str(
+                    json.dumps({"rsp": "write", "tid": req["tid"], "err": ""})
+                )
+        return ws
+
+
+async def _serve(fake):
+    runner = web.AppRunner(fake.app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def _client(base_url, passwd="password", **kwargs):
+    return aio.AsyncSymphonyGeothermal(
+        base_url,
+        f"{base_url}/account/login",
+        f"{base_url.replace('http', 'ws')}/ws",
+        "test@example.com",
+        passwd,
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def fake(sample_login_response, sample_reading_data, sample_energy_data_hourly):
+    return FakeSymphony(
+        sample_login_response, sample_reading_data, sample_energy_data_hourly
+    )
+
+
+def test_login_read_write_energy(fake):
+    async def scenario():
+        runner, base_url = await _serve(fake)
+        try:
+            async with _client(base_url) as client:
+                await client.login()
+                assert client.sessionid == "async-session"
+                assert client.gwid == "ABC123456"
+
+                reading = await client.read()
+                assert isinstance(reading, wf.WFReading)
+                assert reading.totalunitpower == 1664
+
+                await client.set_mode(2)
+                assert fake.received[-1]["activemode_write"] == 2
+
+                await client.set_humidity(48)
+                assert fake.received[-1]["dehumid_humid_sp"] == {
+                    "dehumidification": 50,
+                    "humidification": 48,
+                }
+                # mode was written since the last read, so it reads again
+                assert fake.received[-2]["rlist"] == list(wf.HUMIDITY_WRITE_SENSORS)
+                await client.read()
+                await client.set_humidity(45)
+                assert fake.received[-2]["cmd"] == "read"
+                assert fake.received[-2]["rlist"] == list(wf.READ_RLIST)
+
+                result = await client.apply({"mode": 3, "heating_setpoint": 68})
+                assert result.ok
+                assert set(result.replies) == {"mode", "heating_setpoint"}
+                assert fake.received[-2]["activemode_write"] == 3
+                assert fake.received[-1]["heatingsp_write"] == 68
+                assert "activemode_write" not in fake.received[-1]
+
+                energy = await client.get_energy_data("2026-01-03", "2026-01-04")
+                assert isinstance(energy, wf.WFEnergyData)
+                assert len(energy) == 3
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_existing_session_is_reused(fake):
+    async def scenario():
+        runner, base_url = await _serve(fake)
+        try:
+            async with _client(base_url, sessionid="async-session") as client:
+                await client.login()
+                assert client.sessionid == "async-session"
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_bad_credentials(fake):
+    async def scenario():
+        runner, base_url = await _serve(fake)
+        try:
+            async with _client(base_url, passwd="wrong") as client:
+                with pytest.raises(wf.WFCredentialError):
+                    await client.login()
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_validation_matches_sync_client(fake):
+    client = _client("http://127.0.0.1:1")
+    with pytest.raises(ValueError, match="mode must be an integer"):
+        asyncio.run(client.set_mode(7))
+
+
+def test_read_timeout_closes_socket(fake):
+    fake.delay = 1.0
+
+    async def scenario():
+        runner, base_url = await _serve(fake)
+        try:
+            async with _client(base_url, request_timeout=0.1) as client:
+                await client.login()
+                with pytest.raises(wf.WFWebsocketClosedError):
+                    await client.read()
+                assert client.ws.closed
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_read_leaves_no_reply_behind(fake):
+    fake.delay = 0.1
+
+    async def scenario():
+        runner, base_url = await _serve(fake)
+        try:
+            async with _client(base_url) as client:
+                await client.login()
+                with pytest.raises(asyncio.TimeoutError):
+                    await asyncio.wait_for(client.read(), 0.02)
+                cancelled = fake.received[-1]["tid"]
+                reading = await client.read()
+                assert reading.tid == fake.received[-1]["tid"] != cancelled
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_write_invalidates_the_gwid_written(fake):
+    async def scenario():
+        runner, base_url = await _serve(fake)
+        try:
+            async with _client(base_url) as client:
+                await client.login()
+                for gwid in (client.gwid, "OTHER"):
+                    client.settings_cache.update(
+                        gwid, {"activemode": 1}, time.perf_counter()
+                    )
+                await client._ws_write(gwid="OTHER", activemode_write=2)
+                assert client.settings_cache.get("OTHER", ["activemode"]) is None
+                assert client.settings_cache.get(client.gwid, ["activemode"])
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_stream(fake):
+    async def scenario():
+        runner, base_url = await _serve(fake)
+        try:
+            async with _client(base_url) as client:
+                await client.login()
+                readings = []
+                start = time.monotonic()
+                stream = client.stream(0.05, sensors="power")
+                async with contextlib.aclosing(stream):
+                    async for reading in stream:
+                        readings.append(reading)
+                        if len(readings) == 3:
+                            break
+                elapsed = time.monotonic() - start
+                assert all(r.totalunitpower == 1664 for r in readings)
+                assert 0.09 < elapsed < 0.5
+                # the read for the fourth tick was started ahead of time,
+                # then cancelled while still waiting for its tick
+                await asyncio.sleep(0.1)
+                reads = [r for r in fake.received if r["cmd"] == "read"]
+                assert len(reads) == 3
+                assert await client.read()
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_instrumentation(fake):
+    registry = MetricsRegistry()
+    gwid = "ABC123456"
+
+    async def scenario():
+        runner, base_url = await _serve(fake)
+        try:
+            async with _client(base_url, instrumentation=registry) as client:
+                await client.login()
+                await client.read()
+                await client.get_energy_data("2026-01-03", "2026-01-04")
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(scenario())
+    for phase in ("http_login", "ws_connect", "ws_login"):
+        assert registry.histogram(phase).count == 1, phase
+    for phase in ("send", "recv", "decode", "model", "energy"):
+        assert registry.histogram(phase, gwid).count == 1, phase
+    assert registry.counter("bytes_out", gwid) > 0
+    assert registry.counter("bytes_in", gwid) > 0
+
+
+def test_retry_is_cancellable(fake):
+    async def scenario():
+        client = _client("http://127.0.0.1:1")
+        client.fails = 1
+        task = asyncio.ensure_future(client.read_with_retry())
+        await asyncio.sleep(0.1)
+        assert not task.done()  # sleeping in the backoff
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await client.close()
+
+    asyncio.run(scenario())
+
+
+def test_many_units_one_loop(fake):
+    fake.delay = 0.2
+
+    async def scenario():
+        runner, base_url = await _serve(fake)
+        try:
+            async with aiohttp.ClientSession(
+                cookie_jar=aiohttp.DummyCookieJar()
+            ) as session:
+                clients = [_client(base_url, session=session) for _ in range(20)]
+                await asyncio.gather(*(c.login() for c in clients))
+                start = time.monotonic()
+                readings = await asyncio.gather(*(c.read() for c in clients))
+                elapsed = time.monotonic() - start
+                await asyncio.gather(*(c.close() for c in clients))
+        finally:
+            await runner.cleanup()
+        assert len(readings) == 20
+        # 20 reads each waiting 0.2s on the server overlap on one loop
+        assert elapsed < 2.0
+
+    asyncio.run(scenario())
+
+
+def test_bulk_energy(fake):
+    async def scenario():
+        runner, base_url = await _serve(fake)
+        try:
+            async with _client(base_url) as client:
+                await client.login()
+                # every chunk gets the same three rows, merged once
+                energy = await client.get_energy_data_bulk(
+                    "2026-01-01", "2026-01-10", chunk_days=3, max_workers=2
+                )
+        finally:
+            await runner.cleanup()
+        assert len(energy) == 3
+        assert energy.index == sorted(energy.index)
+
+    asyncio.run(scenario())
@@ -0,0 +1,45 @@
+"""Smoke test of the standalone benchmark runner."""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from waterfurnace.codec import orjson
+
+RUNNER = Path(__file__).parent.parent / "benchmarks" / "run.py"
+
+
+def run(*args):
+    return subprocess.run(
+        [sys.executable, str(RUNNER), "--rounds", "1", *args],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+
+
+def test_results_and_compare(tmp_path):
+    output = tmp_path / "results.json"
+    result = run("-k", "request.", "-o", str(output))
+    assert result.returncode == 0, result.stderr
+    report = json.loads(output.read_text())
+    codecs = {"json"} if orjson is None else {"json", "orjson"}
+    assert set(report["benchmarks"]) == {
+        "request.read[all]",
+        "request.read[deepcopy]",
+        "request.read[power]",
+        "request.write",
+        *(f"request.encode[{name}]" for name in codecs),
+    }
+    assert report["environment"]["python"]
+    stats = report["benchmarks"]["request.write"]
+    assert 0 < stats["min"] <= stats["median"]
+
+    # a baseline 1000x faster makes everything a regression
+    for stats in report["benchmarks"].values():
+        stats["median"] /= 1000
+    output.write_text(json.dumps(report))
+    result = run("-k", "request.write", "--compare", str(output))
+    assert result.returncode == 1
+    assert "REGRESSION" in result.stdout
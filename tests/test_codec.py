@@ -0,0 +1,75 @@
+"""Tests for the JSON codecs."""
+
+import copy
+import json
+
+import pytest
+
+from waterfurnace import codec
+from waterfurnace import waterfurnace as wf
+
+CODEC_NAMES = ["json"] + (["orjson"] if codec.orjson is not None else [])
+
+
+class RecordingCodec(codec.JSONCodec):
+    name = "recording"
+
+    def __init__(self):
+        self.calls = []
+
+    def dumps(self, obj):
+        self.calls.append("dumps")
+        return super().dumps(obj)
+
+    def loads(self, data):
+        self.calls.append("loads")
+        return super().loads(data)
+
+
+def _read_request():
+    req = copy.deepcopy(wf.DATA_REQUEST)
+    req["tid"] = 42
+    req["awlid"] = "ABC123456"
+    return req
+
+
+@pytest.mark.parametrize("name", CODEC_NAMES)
+class TestCodecs:
+    def test_round_trip(self, name, sample_reading_data):
+        c = codec.get_codec(name)
+        encoded = c.dumps(sample_reading_data)
+        assert isinstance(encoded, str)
+        assert json.loads(encoded) == sample_reading_data
+        assert c.loads(encoded) == sample_reading_data
+        assert c.loads(encoded.encode()) == sample_reading_data
+
+    def test_invalid_is_value_error(self, name):
+        with pytest.raises(ValueError):
+            codec.get_codec(name).loads("{not json")
+
+
+def test_falls_back_to_stdlib(monkeypatch):
+    monkeypatch.setattr(codec, "orjson", None)
+    assert isinstance(codec.get_codec(), codec.JSONCodec)
+    assert codec.get_codec().name == "json"
+    with pytest.raises(ImportError):
+        codec.get_codec("orjson")
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError, match="Unknown JSON codec"):
+        codec.get_codec("yaml")
+
+
+def test_client_uses_codec(
+    mock_requests_post, mock_websocket_connection, sample_reading_data
+):
+    recorder = RecordingCodec()
+    client = wf.WaterFurnace("test@example.com", "password", codec=recorder)
+    client.login()
+    _, ws = mock_websocket_connection
+    ws.recv_data.append(json.dumps(sample_reading_data))
+    client.read()
+    client.set_mode(1)
+    # login frame, login reply, read reply, write frame, write reply
+    assert recorder.calls == ["dumps", "loads", "loads", "dumps", "loads"]
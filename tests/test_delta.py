@@ -0,0 +1,134 @@
+"""Tests for change detection on successive readings."""
+
+import copy
+import json
+import random
+
+import pytest
+
+from waterfurnace import waterfurnace as wf
+from waterfurnace.delta import DELTA_FIELDS, DeltaTracker
+
+
+def _reading(data, **changes):
+    data = copy.deepcopy(data)
+    settings = {k[len("activesettings.") :]: v for k, v in changes.items() if "." in k}
+    data["activesettings"].update(settings)
+    data.update({k: v for k, v in changes.items() if "." not in k})
+    return wf.WFReading(data)
+
+
+class TestDeltaTracker:
+    def test_baseline_then_changes(self, sample_reading_data):
+        tracker = DeltaTracker()
+        first = tracker.update(_reading(sample_reading_data))
+        assert first.baseline
+        assert first.gwid == "ABC123456"
+        assert set(first.changes) == set(DELTA_FIELDS)
+        assert first.changes["activesettings.activemode"] == 3
+
+        same = tracker.update(_reading(sample_reading_data, tid=21))
+        assert not same
+        assert not same.baseline
+
+        delta = tracker.update(
+            _reading(
+                sample_reading_data,
+                tstatroomtemp=70.1,
+                **{"activesettings.heatingsp_read": 70},
+            )
+        )
+        assert delta.changes == {
+            "tstatroomtemp": 70.1,
+            "activesettings.heatingsp_read": 70,
+        }
+
+    def test_deadband(self, sample_reading_data):
+        tracker = DeltaTracker(deadbands={"totalunitpower": 1})
+        tracker.update(_reading(sample_reading_data, totalunitpower=1664))
+        assert not tracker.update(_reading(sample_reading_data, totalunitpower=1665))
+        assert not tracker.update(_reading(sample_reading_data, totalunitpower=1663))
+        # compared with the last emitted value, so drift adds up
+        assert tracker.update(
+            _reading(sample_reading_data, totalunitpower=1666)
+        ).changes == {"totalunitpower": 1666}
+        assert tracker.last("ABC123456")["totalunitpower"] == 1666
+
+    def test_none_always_changes(self, sample_reading_data):
+        tracker = DeltaTracker(deadbands={"totalunitpower": 100})
+        tracker.update(_reading(sample_reading_data))
+        delta = tracker.update(_reading(sample_reading_data, totalunitpower=None))
+        assert delta.changes == {"totalunitpower": None}
+
+    def test_per_gateway(self, sample_reading_data):
+        tracker = DeltaTracker()
+        tracker.update(_reading(sample_reading_data))
+        other = tracker.update(_reading(sample_reading_data, awlid="OTHER"))
+        assert other.baseline
+        assert tracker.update(_reading(sample_reading_data), gwid="THIRD").baseline
+        tracker.reset("OTHER")
+        assert tracker.update(_reading(sample_reading_data, awlid="OTHER")).baseline
+        tracker.reset()
+        assert tracker.update(_reading(sample_reading_data)).baseline
+
+    def test_fields_subset(self, sample_reading_data):
+        tracker = DeltaTracker(fields=["totalunitpower"])
+        assert tracker.update(_reading(sample_reading_data)).changes == {
+            "totalunitpower": 1664
+        }
+        assert not tracker.update(_reading(sample_reading_data, tstatroomtemp=80))
+
+    def test_track(self, sample_reading_data):
+        readings = [
+            _reading(sample_reading_data, totalunitpower=p)
+            for p in (1664, 1664, 1700, 1700)
+        ]
+        deltas = list(DeltaTracker().track(readings))
+        assert len(deltas) == 2
+        assert deltas[1].reading is readings[2]
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            {"fields": ["bogus"]},
+            {"deadbands": {"bogus": 1}},
+            {"fields": ["fanpower"], "deadbands": {"totalunitpower": 1}},
+        ],
+    )
+    def test_unknown_fields(self, kwargs):
+        with pytest.raises(ValueError, match="bogus|totalunitpower"):
+            DeltaTracker(**kwargs)
+
+    def test_deadband_on_non_numeric_field(self):
+        with pytest.raises(ValueError, match="non-numeric fields: raw_humidity"):
+            DeltaTracker(deadbands={"raw_humidity_offset_settings": 1})
+
+
+@pytest.mark.benchmark
+def test_delta_storage(sample_reading_data):
+    """Bytes stored for a day of 15s polls, full readings vs deltas."""
+    rng = random.Random(0)
+    tracker = DeltaTracker(
+        deadbands={
+            "totalunitpower": 5,
+            "compressorpower": 5,
+            "fanpower": 2,
+            "tstatroomtemp": 0.2,
+        }
+    )
+    full = delta = 0
+    for n in range(5760):
+        power = 1500 + rng.randint(-3, 3) + (200 if n % 720 < 360 else 0)
+        reading = _reading(
+            sample_reading_data,
+            tid=n,
+            compressorpower=power,
+            totalunitpower=power + 164,
+            fanpower=39 + rng.randint(-1, 1),
+            tstatroomtemp=round(69.7 + rng.uniform(-0.1, 0.1), 1),
+        )
+        full += len(json.dumps(sample_reading_data | {"tid": n}))
+        changes = tracker.update(reading).changes
+        if changes:
+            delta += len(json.dumps(changes))
+    assert delta < full / 20, f"deltas {delta / 1e3:.1f}kB, full {full / 1e6:.2f}MB"
@@ -0,0 +1,174 @@
+"""Tests for chunked energy data downloads."""
+
+import json
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from waterfurnace import waterfurnace as wf
+
+
+class FakeEnergyAPI:
+    """Answers energy GETs with one hourly row per hour of start..end inclusive."""
+
+    def __init__(self, latency=0.0, fail_once=(), empty=()):
+        self.latency = latency
+        self.fail_once = set(fail_once)
+        self.empty = set(empty)
+        self.lock = threading.Lock()
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def __call__(self, url, **kwargs):
+        query = parse_qs(urlparse(url).query)
+        start, end = query["start"][0], query["end"][0]
+        with self.lock:
+            self.requests.append((start, end))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            fail = (start, end) in self.fail_once
+            self.fail_once.discard((start, end))
+        try:
+            time.sleep(self.latency)
+            if fail:
+                return mock.MagicMock(
+                    status_code=500,
+                    raise_for_status=mock.MagicMock(
+                        side_effect=wf.requests.exceptions.HTTPError("500")
+                    ),
+                )
+            if (start, end) in self.empty:
+                return mock.MagicMock(status_code=200, text="")
+            data = self.energy(start, end)
+            body = json.dumps(data)
+            return mock.MagicMock(status_code=200, text=body, content=body.encode())
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    @staticmethod
+    def energy(start, end):
+        first = datetime.fromisoformat(start).replace(tzinfo=timezone.utc)
+        hours = ((date.fromisoformat(end) - date.fromisoformat(start)).days + 1) * 24
+        # newest first, like the real API
+        index = [
+            int((first + timedelta(hours=h)).timestamp() * 1000)
+            for h in reversed(range(hours))
+        ]
+        return {
+            "columns": ["total_power", "hour"],
+            "index": index,
+            "data": [[1.0, (ts // 3600000) % 24] for ts in index],
+        }
+
+
+@pytest.fixture
+def energy_api(mock_waterfurnace_client):
+    api = FakeEnergyAPI()
+    with mock.patch("requests.Session.get", side_effect=api):
+        yield mock_waterfurnace_client, api
+
+
+class TestEnergyChunks:
+    def test_chunks_share_boundaries(self):
+        assert wf.energy_chunks("2026-01-01", "2026-01-20", 7) == [
+            ("2026-01-01", "2026-01-08"),
+            ("2026-01-08", "2026-01-15"),
+            ("2026-01-15", "2026-01-20"),
+        ]
+
+    def test_single_day(self):
+        assert wf.energy_chunks("2026-01-01", "2026-01-01", 7) == [
+            ("2026-01-01", "2026-01-01")
+        ]
+
+    @pytest.mark.parametrize(
+        "start, end, days",
+        [("2026-01-02", "2026-01-01", 7), ("2026-01-01", "2026-01-02", 0)],
+    )
+    def test_invalid(self, start, end, days):
+        with pytest.raises(ValueError):
+            wf.energy_chunks(start, end, days)
+
+
+class TestMerge:
+    def test_sorted_without_duplicates(self):
+        first = wf.WFEnergyData(
+            {"columns": ["a"], "index": [3, 2], "data": [[3.0], [2.0]]}
+        )
+        second = wf.WFEnergyData(
+            {"columns": ["a", "b"], "index": [3, 1], "data": [[30.0, 1], [1.0, 2]]}
+        )
+        merged = wf.WFEnergyData.merge([first, second])
+        assert merged.columns == ["a", "b"]
+        assert merged.index == [1, 2, 3]
+        # a, from the first part, and b, only in the second
+        assert merged.data == [[1.0, 2], [2.0, None], [3.0, 1]]
+
+    def test_fills_missing_values_from_later_parts(self):
+        first = wf.WFEnergyData(
+            {"columns": ["a", "b"], "index": [1], "data": [[None, 2]]}
+        )
+        second = wf.WFEnergyData(
+            {"columns": ["a", "b"], "index": [1], "data": [[5, 9]]}
+        )
+        merged = wf.WFEnergyData.merge([first, second])
+        assert merged.data == [[5, 2]]
+
+
+class TestBulkEnergy:
+    def test_matches_single_request(self, energy_api):
+        client, api = energy_api
+        bulk = client.get_energy_data_bulk("2026-01-01", "2026-03-01", chunk_days=10)
+        assert len(api.requests) == 6
+
+        single = client.get_energy_data("2026-01-01", "2026-03-01")
+        assert bulk.index == sorted(single.index)
+        assert bulk.column("hour") == wf.WFEnergyData.merge([single]).column("hour")
+        assert len(bulk) == 60 * 24
+
+    def test_bounded_parallelism(self, energy_api):
+        client, api = energy_api
+        api.latency = 0.05
+        client.get_energy_data_bulk(
+            "2026-01-01", "2026-01-31", chunk_days=2, max_workers=3
+        )
+        assert len(api.requests) == 15
+        assert api.max_in_flight == 3
+
+    def test_failed_chunk_is_retried_alone(self, energy_api):
+        client, api = energy_api
+        api.fail_once = {("2026-01-08", "2026-01-15")}
+        with mock.patch.object(wf, "ENERGY_RETRY_DELAY", 0):
+            data = client.get_energy_data_bulk("2026-01-01", "2026-01-20", chunk_days=7)
+        assert api.requests.count(("2026-01-08", "2026-01-15")) == 2
+        assert api.requests.count(("2026-01-01", "2026-01-08")) == 1
+        assert len(data) == 20 * 24
+
+    def test_chunk_gives_up_after_retries(self, energy_api):
+        client, api = energy_api
+        api.fail_once = {("2026-01-08", "2026-01-15")}
+        with pytest.raises(wf.WFError, match="2026-01-08 to 2026-01-15"):
+            client.get_energy_data_bulk(
+                "2026-01-01", "2026-01-20", chunk_days=7, retries=0
+            )
+
+    def test_empty_chunks(self, energy_api):
+        client, api = energy_api
+        api.empty = {("2026-01-01", "2026-01-08")}
+        data = client.get_energy_data_bulk("2026-01-01", "2026-01-10", chunk_days=7)
+        assert len(data) == 3 * 24
+
+        api.empty = {("2026-01-01", "2026-01-08"), ("2026-01-08", "2026-01-10")}
+        with pytest.raises(wf.WFNoDataError):
+            client.get_energy_data_bulk("2026-01-01", "2026-01-10", chunk_days=7)
+
+    def test_requires_login(self):
+        client = wf.WaterFurnace("test@example.com", "password")
+        with pytest.raises(wf.WFCredentialError):
+            client.get_energy_data_bulk("2026-01-01", "2026-01-10")
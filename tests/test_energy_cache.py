@@ -0,0 +1,163 @@
+"""Tests for the local energy data cache."""
+
+import json
+from datetime import date, datetime, timedelta, timezone
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from waterfurnace import waterfurnace as wf
+from waterfurnace.energy_cache import EnergyCache, split_days
+
+TZ = "America/New_York"
+
+
+def _hourly(start, end, tz=TZ):
+    """Hourly rows for local days start..end inclusive, newest first."""
+    first = datetime.combine(date.fromisoformat(start), datetime.min.time())
+    first = first.replace(tzinfo=ZoneInfo(tz)).astimezone(timezone.utc)
+    days = (date.fromisoformat(end) - date.fromisoformat(start)).days + 1
+    index = [
+        int((first + timedelta(hours=h)).timestamp() * 1000)
+        for h in reversed(range(days * 24))
+    ]
+    return {
+        "columns": ["total_power", "id"],
+        "index": index,
+        "data": [[0.5, n] for n in range(len(index))],
+    }
+
+
+class FakeFetch:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, start, end):
+        self.calls.append((start, end))
+        return wf.WFEnergyData(_hourly(start, end))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EnergyCache(str(tmp_path / "cache"))
+
+
+def _today():
+    return datetime.now(ZoneInfo(TZ)).date()
+
+
+class TestEnergyCache:
+    def test_closed_days_are_served_locally(self, cache):
+        fetch = FakeFetch()
+        first = cache.get_energy_data("GW", "2026-01-01", "2026-01-10", "1H", TZ, fetch)
+        assert fetch.calls == [("2026-01-01", "2026-01-11")]
+        assert len(first) == 10 * 24
+
+        second = cache.get_energy_data(
+            "GW", "2026-01-01", "2026-01-10", "1H", TZ, fetch
+        )
+        assert len(fetch.calls) == 1
+        assert second.index == first.index
+        assert second.data == first.data
+
+    def test_only_missing_days_are_fetched(self, cache):
+        fetch = FakeFetch()
+        cache.get_energy_data("GW", "2026-01-05", "2026-01-06", "1H", TZ, fetch)
+        data = cache.get_energy_data("GW", "2026-01-01", "2026-01-10", "1H", TZ, fetch)
+        assert fetch.calls[1:] == [
+            ("2026-01-01", "2026-01-05"),
+            ("2026-01-07", "2026-01-11"),
+        ]
+        assert len(data) == 10 * 24
+        assert data.index == sorted(set(data.index))
+
+    def test_open_tail_is_always_fetched(self, cache):
+        fetch = FakeFetch()
+        today = _today()
+        start = (today - timedelta(days=3)).isoformat()
+        cache.get_energy_data("GW", start, today.isoformat(), "1H", TZ, fetch)
+        cache.get_energy_data("GW", start, today.isoformat(), "1H", TZ, fetch)
+        tomorrow = (today + timedelta(days=1)).isoformat()
+        assert fetch.calls[-1] == (today.isoformat(), tomorrow)
+
+    def test_keys_are_separate(self, cache):
+        fetch = FakeFetch()
+        for gwid, freq, tz in [("GW", "1H", TZ), ("GW2", "1H", TZ), ("GW", "1D", TZ)]:
+            cache.get_energy_data(gwid, "2026-01-01", "2026-01-02", freq, tz, fetch)
+        assert len(fetch.calls) == 3
+
+    def test_empty_days_are_fetched_again(self, cache):
+        fetch = mock.MagicMock(side_effect=wf.WFNoDataError())
+        with pytest.raises(wf.WFNoDataError):
+            cache.get_energy_data("GW", "2026-01-01", "2026-01-02", "1H", TZ, fetch)
+        fetch.side_effect = FakeFetch()
+        data = cache.get_energy_data("GW", "2026-01-01", "2026-01-02", "1H", TZ, fetch)
+        assert len(data) == 2 * 24
+        assert fetch.call_count == 2
+
+    def test_gap_in_a_reply_is_fetched_again(self, cache):
+        def fetch(start, end):
+            calls.append((start, end))
+            data = _hourly(start, end)
+            # nothing uploaded for Jan 2 yet
+            rows = [
+                (ts, row)
+                for ts, row in zip(data["index"], data["data"], strict=True)
+                if datetime.fromtimestamp(ts / 1000, ZoneInfo(TZ)).date()
+                != date(2026, 1, 2)
+            ]
+            data["index"] = [ts for ts, _ in rows]
+            data["data"] = [row for _, row in rows]
+            return wf.WFEnergyData(data)
+
+        calls = []
+        first = cache.get_energy_data("GW", "2026-01-01", "2026-01-03", "1H", TZ, fetch)
+        assert len(first) == 2 * 24
+        cache.get_energy_data("GW", "2026-01-01", "2026-01-03", "1H", TZ, fetch)
+        assert calls == [("2026-01-01", "2026-01-04"), ("2026-01-02", "2026-01-03")]
+
+    def test_invalidate(self, cache):
+        fetch = FakeFetch()
+        cache.get_energy_data("GW", "2026-01-01", "2026-01-10", "1H", TZ, fetch)
+        cache.get_energy_data("GW2", "2026-01-01", "2026-01-10", "1H", TZ, fetch)
+        assert cache.invalidate("GW", start_date="2026-01-09") == 2
+        cache.get_energy_data("GW", "2026-01-01", "2026-01-10", "1H", TZ, fetch)
+        assert fetch.calls[-1] == ("2026-01-09", "2026-01-11")
+        assert cache.invalidate() == 20
+
+    def test_closed_before(self, cache):
+        now = datetime(2026, 1, 10, 0, 30, tzinfo=ZoneInfo(TZ)).timestamp()
+        # still inside the settle time after midnight
+        assert cache.closed_before(TZ, now) == date(2026, 1, 9)
+        assert cache.closed_before(TZ, now + 3600) == date(2026, 1, 10)
+
+    def test_unknown_timezone(self, cache):
+        with pytest.raises(ValueError, match="Unknown timezone"):
+            cache.closed_before("Mars/Olympus_Mons")
+
+
+def test_split_days_uses_local_time():
+    energy = wf.WFEnergyData(_hourly("2026-01-01", "2026-01-02"))
+    days = split_days(energy, TZ)
+    assert sorted(days) == [date(2026, 1, 1), date(2026, 1, 2)]
+    assert all(len(day["index"]) == 24 for day in days.values())
+
+
+def test_client_uses_cache(mock_waterfurnace_client, tmp_path):
+    client = mock_waterfurnace_client
+    client.energy_cache = EnergyCache(str(tmp_path))
+
+    def get(url, **kwargs):
+        query = parse_qs(urlparse(url).query)
+        data = _hourly(query["start"][0], query["end"][0])
+        body = json.dumps(data)
+        return mock.MagicMock(status_code=200, text=body, content=body.encode())
+
+    with mock.patch("requests.Session.get", side_effect=get) as mock_get:
+        client.get_energy_data("2026-01-01", "2026-01-31")
+        data = client.get_energy_data("2026-01-01", "2026-01-31")
+    assert mock_get.call_count == 1
+    assert "/gateway/ABC123456/" in mock_get.call_args[0][0]
+    assert len(data) == 31 * 24
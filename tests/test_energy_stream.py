@@ -0,0 +1,182 @@
+"""Tests for streaming energy data downloads."""
+
+import json
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from waterfurnace import waterfurnace as wf
+
+
+class EnergyHandler(BaseHTTPRequestHandler):
+    """Serves the server's body in small chunks, pausing at ``hold`` bytes."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = self.server.body
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        view = memoryview(body)
+        for start in range(0, len(body), 4096):
+            if start >= self.server.hold:
+                self.server.release.wait(5)
+            self.wfile.write(view[start : start + 4096])
+            self.wfile.flush()
+
+
+@pytest.fixture
+def energy_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EnergyHandler)
+    server.daemon_threads = True
+    server.body = b""
+    server.hold = float("inf")
+    server.release = threading.Event()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.release.set()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(energy_server):
+    base_url = f"http://127.0.0.1:{energy_server.server_address[1]}"
+    client = wf.SymphonyGeothermal(
+        base_url, f"{base_url}/login", "ws://unused", "test@example.com", "password"
+    )
+    client.sessionid = "session"
+    client.gwid = "GW"
+    return client
+
+
+def _energy(rows):
+    return {
+        "columns": ["total_power", "heat_runtime", "id", "time_zone"],
+        "index": [1767571200000 + n * 900000 for n in range(rows)],
+        "data": [
+            [n * 0.01, None if n % 3 else 0.5, n, "America/New_York"]
+            for n in range(rows)
+        ],
+    }
+
+
+class TestEnergyEvents:
+    @pytest.mark.parametrize("size", [1, 3, 64])
+    def test_any_chunking(self, sample_energy_data_hourly, size):
+        body = json.dumps(sample_energy_data_hourly).encode()
+        chunks = [body[i : i + size] for i in range(0, len(body), size)]
+        events = list(wf.energy_events(chunks))
+        assert events[0] == ("columns", sample_energy_data_hourly["columns"])
+        assert [v for k, v in events if k == "index"] == (
+            sample_energy_data_hourly["index"]
+        )
+        assert [v for k, v in events if k == "data"] == (
+            sample_energy_data_hourly["data"]
+        )
+
+    def test_number_split_across_chunks(self):
+        events = list(wf.energy_events([b'{"index": [12', b"34]}"]))
+        assert events == [("index", 1234)]
+
+    def test_multibyte_split_across_chunks(self):
+        body = '{"time_zone": "Zürich"}'.encode()
+        assert list(wf.energy_events([body[:17], body[17:]])) == [
+            ("time_zone", "Zürich")
+        ]
+
+    def test_empty(self):
+        assert list(wf.energy_events([b"", b"  "])) == []
+
+    @pytest.mark.parametrize(
+        "body", [b'{"index": [1, 2', b"[1, 2]", b'{"data": []} x', b'{"a" 1}']
+    )
+    def test_invalid(self, body):
+        with pytest.raises(ValueError):
+            list(wf.energy_events([body]))
+
+
+class TestStreamingEnergy:
+    def test_stream_matches_buffered(self, client, energy_server):
+        energy_server.body = json.dumps(_energy(500)).encode()
+        buffered = client.get_energy_data("2026-01-01", "2026-01-06", "15min")
+        streamed = client.get_energy_data(
+            "2026-01-01", "2026-01-06", "15min", stream=True
+        )
+        assert streamed.columns == buffered.columns
+        assert streamed.index == buffered.index
+        assert streamed.data == buffered.data
+        for col in buffered.columns:
+            assert type(streamed.column(col)) is type(buffered.column(col))
+            assert getattr(streamed.column(col), "typecode", None) == getattr(
+                buffered.column(col), "typecode", None
+            )
+
+    def test_columns_after_data(self, client, energy_server):
+        energy = _energy(3)
+        energy_server.body = json.dumps(
+            {"data": energy["data"], "index": energy["index"], "columns": ["a"]}
+        ).encode()
+        streamed = client.get_energy_data("2026-01-01", "2026-01-02", stream=True)
+        assert streamed.data == [[0.0], [0.01], [0.02]]
+
+    def test_first_rows_before_download_finishes(self, client, energy_server):
+        energy_server.body = json.dumps(_energy(8000)).encode()
+        # past the index and into the data, well short of the whole body
+        energy_server.hold = 3 * wf.ENERGY_STREAM_CHUNK
+        assert len(energy_server.body) > 2 * energy_server.hold
+        readings = client.iter_energy_data("2026-01-01", "2026-03-25", "15min")
+        first = next(readings)
+        # the server is still holding back most of the body
+        assert not energy_server.release.is_set()
+        assert first.timestamp_ms == 1767571200000
+        energy_server.release.set()
+        assert len(list(readings)) == 7999
+
+    def test_no_data(self, client, energy_server):
+        with pytest.raises(wf.WFNoDataError):
+            client.get_energy_data("2026-01-01", "2026-01-02", stream=True)
+        with pytest.raises(wf.WFNoDataError):
+            list(client.iter_energy_data("2026-01-01", "2026-01-02"))
+
+    def test_invalid_response(self, client, energy_server):
+        energy_server.body = b'{"columns": ["a"], "index": [1'
+        with pytest.raises(wf.WFError, match="Invalid energy data"):
+            client.get_energy_data("2026-01-01", "2026-01-02", stream=True)
+        with pytest.raises(wf.WFError, match="Invalid energy data"):
+            list(client.iter_energy_data("2026-01-01", "2026-01-02"))
+
+
+def _peak(func):
+    tracemalloc.start()
+    try:
+        result = func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+@pytest.mark.benchmark
+def test_stream_peak_memory(client, energy_server):
+    """Peak memory for a year of 15min data, buffered vs streamed."""
+    energy_server.body = json.dumps(_energy(35040)).encode()
+    buffered, buffered_peak = _peak(
+        lambda: client.get_energy_data("2025-01-01", "2026-01-01", "15min")
+    )
+    streamed, streamed_peak = _peak(
+        lambda: client.get_energy_data("2025-01-01", "2026-01-01", "15min", stream=True)
+    )
+    assert len(streamed) == len(buffered) == 35040
+    assert streamed_peak < buffered_peak / 2, (
+        f"streamed peak {streamed_peak / 1e6:.1f}MB, "
+        f"buffered peak {buffered_peak / 1e6:.1f}MB"
+    )
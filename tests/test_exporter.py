@@ -0,0 +1,228 @@
+"""Tests for the Prometheus exporter."""
+
+import threading
+import time
+import urllib.error
+import urllib.request
+from unittest import mock
+
+import pytest
+from click.testing import CliRunner
+
+from waterfurnace import cli
+from waterfurnace import waterfurnace as wf
+from waterfurnace.exporter import CONTENT_TYPE, Exporter
+from waterfurnace.instrumentation import MetricsRegistry
+from waterfurnace.poller import PollResult
+
+
+class FakePoller:
+    """Hands out canned PollResults, counting calls."""
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.logins = 0
+        self.polls = 0
+        self.polled = threading.Condition()
+        self.closed = False
+
+    def login(self):
+        self.logins += 1
+
+    def wait_for_polls(self, count, timeout=5):
+        with self.polled:
+            return self.polled.wait_for(lambda: self.polls >= count, timeout)
+
+    def poll(self):
+        with self.polled:
+            self.polls += 1
+            self.polled.notify_all()
+        result = self.results[min(self.polls, len(self.results)) - 1]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def close(self):
+        self.closed = True
+
+
+def _result(readings=None, errors=None):
+    readings = {
+        gwid: wf.WFReading({"awlid": gwid, **data})
+        for gwid, data in (readings or {}).items()
+    }
+    return PollResult(readings, errors or {}, 0.01)
+
+
+def _samples(text):
+    """metric{labels} -> value for the sample lines."""
+    return dict(
+        line.rsplit(" ", 1)
+        for line in text.decode().splitlines()
+        if line and not line.startswith("#")
+    )
+
+
+class TestExporter:
+    def test_renders_readings_and_health(self):
+        poller = FakePoller(
+            [
+                _result(
+                    {
+                        "A": {"totalunitpower": 1664, "tstatroomtemp": 69.5},
+                        "B": {"totalunitpower": 900},
+                    }
+                ),
+                _result(
+                    {"A": {"totalunitpower": 1700, "tstatroomtemp": 70.0}},
+                    {"B": wf.WFError("gateway offline")},
+                ),
+            ]
+        )
+        exporter = Exporter(None, poller=poller)
+        exporter.poll_once()
+        exporter.poll_once()
+        samples = _samples(exporter.snapshot)
+
+        assert samples['waterfurnace_totalunitpower{gwid="A"}'] == "1700"
+        assert samples['waterfurnace_tstatroomtemp{gwid="A"}'] == "70.0"
+        # the last good reading is kept, up says it's stale
+        assert samples['waterfurnace_totalunitpower{gwid="B"}'] == "900"
+        assert samples['waterfurnace_up{gwid="A"}'] == "1"
+        assert samples['waterfurnace_up{gwid="B"}'] == "0"
+        assert samples['waterfurnace_read_errors_total{gwid="B"}'] == "1"
+        assert samples["waterfurnace_polls_total"] == "2"
+        assert 'waterfurnace_fanpower{gwid="A"}' not in samples
+        assert "# TYPE waterfurnace_read_errors_total counter" in (
+            exporter.snapshot.decode()
+        )
+        assert poller.logins == 1
+
+    def test_circuit_open_is_not_an_error(self):
+        poller = FakePoller([_result(errors={"A": wf.WFCircuitOpenError("A", 30)})])
+        exporter = Exporter(None, poller=poller)
+        exporter.poll_once()
+        samples = _samples(exporter.snapshot)
+        assert samples['waterfurnace_circuit_open{gwid="A"}'] == "1"
+        assert samples['waterfurnace_read_errors_total{gwid="A"}'] == "0"
+
+    def test_failed_cycle_logs_in_again(self):
+        poller = FakePoller(
+            [
+                _result({"A": {"totalunitpower": 1}}),
+                wf.WFCredentialError(),
+                _result({"A": {"totalunitpower": 2}}),
+            ]
+        )
+        exporter = Exporter(None, poller=poller)
+        exporter.poll_once()
+        exporter.poll_once()
+        assert _samples(exporter.snapshot)['waterfurnace_up{gwid="A"}'] == "0"
+        assert exporter.poll_errors == 1
+        exporter.poll_once()
+        assert poller.logins == 2
+        assert _samples(exporter.snapshot)['waterfurnace_up{gwid="A"}'] == "1"
+
+    def test_label_escaping(self):
+        poller = FakePoller([_result({'we"ird\\': {"totalunitpower": 1}})])
+        exporter = Exporter(None, poller=poller)
+        exporter.poll_once()
+        assert b'waterfurnace_up{gwid="we\\"ird\\\\"} 1' in exporter.snapshot
+
+    def test_phase_timings(self):
+        client = wf.WaterFurnace(
+            "test@example.com", "password", instrumentation=MetricsRegistry()
+        )
+        client.instrumentation.observe("recv", 0.003, "A")
+        client.instrumentation.observe("http_login", 0.2)
+        client.instrumentation.count("bytes_in", 512, "A")
+        exporter = Exporter(client, poller=FakePoller([_result()]))
+        exporter.poll_once()
+        samples = _samples(exporter.snapshot)
+        bucket = 'waterfurnace_phase_seconds_bucket{phase="recv",gwid="A",le="%s"}'
+        assert samples[bucket % "0.0025"] == "0"
+        assert samples[bucket % "0.005"] == "1"
+        assert samples[bucket % "+Inf"] == "1"
+        assert samples['waterfurnace_phase_seconds_count{phase="http_login"}'] == "1"
+        assert samples['waterfurnace_received_bytes_total{gwid="A"}'] == "512"
+        assert "# TYPE waterfurnace_phase_seconds histogram" in (
+            exporter.snapshot.decode()
+        )
+
+    def test_invalid_interval(self):
+        with pytest.raises(ValueError):
+            Exporter(None, interval=0, poller=FakePoller([]))
+
+
+@pytest.fixture
+def served():
+    poller = FakePoller([_result({"A": {"totalunitpower": 1664}})])
+    # no second poll during a test
+    exporter = Exporter(None, interval=60, poller=poller)
+    server = exporter.serve("127.0.0.1", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield exporter, poller, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    exporter.close()
+
+
+def test_serves_cached_snapshot(served):
+    exporter, poller, url = served
+    assert poller.wait_for_polls(1)
+    for _ in range(5):
+        with urllib.request.urlopen(f"{url}/metrics") as res:
+            assert res.headers["Content-Type"] == CONTENT_TYPE
+            body = res.read()
+        assert b'waterfurnace_totalunitpower{gwid="A"} 1664' in body
+    # scrapes don't poll, the background schedule does
+    assert poller.polls == 1
+
+    with pytest.raises(urllib.error.HTTPError) as e:
+        urllib.request.urlopen(f"{url}/other")
+    assert e.value.code == 404
+
+
+def test_polls_on_schedule():
+    poller = FakePoller([_result({"A": {"totalunitpower": 1664}})])
+    exporter = Exporter(None, interval=0.01, poller=poller)
+    exporter.start()
+    try:
+        assert poller.wait_for_polls(3)
+    finally:
+        exporter.close()
+    assert poller.logins == 1
+
+
+def test_close_stops_polling(served):
+    exporter, poller, url = served
+    exporter.close()
+    polls = poller.polls
+    time.sleep(0.15)
+    assert poller.polls == polls
+    assert poller.closed
+
+
+def test_cli():
+    with mock.patch("waterfurnace.exporter.Exporter") as exporter:
+        result = CliRunner().invoke(
+            cli.main,
+            [
+                "exporter",
+                "-u",
+                "user@example.com",
+                "-p",
+                "pass",
+                "--port",
+                "9100",
+                "--interval",
+                "30",
+            ],
+        )
+    assert result.exit_code == 0, result.output
+    client = exporter.call_args[0][0]
+    assert isinstance(client, wf.WaterFurnace)
+    assert client.sessionid is None
+    assert isinstance(client.instrumentation, MetricsRegistry)
+    assert exporter.call_args[1] == {"interval": 30, "connections": 1}
+    exporter.return_value.serve_forever.assert_called_once_with("", 9100)
@@ -0,0 +1,133 @@
+"""Tests for concurrent writes to many gateways."""
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from waterfurnace import waterfurnace as wf  # noqa: E402
+from waterfurnace.fleet import FleetResult, FleetWriter  # noqa: E402
+from waterfurnace.simulator import SymphonySimulator  # noqa: E402
+
+SETTINGS = {"mode": 2, "cooling_setpoint": 72, "fan_mode": 1}
+
+
+@pytest.fixture
+def sim():
+    with SymphonySimulator(gateways=6, seed=1) as sim:
+        yield sim
+
+
+def settings(sim, gwid):
+    return sim.units[gwid]["activesettings"]
+
+
+class TestFleetWriter:
+    def test_gwids_over_one_login(self, sim):
+        client = sim.client()
+        writer = FleetWriter(client, concurrency=3)
+        result = writer.write([(gwid, SETTINGS) for gwid in sim.gwids])
+
+        assert result.ok, result.errors
+        assert sorted(result.results) == sim.gwids
+        assert len(result.latencies) == 6
+        for gwid in sim.gwids:
+            assert settings(sim, gwid)["activemode"] == 2
+            assert settings(sim, gwid)["coolingsp_read"] == 72
+            assert set(result[gwid].replies) == set(SETTINGS)
+        assert sim.stats["logins"] == 1
+        assert sim.stats["connections"] == 1
+        # mode, cooling setpoint and fan mode for each of the 6
+        assert sim.stats["writes"] == 18
+        client._mux.close()
+
+    def test_clients_keep_their_websockets(self, sim):
+        clients = [sim.client(device=i) for i in range(3)]
+        clients[0].login()
+        mux = clients[0]._mux
+        result = FleetWriter().write([(client, SETTINGS) for client in clients])
+
+        assert result.ok, result.errors
+        assert clients[0] in result
+        assert clients[0]._mux is mux
+        assert sim.stats["connections"] == 3
+        for gwid in ("SIM000000", "SIM000001", "SIM000002"):
+            assert settings(sim, gwid)["fanmode_read"] == 1
+        for client in clients:
+            client._mux.close()
+
+    def test_humidity_of_another_gateway(self, sim):
+        client = sim.client()
+        result = FleetWriter(client).write([("SIM000004", {"humidity": 37})])
+
+        assert result.ok, result.errors
+        assert sim.units["SIM000004"]["tstathumidsetpoint"] == 37
+        assert sim.units["SIM000000"]["tstathumidsetpoint"] != 37
+        client._mux.close()
+
+    def test_reconnects_a_dead_websocket(self, sim):
+        client = sim.client()
+        client.login()
+        sim.disconnect()
+        result = FleetWriter(client).write([("SIM000001", SETTINGS)])
+
+        assert result.ok, result.errors
+        assert sim.stats["connections"] == 2
+        assert sim.stats["logins"] == 1
+        client._mux.close()
+
+    def test_failures_are_per_unit(self):
+        with SymphonySimulator(gateways=3, error_rate=1.0) as sim:
+            client = sim.client()
+            client.login()
+            result = FleetWriter(client).write([(gwid, SETTINGS) for gwid in sim.gwids])
+            client._mux.close()
+
+        assert not result.ok
+        assert sorted(result.failed) == sim.gwids
+        assert isinstance(result["SIM000001"].errors["mode"], wf.WFError)
+
+    def test_login_failure(self, sim):
+        client = sim.client(passwd="wrong")
+        result = FleetWriter(client).write([("SIM000001", SETTINGS)])
+        assert isinstance(result.errors["SIM000001"], wf.WFCredentialError)
+        assert result.failed == ["SIM000001"]
+
+    @pytest.mark.parametrize(
+        ("units", "match"),
+        [
+            ([("SIM000001", {"mode": 9})], "mode must be"),
+            ([("SIM000001", SETTINGS), ("SIM000001", SETTINGS)], "more than once"),
+        ],
+    )
+    def test_validates_before_sending(self, sim, units, match):
+        with pytest.raises(ValueError, match=match):
+            FleetWriter(sim.client()).write(units)
+        assert sim.stats["logins"] == 0
+
+    def test_gwid_needs_a_client(self):
+        with pytest.raises(ValueError, match="needs a FleetWriter client"):
+            FleetWriter().write([("SIM000001", SETTINGS)])
+
+    def test_invalid_concurrency(self):
+        with pytest.raises(ValueError):
+            FleetWriter(concurrency=0)
+
+    def test_nothing_to_write(self):
+        result = FleetWriter().write([])
+        assert isinstance(result, FleetResult)
+        assert result.ok
+        assert len(result) == 0
+
+    def test_time_scales_with_concurrency(self):
+        """30 units, 20ms a write: ~0.6s one at a time, ~60ms ten at once."""
+        with SymphonySimulator(gateways=30, latency=0.02) as sim:
+            client = sim.client()
+            client.login()
+            units = [(gwid, SETTINGS) for gwid in sim.gwids]
+            serial = FleetWriter(client, concurrency=1).write(units)
+            parallel = FleetWriter(client, concurrency=10).write(units)
+            client._mux.close()
+
+        assert serial.ok and parallel.ok
+        assert serial.elapsed >= 30 * 0.02
+        assert parallel.elapsed < serial.elapsed / 3
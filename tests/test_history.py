@@ -0,0 +1,148 @@
+"""Tests for the ring buffer reading history."""
+
+import math
+import random
+import statistics
+import tracemalloc
+from collections import deque
+
+import pytest
+
+from waterfurnace import waterfurnace as wf
+from waterfurnace.history import HISTORY_FIELDS, HistoryStore, ReadingHistory
+
+
+def _reading(power, awlid="GW", **kwargs):
+    return wf.WFReading({"awlid": awlid, "totalunitpower": power, **kwargs})
+
+
+def _brute(values, times, now, seconds):
+    window = [
+        v
+        for v, t in zip(values, times, strict=True)
+        if t >= now - seconds and v is not None
+    ]
+    if not window:
+        return None, None, None
+    return statistics.fmean(window), min(window), max(window)
+
+
+class TestReadingHistory:
+    def test_append_and_columns(self):
+        history = ReadingHistory(capacity=4)
+        for n in range(3):
+            history.append(_reading(n * 100, tstatroomtemp=70.0 + n), timestamp=n)
+        assert len(history) == 3
+        assert history.latest_time == 2
+        assert list(history.timestamps()) == [0, 1, 2]
+        assert list(history.column("totalunitpower")) == [0, 100, 200]
+        assert list(history.column("tstatroomtemp")) == [70.0, 71.0, 72.0]
+        assert math.isnan(history.column("fanpower")[0])
+
+    def test_wraps_at_capacity(self):
+        history = ReadingHistory(capacity=4)
+        for n in range(10):
+            history.append(_reading(n), timestamp=n)
+        assert len(history) == 4
+        assert list(history.timestamps()) == [6, 7, 8, 9]
+        assert list(history.column("totalunitpower")) == [6, 7, 8, 9]
+        # a window longer than the buffer only sees what is kept
+        assert history.min("totalunitpower", 3600) == 6
+        assert history.mean("totalunitpower", 3600) == 7.5
+
+    def test_windows(self):
+        history = ReadingHistory(capacity=100)
+        for n, power in enumerate([5, 1, 4, 2, 3]):
+            history.append(_reading(power), timestamp=n * 10)
+        assert history.mean("totalunitpower", 20) == 3
+        assert history.min("totalunitpower", 20) == 2
+        assert history.max("totalunitpower", 20) == 4
+        history.append(_reading(None), timestamp=50)
+        assert history.window("totalunitpower", 20).count == 2
+        assert history.mean("totalunitpower", 20) == 2.5
+        history.append(_reading(None), timestamp=100)
+        assert history.mean("totalunitpower", 20) is None
+        assert history.max("totalunitpower", 20) is None
+
+    def test_windows_match_brute_force(self):
+        rng = random.Random(3)
+        history = ReadingHistory(capacity=50)
+        values, times = [], []
+        now = 0.0
+        for _ in range(500):
+            now += rng.choice([1, 5, 15, 60])
+            value = None if rng.random() < 0.1 else rng.randint(0, 5000)
+            history.append(_reading(value), timestamp=now)
+            values.append(value)
+            times.append(now)
+            kept = slice(-50, None)
+            for seconds in (30, 300, 3600):
+                expected = _brute(values[kept], times[kept], now, seconds)
+                window = history.window("totalunitpower", seconds)
+                assert window.min == expected[1]
+                assert window.max == expected[2]
+                if expected[0] is None:
+                    assert window.mean is None
+                else:
+                    assert window.mean == pytest.approx(expected[0])
+
+    def test_window_created_late_catches_up(self):
+        history = ReadingHistory(capacity=10)
+        for n in range(20):
+            history.append(_reading(n), timestamp=n)
+        assert history.max("totalunitpower", 3) == 19
+        assert history.min("totalunitpower", 3) == 16
+
+    def test_out_of_order(self):
+        history = ReadingHistory()
+        history.append(_reading(1), timestamp=10)
+        with pytest.raises(ValueError, match="older than"):
+            history.append(_reading(1), timestamp=9)
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            ReadingHistory(capacity=0)
+        with pytest.raises(ValueError, match="bogus"):
+            ReadingHistory(fields=["bogus"])
+        history = ReadingHistory(fields=["totalunitpower"])
+        with pytest.raises(KeyError):
+            history.mean("fanpower", 60)
+
+
+def test_store_per_gateway():
+    store = HistoryStore(capacity=10)
+    store.append(_reading(1, awlid="A"), timestamp=1)
+    store.append(_reading(2, awlid="B"), timestamp=1)
+    store.append(_reading(3), gwid="A", timestamp=2)
+    assert sorted(store) == ["A", "B"]
+    assert "A" in store
+    assert list(store["A"].column("totalunitpower")) == [1, 3]
+    assert store["B"].capacity == 10
+    assert store["A"].fields == HISTORY_FIELDS
+
+
+@pytest.mark.benchmark
+def test_history_memory(sample_reading_data):
+    """A day of 15s readings: a deque of WFReading vs a ReadingHistory."""
+    count = 5760
+    data = [
+        dict(sample_reading_data, totalunitpower=1500 + n % 300) for n in range(count)
+    ]
+
+    def list_of_objects():
+        return deque((n * 15, wf.WFReading(raw)) for n, raw in enumerate(data))
+
+    def ring():
+        history = ReadingHistory(count)
+        for n, raw in enumerate(data):
+            history.append(wf.WFReading(raw), timestamp=n * 15)
+        return history
+
+    held = {}
+    for name, func in [("list", list_of_objects), ("ring", ring)]:
+        tracemalloc.start()
+        kept = func()
+        held[name] = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del kept
+    assert held["ring"] < held["list"] / 2, held
@@ -0,0 +1,154 @@
+"""Tests for the pooled HTTP sessions."""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import pytest
+import requests
+
+from waterfurnace import waterfurnace as wf
+
+ENERGY = {
+    "columns": ["total_power"],
+    "index": [1767578400000],
+    "data": [[0.58]],
+}
+
+
+class StubSymphonyHandler(BaseHTTPRequestHandler):
+    """Just enough of Symphony to log in, check a session and get energy."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, body, cookie=None):
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        if cookie:
+            self.send_header("Set-Cookie", cookie)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        with self.server.lock:
+            self.server.logins += 1
+            sessionid = f"session-{self.server.logins}"
+        self._reply({}, cookie=f"sessionid={sessionid}; path=/")
+
+    def do_GET(self):
+        if self.path.startswith("/api.php/user"):
+            self._reply({"emailaddress": "test@example.com"})
+        else:
+            self._reply(ENERGY)
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubSymphonyHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.logins = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _client(base_url, **kwargs):
+    return wf.SymphonyGeothermal(
+        base_url,
+        f"{base_url}/account/login",
+        "ws://unused",
+        "test@example.com",
+        "password",
+        **kwargs,
+    )
+
+
+class TestHTTPSessionPool:
+    def test_one_session_per_base_url(self):
+        pool = wf.HTTPSessionPool()
+        assert pool.get("https://a") is pool.get("https://a")
+        assert pool.get("https://a") is not pool.get("https://b")
+        pool.close()
+
+    def test_clients_share_default_pool(self):
+        first = wf.WaterFurnace("a@example.com", "password")
+        second = wf.WaterFurnace("b@example.com", "password")
+        assert first.http is second.http
+        assert first.http is not wf.GeoStar("c@example.com", "password").http
+
+    def test_pool_size_limits(self):
+        pool = wf.HTTPSessionPool(pool_connections=2, pool_maxsize=3, block=True)
+        adapter = pool.get("https://a").get_adapter("https://a/account/login")
+        assert adapter._pool_connections == 2
+        assert adapter._pool_maxsize == 3
+        assert adapter._pool_block is True
+        pool.close()
+
+    def test_injected_session(self):
+        session = mock.MagicMock()
+        session.post.return_value = mock.MagicMock(cookies={"sessionid": "abc"})
+        client = wf.WaterFurnace("test@example.com", "password", http_session=session)
+        client._get_session_id()
+        assert client.sessionid == "abc"
+        assert session.post.called
+
+    def test_injected_into_pool(self):
+        pool = wf.HTTPSessionPool()
+        session = requests.Session()
+        pool.set("https://a", session)
+        assert _client("https://a", http_pool=pool).http is session
+        pool.close()
+
+
+class TestConnectionReuse:
+    def test_calls_reuse_one_connection(self, stub_server):
+        base_url = f"http://127.0.0.1:{stub_server.server_port}"
+        pool = wf.HTTPSessionPool()
+        clients = [_client(base_url, http_pool=pool) for _ in range(3)]
+
+        for client in clients:
+            client._get_session_id()
+            client._check_session_id()
+            client.gwid = "ABC123456"
+            energy = client.get_energy_data("2026-01-03", "2026-01-04")
+            assert len(energy) == 1
+
+        assert stub_server.logins == 3
+        assert stub_server.connections == 1
+        pool.close()
+
+    def test_cookies_not_shared_between_clients(self, stub_server):
+        base_url = f"http://127.0.0.1:{stub_server.server_port}"
+        pool = wf.HTTPSessionPool()
+        first = _client(base_url, http_pool=pool)
+        second = _client(base_url, http_pool=pool)
+        first._get_session_id()
+        second._get_session_id()
+
+        assert first.sessionid == "session-1"
+        assert second.sessionid == "session-2"
+        assert len(pool.get(base_url).cookies) == 0
+        pool.close()
+
+    def test_unpooled_requests_open_new_connections(self, stub_server):
+        base_url = f"http://127.0.0.1:{stub_server.server_port}"
+        for _ in range(3):
+            requests.get(f"{base_url}/api.php/user", timeout=wf.TIMEOUT)
+        assert stub_server.connections == 3
@@ -0,0 +1,261 @@
+"""Tests for phase timings and counters."""
+
+import json
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from waterfurnace import waterfurnace as wf
+from waterfurnace.instrumentation import (
+    NULL_INSTRUMENTATION,
+    Histogram,
+    Instrumentation,
+    MetricsRegistry,
+    OpenTelemetryHooks,
+)
+
+GWID = "ABC123456"
+
+
+def wait_for(predicate, timeout=5):
+    """Wait for the receive thread, which times a reply after handing it over."""
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return predicate()
+
+
+class FakeSpan:
+    def __init__(self, tracer, name, start_time=None, attributes=None):
+        self.tracer = tracer
+        self.name = name
+        self.start_time = start_time
+        self.end_time = None
+        self.attributes = attributes or {}
+        self.parent = tracer.current
+
+    def end(self, end_time=None):
+        self.end_time = end_time
+        self.tracer.ended.append(self)
+
+
+class FakeTracer:
+    """Just the Tracer methods OpenTelemetryHooks uses."""
+
+    def __init__(self):
+        self.current = None
+        self.ended = []
+
+    def start_span(self, name, start_time=None, attributes=None):
+        return FakeSpan(self, name, start_time, attributes)
+
+    def start_as_current_span(self, name, attributes=None):
+        tracer = self
+
+        class Current:
+            def __enter__(self):
+                self.span = FakeSpan(tracer, name, time.time_ns(), attributes)
+                tracer.current = self.span
+                return self.span
+
+            def __exit__(self, *exc):
+                tracer.current = self.span.parent
+                self.span.end(time.time_ns())
+
+        return Current()
+
+
+@pytest.fixture
+def client(mock_requests_post, create_mock_websocket, sample_login_response):
+    """A client with a MetricsRegistry, its websocket answering 3 reads."""
+
+    def connect(*args, **kwargs):
+        return create_mock_websocket(
+            [json.dumps(sample_login_response)]
+            + [
+                json.dumps({"err": "", "awlid": GWID, "totalunitpower": n})
+                for n in (1, 2, 3)
+            ]
+        )
+
+    with mock.patch("websocket.create_connection", side_effect=connect):
+        client = wf.WaterFurnace(
+            "test@example.com", "password", instrumentation=MetricsRegistry()
+        )
+        client.login()
+        yield client
+
+
+class TestHistogram:
+    def test_buckets(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+        assert histogram.counts == [2, 1, 1]
+        assert histogram.count == 4
+        assert histogram.sum == pytest.approx(2.65)
+        assert histogram.mean == pytest.approx(0.6625)
+
+    def test_quantile(self):
+        histogram = Histogram((1.0, 2.0, 4.0))
+        assert histogram.quantile(0.5) is None
+        for value in (0.5, 1.5, 1.5, 3.0):
+            histogram.observe(value)
+        # rank 2 of 4 is half way through the (1, 2] bucket
+        assert histogram.quantile(0.5) == pytest.approx(1.5)
+        assert histogram.quantile(1) == pytest.approx(4.0)
+        histogram.observe(100)
+        assert histogram.quantile(1) == 4.0
+        with pytest.raises(ValueError):
+            histogram.quantile(1.5)
+
+
+class TestMetricsRegistry:
+    def test_phases_and_counters(self):
+        registry = MetricsRegistry()
+        with registry.phase("send", "A"):
+            pass
+        registry.observe("send", 0.5, "A")
+        registry.observe("send", 0.5, "B")
+        registry.count("bytes_out", 10, "A")
+        registry.count("bytes_out", 5, "A")
+        assert registry.histogram("send", "A").count == 2
+        assert registry.histogram("recv", "A") is None
+        assert registry.counter("bytes_out", "A") == 15
+        assert registry.counter("bytes_out", "B") == 0
+        histograms, counters = registry.collect()
+        assert set(histograms) == {("send", "A"), ("send", "B")}
+        assert counters == {("bytes_out", "A"): 15}
+        registry.reset()
+        assert registry.collect() == ({}, {})
+
+    def test_phase_timed_when_it_fails(self):
+        registry = MetricsRegistry()
+        with pytest.raises(RuntimeError), registry.phase("http_login"):
+            raise RuntimeError()
+        assert registry.histogram("http_login").count == 1
+
+    def test_threads(self):
+        registry = MetricsRegistry()
+
+        def work():
+            for _ in range(1000):
+                registry.observe("recv", 0.001, "A")
+                registry.count("bytes_in", 1, "A")
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert registry.histogram("recv", "A").count == 4000
+        assert registry.counter("bytes_in", "A") == 4000
+
+
+class TestClient:
+    def test_default_is_null(self):
+        client = wf.WaterFurnace("test@example.com", "password")
+        assert client.instrumentation is NULL_INSTRUMENTATION
+
+    def test_login_and_read(self, client):
+        registry = client.instrumentation
+        assert registry.histogram("http_login").count == 1
+        assert registry.histogram("ws_connect").count == 1
+        assert registry.histogram("ws_login").count == 1
+        # counted once the login reply says which gateway it is
+        login_bytes = registry.counter("bytes_in", GWID)
+        assert login_bytes > 0
+
+        sent = client._mux.ws.sent_messages
+        client.read()
+        client.read()
+        assert wait_for(lambda: registry.histogram("decode", GWID).count == 2)
+        for phase in ("send", "recv", "decode", "model"):
+            assert registry.histogram(phase, GWID).count == 2, phase
+        assert registry.counter("bytes_out", GWID) == sum(len(m) for m in sent)
+        assert registry.counter("bytes_in", GWID) > login_bytes
+
+    def test_timeouts_and_retries(self, client):
+        registry = client.instrumentation
+        client._abort()
+        assert registry.counter("timeouts", GWID) == 1
+        with (
+            mock.patch.object(client, "read", side_effect=wf.WFWebsocketClosedError),
+            pytest.raises(wf.WFWebsocketClosedError),
+        ):
+            client.read_with_retry(block=False)
+        assert registry.counter("retries", GWID) == 1
+
+    def test_energy(self, client, sample_energy_data_hourly):
+        body = json.dumps(sample_energy_data_hourly)
+        res = mock.MagicMock(content=body.encode(), text=body)
+        with mock.patch("requests.Session.get", return_value=res):
+            client.get_energy_data("2026-01-03", "2026-01-04")
+        registry = client.instrumentation
+        assert registry.histogram("energy", GWID).count == 1
+        assert registry.counter("bytes_in", GWID) >= len(body)
+
+    def test_custom_hooks(self, client):
+        class Recorder(Instrumentation):
+            def __init__(self):
+                self.phases = []
+
+            def observe(self, phase, seconds, gwid=None):
+                self.phases.append((phase, gwid))
+
+        client.instrumentation = client._mux.instrumentation = Recorder()
+        client.read()
+        assert wait_for(lambda: len(client.instrumentation.phases) == 4)
+        # the reply can be received before send() returns
+        assert sorted(client.instrumentation.phases) == [
+            ("decode", GWID),
+            ("model", GWID),
+            ("recv", GWID),
+            ("send", GWID),
+        ]
+
+    def test_failing_hooks_keep_the_reply(self, client, caplog):
+        class Broken(Instrumentation):
+            def count(self, name, value=1, gwid=None):
+                if name == "bytes_in":
+                    raise RuntimeError("exporter down")
+
+        client._mux.instrumentation = Broken()
+        start = time.monotonic()
+        assert client.read(timeout=5).awlid == GWID
+        assert time.monotonic() - start < 1
+        assert wait_for(lambda: "Instrumentation failed" in caplog.text)
+        assert client.read(timeout=5).awlid == GWID
+
+
+class TestOpenTelemetryHooks:
+    def test_spans(self):
+        tracer = FakeTracer()
+        registry = MetricsRegistry()
+        hooks = OpenTelemetryHooks(tracer, metrics=registry)
+        with hooks.phase("http_login"), hooks.phase("ws_connect", GWID):
+            pass
+        hooks.observe("recv", 0.25, GWID)
+        hooks.count("bytes_in", 10, GWID)
+
+        connect, login, recv = tracer.ended
+        assert connect.name == "waterfurnace.ws_connect"
+        assert connect.parent is login
+        assert connect.attributes == {"waterfurnace.gwid": GWID}
+        assert login.attributes == {}
+        assert recv.name == "waterfurnace.recv"
+        assert recv.parent is None
+        assert recv.end_time - recv.start_time == 250_000_000
+        assert registry.histogram("ws_connect", GWID).count == 1
+        assert registry.counter("bytes_in", GWID) == 10
+
+    def test_needs_opentelemetry(self):
+        try:
+            import opentelemetry  # noqa: F401
+        except ImportError:
+            with pytest.raises(ImportError, match="opentelemetry-api"):
+                OpenTelemetryHooks()
+        else:
+            assert OpenTelemetryHooks().tracer is not None
@@ -0,0 +1,225 @@
+"""Tests for the account level poller."""
+
+import heapq
+import json
+import threading
+import time
+from unittest import mock
+
+import pytest
+import websocket
+
+from waterfurnace import waterfurnace as wf
+from waterfurnace.poller import AccountPoller
+
+
+class LatencyWebsocket:
+    """Fake Symphony websocket answering each request after `latency` seconds."""
+
+    def __init__(self, login_response, latency=0.0, failing=()):
+        self.login_response = login_response
+        self.latency = latency
+        self.failing = set(failing)
+        self.cond = threading.Condition()
+        self.replies = []
+        self.sent = []
+        self.closed = False
+
+    def send(self, message):
+        req = json.loads(message)
+        with self.cond:
+            if self.closed:
+                raise websocket.WebSocketConnectionClosedException()
+            self.sent.append(req)
+            delay = 0.0 if req["cmd"] == "login" else self.latency
+            heapq.heappush(
+                self.replies, (time.monotonic() + delay, len(self.sent), req)
+            )
+            self.cond.notify_all()
+
+    def _reply(self, req):
+        if req["cmd"] == "login":
+            return self.login_response
+        if req["awlid"] in self.failing:
+            return {"rsp": "read", "tid": req["tid"], "err": "gateway offline"}
+        return {
+            "rsp": "read",
+            "tid": req["tid"],
+            "err": "",
+            "awlid": req["awlid"],
+            "totalunitpower": 1000,
+        }
+
+    def recv(self):
+        with self.cond:
+            while True:
+                if self.closed:
+                    raise websocket.WebSocketConnectionClosedException()
+                if self.replies:
+                    ready, _, req = self.replies[0]
+                    wait = ready - time.monotonic()
+                    if wait <= 0:
+                        heapq.heappop(self.replies)
+                        return json.dumps(self._reply(req))
+                    self.cond.wait(wait)
+                else:
+                    self.cond.wait()
+
+    def abort(self):
+        self.close()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+def _login_response(count):
+    return {
+        "err": "",
+        "locations": [
+            {
+                "description": "Home",
+                "gateways": [{"gwid": f"HOME-{n}"} for n in range(count - count // 2)],
+            },
+            {
+                "description": "Office",
+                "gateways": [{"gwid": f"OFFICE-{n}"} for n in range(count // 2)],
+            },
+        ],
+    }
+
+
+@pytest.fixture
+def fake_symphony():
+    """Patch HTTP login and hand out LatencyWebsockets; yields a config dict."""
+    config = {"count": 4, "latency": 0.0, "failing": (), "sockets": []}
+
+    def connect(*args, **kwargs):
+        ws = LatencyWebsocket(
+            _login_response(config["count"]), config["latency"], config["failing"]
+        )
+        config["sockets"].append(ws)
+        return ws
+
+    with (
+        mock.patch("requests.Session.post") as mock_post,
+        mock.patch("websocket.create_connection", side_effect=connect),
+    ):
+        mock_post.return_value = mock.MagicMock(cookies={"sessionid": "sess"})
+        config["post"] = mock_post
+        yield config
+
+
+class TestAccountPoller:
+    def test_polls_every_gateway_with_one_login(self, fake_symphony):
+        poller = AccountPoller(wf.WaterFurnace("test@example.com", "password"))
+        poller.login()
+        result = poller.poll()
+
+        assert sorted(result.readings) == ["HOME-0", "HOME-1", "OFFICE-0", "OFFICE-1"]
+        assert not result.errors
+        assert isinstance(result["OFFICE-1"], wf.WFReading)
+        assert result["OFFICE-1"].awlid == "OFFICE-1"
+        assert fake_symphony["post"].call_count == 1
+        assert len(fake_symphony["sockets"]) == 1
+        reads = [r for r in fake_symphony["sockets"][0].sent if r["cmd"] == "read"]
+        assert sorted(r["awlid"] for r in reads) == sorted(result.readings)
+        poller.close()
+
+    def test_error_isolation(self, fake_symphony):
+        fake_symphony["failing"] = ("HOME-1",)
+        poller = AccountPoller(wf.WaterFurnace("test@example.com", "password"))
+        poller.login()
+        result = poller.poll()
+
+        assert "HOME-1" not in result
+        assert isinstance(result.errors["HOME-1"], wf.WFError)
+        assert len(result) == 3
+        poller.close()
+
+    def test_connection_pool(self, fake_symphony):
+        fake_symphony["count"] = 6
+        poller = AccountPoller(
+            wf.WaterFurnace("test@example.com", "password"), connections=3
+        )
+        poller.login()
+        result = poller.poll()
+
+        assert len(result) == 6
+        assert fake_symphony["post"].call_count == 1
+        assert len(fake_symphony["sockets"]) == 3
+        for ws in fake_symphony["sockets"]:
+            assert len([r for r in ws.sent if r["cmd"] == "read"]) == 2
+        poller.close()
+
+    def test_pool_connections_share_settings(self, fake_symphony):
+        scheduler = wf.DeadlineScheduler()
+        policy = wf.RetryPolicy(threshold=2)
+        client = wf.WaterFurnace(
+            "test@example.com",
+            "password",
+            request_timeout=3.5,
+            scheduler=scheduler,
+            retry_policy=policy,
+            settings_max_age=7,
+        )
+        poller = AccountPoller(client, connections=3)
+        poller.login()
+
+        for conn in poller._clients[1:]:
+            assert conn.request_timeout == 3.5
+            assert conn.scheduler is scheduler
+            assert conn.retry_policy is policy
+            assert conn.settings_cache.max_age == 7
+        poller.close()
+
+    def test_reconnects_dead_connection(self, fake_symphony):
+        poller = AccountPoller(wf.WaterFurnace("test@example.com", "password"))
+        poller.login()
+        fake_symphony["sockets"][0].close()
+        result = poller.poll()
+        assert len(result) == 4
+        assert len(fake_symphony["sockets"]) == 2
+        poller.close()
+
+    def test_timeout_only_fails_that_cycle(self, fake_symphony):
+        fake_symphony["latency"] = 0.5
+        poller = AccountPoller(
+            wf.WaterFurnace("test@example.com", "password"), timeout=0.1
+        )
+        poller.login()
+        result = poller.poll()
+        assert len(result.errors) == 4
+        assert all(
+            isinstance(e, wf.WFWebsocketClosedError) for e in result.errors.values()
+        )
+
+        fake_symphony["latency"] = 0.0
+        poller.timeout = 5
+        assert len(poller.poll()) == 4
+        poller.close()
+
+    def test_open_circuit_skips_gateway(self, fake_symphony):
+        fake_symphony["failing"] = ("HOME-1",)
+        client = wf.WaterFurnace(
+            "test@example.com", "password", retry_policy=wf.RetryPolicy(threshold=2)
+        )
+        poller = AccountPoller(client)
+        poller.login()
+        for _ in range(2):
+            assert not isinstance(poller.poll().errors["HOME-1"], wf.WFCircuitOpenError)
+        assert client.breaker("HOME-1").state == wf.CircuitBreaker.OPEN
+
+        result = poller.poll()
+        assert isinstance(result.errors["HOME-1"], wf.WFCircuitOpenError)
+        assert len(result) == 3
+        reads = [r for r in fake_symphony["sockets"][0].sent if r["cmd"] == "read"]
+        assert [r["awlid"] for r in reads].count("HOME-1") == 2
+        assert client.breaker("HOME-0").state == wf.CircuitBreaker.CLOSED
+        poller.close()
+
+    def test_poll_requires_login(self):
+        poller = AccountPoller(wf.WaterFurnace("test@example.com", "password"))
+        with pytest.raises(wf.WFError):
+            poller.poll()
@@ -0,0 +1,192 @@
+"""Tests for the retry policy and per-gateway circuit breakers."""
+
+import asyncio
+import random
+import time
+from unittest import mock
+
+import pytest
+import requests
+
+from waterfurnace import waterfurnace as wf
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _breaker(threshold=3, **kwargs):
+    clock = FakeClock()
+    policy = wf.RetryPolicy(jitter=0, threshold=threshold, **kwargs)
+    return wf.CircuitBreaker(policy, clock=clock), clock
+
+
+class TestRetryPolicy:
+    def test_exponential_with_cap(self):
+        policy = wf.RetryPolicy(base=10, factor=2, cap=60, jitter=0)
+        delays = [policy.backoff(n) for n in range(7)]
+        assert delays == [0.0, 10, 20, 40, 60, 60, 60]
+        assert policy.backoff(10_000) == 60
+
+    def test_jitter(self):
+        policy = wf.RetryPolicy(base=10, jitter=0.5, rng=random.Random(1))
+        delays = {policy.backoff(1) for _ in range(100)}
+        assert all(5 <= d <= 10 for d in delays)
+        assert len(delays) > 50
+
+    @pytest.mark.parametrize(
+        "kwargs", [{"jitter": -0.1}, {"jitter": 1.5}, {"threshold": 0}]
+    )
+    def test_invalid(self, kwargs):
+        with pytest.raises(ValueError):
+            wf.RetryPolicy(**kwargs)
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold(self):
+        breaker, clock = _breaker(base=10)
+        for _ in range(2):
+            assert breaker.allow()
+            breaker.record_failure()
+        assert breaker.state == wf.CircuitBreaker.CLOSED
+        assert breaker.retry_in == 0
+        assert breaker.record_failure() == 40
+        assert breaker.state == wf.CircuitBreaker.OPEN
+        assert not breaker.allow()
+        assert breaker.retry_in == 40
+
+    def test_half_open_allows_one_trial(self):
+        breaker, clock = _breaker(threshold=1, base=10)
+        breaker.record_failure()
+        clock.now += 10
+        assert breaker.state == wf.CircuitBreaker.HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.record_success()
+        assert breaker.state == wf.CircuitBreaker.CLOSED
+        assert breaker.failures == 0
+        assert breaker.allow()
+
+    def test_failed_trial_backs_off_further(self):
+        breaker, clock = _breaker(threshold=1, base=10)
+        breaker.record_failure()
+        clock.now += 10
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == wf.CircuitBreaker.OPEN
+        assert breaker.retry_in == 20
+
+    def test_per_gateway(self, mock_waterfurnace_client):
+        client = mock_waterfurnace_client
+        assert client.breaker() is client.breaker(client.gwid)
+        assert client.breaker("OTHER") is not client.breaker()
+        assert client.breaker().policy is client.retry_policy
+
+
+@pytest.fixture
+def failing_client(mock_waterfurnace_client):
+    """A logged in client whose reads fail until ``ok`` is set.
+
+    time.sleep is patched to advance the breaker's clock instead.
+    """
+    client = mock_waterfurnace_client
+    client.retry_policy = wf.RetryPolicy(base=10, cap=60, jitter=0)
+    clock = FakeClock()
+    client.breakers[client.gwid] = wf.CircuitBreaker(client.retry_policy, clock)
+    state = {"ok": False, "reads": 0, "sleeps": []}
+
+    def read(sensors=None):
+        state["reads"] += 1
+        if not state["ok"]:
+            raise wf.WFWebsocketClosedError("down")
+        return mock.sentinel.reading
+
+    def sleep(seconds):
+        state["sleeps"].append(seconds)
+        clock.now += seconds
+        if len(state["sleeps"]) == state.get("recover_after"):
+            state["ok"] = True
+
+    with (
+        mock.patch.object(client, "read", side_effect=read),
+        mock.patch.object(client, "login"),
+        mock.patch("time.sleep", side_effect=sleep),
+    ):
+        yield client, state
+
+
+class TestReadWithRetry:
+    def test_blocking_backs_off(self, failing_client):
+        client, state = failing_client
+        state["recover_after"] = 4
+        assert client.read_with_retry() is mock.sentinel.reading
+        # the last two are waits for the open breaker
+        assert state["sleeps"] == [10, 20, 40, 60]
+        assert client.fails == 0
+        assert client.breaker().state == wf.CircuitBreaker.CLOSED
+
+    def test_blocking_gives_up(self, failing_client):
+        client, state = failing_client
+        with pytest.raises(wf.WFWebsocketClosedError, match="after retries"):
+            client.read_with_retry()
+        assert state["reads"] == client.max_fails + 1
+        assert state["sleeps"] == [10, 20, 40, 60, 60]
+
+    def test_non_blocking(self, failing_client):
+        client, state = failing_client
+        for _ in range(3):
+            with pytest.raises(wf.WFWebsocketClosedError, match="down"):
+                client.read_with_retry(block=False)
+        # open: fails fast without touching the gateway
+        with pytest.raises(wf.WFCircuitOpenError) as exc:
+            client.read_with_retry(block=False)
+        assert state["sleeps"] == []
+        assert state["reads"] == 3
+        assert exc.value.gwid == client.gwid
+        assert exc.value.retry_in == 40
+
+        client.breaker()._clock.now += 40
+        state["ok"] = True
+        assert client.read_with_retry(block=False) is mock.sentinel.reading
+        assert client.breaker().state == wf.CircuitBreaker.CLOSED
+
+    def test_relogin_failure_counts(self, failing_client):
+        client, state = failing_client
+        client.fails = 1
+        client.login.side_effect = requests.exceptions.ConnectionError()
+        with pytest.raises(requests.exceptions.ConnectionError):
+            client.read_with_retry(block=False)
+        assert client.breaker().failures == 1
+        assert state["reads"] == 0
+
+
+@pytest.fixture
+def fake_async_client():
+    aio = pytest.importorskip("waterfurnace.aio")
+    client = aio.AsyncWaterFurnace("test@example.com", "password")
+    client.gwid = "GW"
+
+    async def read(sensors=None):
+        raise wf.WFWebsocketClosedError("down")
+
+    client.read = read
+    return client
+
+
+def test_async_non_blocking(fake_async_client):
+    client = fake_async_client
+    client.retry_policy = wf.RetryPolicy(threshold=1)
+
+    async def scenario():
+        with pytest.raises(wf.WFWebsocketClosedError):
+            await client.read_with_retry(block=False)
+        start = time.monotonic()
+        with pytest.raises(wf.WFCircuitOpenError):
+            await client.read_with_retry(block=False)
+        assert time.monotonic() - start < 0.1
+
+    asyncio.run(scenario())
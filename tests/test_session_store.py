@@ -0,0 +1,174 @@
+"""Tests for the on-disk session store."""
+
+import json
+import os
+import stat
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from waterfurnace import waterfurnace as wf
+from waterfurnace.session_store import SessionStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SessionStore(str(tmp_path / "sessions.json"))
+
+
+class TestSessionStore:
+    def test_empty(self, store):
+        with store.lock():
+            assert store.get("waterfurnace", "a@example.com") is None
+
+    def test_put_get(self, store):
+        with store.lock():
+            store.put("waterfurnace", "a@example.com", "sess-a")
+            store.put("geostar", "a@example.com", "sess-b")
+            assert store.get("waterfurnace", "a@example.com").sessionid == "sess-a"
+            assert store.get("geostar", "a@example.com").sessionid == "sess-b"
+
+    def test_file_is_private(self, store):
+        with store.lock():
+            store.put("waterfurnace", "a@example.com", "sess-a")
+        assert stat.S_IMODE(os.stat(store.path).st_mode) == 0o600
+
+    def test_invalidate(self, store):
+        with store.lock():
+            store.put("waterfurnace", "a@example.com", "sess-a")
+        store.invalidate("waterfurnace", "a@example.com")
+        with store.lock():
+            assert store.get("waterfurnace", "a@example.com") is None
+
+    def test_freshness(self, store):
+        now = time.time()
+        with store.lock():
+            store.put("waterfurnace", "a@example.com", "sess-a", validated_at=now)
+            entry = store.get("waterfurnace", "a@example.com")
+        assert store.is_fresh(entry, now + 10)
+        assert not store.is_fresh(entry, now + store.validate_interval + 1)
+
+    def test_corrupt_file(self, store):
+        with open(store.path, "w") as f:
+            f.write("{not json")
+        with store.lock():
+            assert store.get("waterfurnace", "a@example.com") is None
+
+
+@pytest.fixture
+def ws_login(sample_login_response, create_mock_websocket):
+    with mock.patch("websocket.create_connection") as mock_ws:
+        mock_ws.side_effect = lambda *a, **kw: create_mock_websocket(
+            recv_data=[json.dumps(sample_login_response)]
+        )
+        yield mock_ws
+
+
+class TestLoginWithStore:
+    def test_first_login_populates_store(self, store, ws_login, create_mock_response):
+        with mock.patch("requests.Session.post") as mock_post:
+            mock_post.return_value = create_mock_response(
+                cookies={"sessionid": "sess-1"}
+            )
+            client = wf.WaterFurnace("a@example.com", "pw", session_store=store)
+            client.login()
+
+        with store.lock():
+            assert store.get("waterfurnace", "a@example.com").sessionid == "sess-1"
+
+    def test_fresh_entry_skips_http(self, store, ws_login):
+        with store.lock():
+            store.put("waterfurnace", "a@example.com", "sess-1")
+
+        with (
+            mock.patch("requests.Session.post") as mock_post,
+            mock.patch("requests.Session.get") as mock_get,
+        ):
+            client = wf.WaterFurnace("a@example.com", "pw", session_store=store)
+            client.login()
+
+        assert client.sessionid == "sess-1"
+        assert not mock_post.called
+        assert not mock_get.called
+        assert ws_login.call_count == 1
+
+    def test_stale_entry_is_checked(self, store, ws_login, create_mock_response):
+        with store.lock():
+            store.put("waterfurnace", "a@example.com", "sess-1", validated_at=0)
+
+        with (
+            mock.patch("requests.Session.post") as mock_post,
+            mock.patch("requests.Session.get") as mock_get,
+        ):
+            mock_get.return_value = create_mock_response(
+                json_data={"emailaddress": "a@example.com"}
+            )
+            client = wf.WaterFurnace("a@example.com", "pw", session_store=store)
+            client.login()
+
+        assert client.sessionid == "sess-1"
+        assert mock_get.called
+        assert not mock_post.called
+        with store.lock():
+            entry = store.get("waterfurnace", "a@example.com")
+        assert store.is_fresh(entry)
+
+    def test_stale_invalid_entry_logs_in(self, store, ws_login, create_mock_response):
+        with store.lock():
+            store.put("waterfurnace", "a@example.com", "sess-1", validated_at=0)
+
+        with (
+            mock.patch("requests.Session.post") as mock_post,
+            mock.patch("requests.Session.get") as mock_get,
+        ):
+            mock_get.return_value = create_mock_response(json_data={})
+            mock_post.return_value = create_mock_response(
+                cookies={"sessionid": "sess-2"}
+            )
+            client = wf.WaterFurnace("a@example.com", "pw", session_store=store)
+            client.login()
+
+        assert client.sessionid == "sess-2"
+        with store.lock():
+            assert store.get("waterfurnace", "a@example.com").sessionid == "sess-2"
+
+    def test_websocket_failure_invalidates(self, store):
+        with store.lock():
+            store.put("waterfurnace", "a@example.com", "sess-1")
+
+        with mock.patch("websocket.create_connection") as mock_ws:
+            mock_ws.side_effect = OSError("refused")
+            client = wf.WaterFurnace("a@example.com", "pw", session_store=store)
+            with pytest.raises(OSError):
+                client.login()
+
+        with store.lock():
+            assert store.get("waterfurnace", "a@example.com") is None
+
+    def test_concurrent_logins_share_one_session(
+        self, store, ws_login, create_mock_response
+    ):
+        logins = []
+
+        def slow_post(*args, **kwargs):
+            logins.append(1)
+            time.sleep(0.2)
+            return create_mock_response(cookies={"sessionid": f"sess-{len(logins)}"})
+
+        clients = [
+            wf.WaterFurnace(
+                "a@example.com", "pw", session_store=SessionStore(store.path)
+            )
+            for _ in range(4)
+        ]
+        with mock.patch("requests.Session.post", side_effect=slow_post):
+            threads = [threading.Thread(target=c.login) for c in clients]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        assert len(logins) == 1
+        assert {c.sessionid for c in clients} == {"sess-1"}
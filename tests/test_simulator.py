@@ -0,0 +1,178 @@
+"""Tests for the local Symphony stand-in and its benchmark harness."""
+
+import json
+import time
+
+import pytest
+
+pytest.importorskip("aiohttp")
+from click.testing import CliRunner  # noqa: E402
+
+from waterfurnace import simulator  # noqa: E402
+from waterfurnace import waterfurnace as wf  # noqa: E402
+from waterfurnace.poller import AccountPoller  # noqa: E402
+from waterfurnace.simulator import (  # noqa: E402
+    BenchmarkResult,
+    SymphonySimulator,
+    run_benchmark,
+)
+
+
+@pytest.fixture
+def sim():
+    with SymphonySimulator(gateways=3, seed=1) as sim:
+        yield sim
+
+
+class TestSimulator:
+    def test_login_read_write(self, sim):
+        client = sim.client(device=1)
+        client.login()
+        assert client.gwid == "SIM000001"
+        assert [g.gwid for g in client.devices] == sim.gwids
+
+        reading = client.read()
+        assert reading.awlid == "SIM000001"
+        assert reading.totalunitpower == (
+            reading.compressorpower
+            + reading.fanpower
+            + reading.auxpower
+            + reading.looppumppower
+        )
+        assert client.read(sensors="power").tstatroomtemp is None
+
+        client.set_mode(2)
+        client.set_heating_setpoint(65)
+        client.set_humidity(35)
+        reading = client.read()
+        assert reading.activesettings.activemode == 2
+        assert reading.activesettings.heatingsp_read == 65
+        assert reading.tstathumidsetpoint == 35
+        assert sim.units["SIM000000"]["activesettings"]["activemode"] == 3
+        client._mux.close()
+
+    def test_apply_writes_each_setting(self, sim):
+        client = sim.client()
+        client.login()
+        result = client.apply({"mode": 3, "heating_setpoint": 66, "fan_mode": 1})
+        assert result.ok
+        assert sim.stats["writes"] == 3
+        settings = sim.units["SIM000000"]["activesettings"]
+        assert settings["activemode"] == 3
+        assert settings["heatingsp_read"] == 66
+        assert settings["fanmode_read"] == 1
+        client._mux.close()
+
+    def test_session_is_reused(self, sim):
+        first = sim.client()
+        first.login()
+        second = sim.client(sessionid=first.sessionid)
+        second.login()
+        assert second.sessionid == first.sessionid
+        assert sim.stats["logins"] == 1
+        assert sim.stats["session_checks"] == 1
+        assert sim.stats["connections"] == 2
+
+    def test_bad_password(self, sim):
+        with pytest.raises(wf.WFCredentialError):
+            sim.client(passwd="wrong").login()
+
+    @pytest.mark.parametrize("stream", [False, True])
+    def test_energy(self, sim, stream):
+        client = sim.client()
+        client.login()
+        energy = client.get_energy_data("2026-01-03", "2026-01-04", stream=stream)
+        assert len(energy) == 48
+        assert list(energy.columns) == list(simulator.SIM_ENERGY_COLUMNS)
+        assert energy.sum("total_power") > 0
+
+    def test_dropped_request_times_out(self):
+        with SymphonySimulator(drop_rate=1.0) as sim:
+            client = sim.client(request_timeout=0.2)
+            client.login()
+            start = time.monotonic()
+            with pytest.raises(wf.WFWebsocketClosedError):
+                client.read()
+            assert time.monotonic() - start < 2
+            assert sim.stats["dropped"] == 1
+
+    def test_error_reply(self):
+        with SymphonySimulator(error_rate=1.0) as sim:
+            client = sim.client()
+            client.login()
+            with pytest.raises(wf.WFError, match="Simulated error"):
+                client.set_mode(1)
+            with pytest.raises(wf.WFError):
+                client.get_energy_data("2026-01-03", "2026-01-03")
+
+    def test_latency(self):
+        with SymphonySimulator(latency=0.05, jitter=0.02) as sim:
+            client = sim.client()
+            client.login()
+            start = time.monotonic()
+            client.read()
+            assert 0.05 <= time.monotonic() - start < 0.5
+
+    def test_disconnect_reconnects(self, sim):
+        client = sim.client(retry_policy=wf.RetryPolicy(base=0.01))
+        client.login()
+        sim.disconnect()
+        assert client.read_with_retry().awlid == "SIM000000"
+        assert sim.stats["connections"] == 2
+
+    def test_poller_reads_every_gateway(self, sim):
+        poller = AccountPoller(sim.client(), connections=2)
+        poller.login()
+        result = poller.poll()
+        poller.close()
+        assert sorted(result.readings) == sim.gwids
+        assert not result.errors
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [{"gateways": 0}, {"latency": -1}, {"drop_rate": 2}, {"error_rate": -0.1}],
+    )
+    def test_invalid(self, kwargs):
+        with pytest.raises(ValueError):
+            SymphonySimulator(**kwargs)
+
+
+class TestBenchmark:
+    def test_result(self):
+        result = BenchmarkResult(2, [i / 1000 for i in range(100, 0, -1)], 3, 2.0)
+        assert result.reads == 100
+        assert result.throughput == 50
+        assert result.p50 == pytest.approx(0.0505)
+        assert result.p99 == pytest.approx(0.09901)
+        assert result.as_dict()["errors"] == 3
+        assert BenchmarkResult(1, [], 1, 1.0).p99 is None
+
+    def test_run(self, sim):
+        result = run_benchmark(sim, reads=10)
+        assert result.gateways == 3
+        assert result.reads == 30
+        assert result.errors == 0
+        assert 0 < result.p50 <= result.p99
+        assert sim.stats["reads"] == 30
+
+    def test_run_with_failures(self):
+        with SymphonySimulator(gateways=2, error_rate=0.2, seed=3) as sim:
+            result = run_benchmark(sim, reads=20)
+        assert result.errors > 0
+        assert result.reads + result.errors == 40
+
+    def test_failed_login_is_raised(self, sim):
+        start = time.monotonic()
+        with pytest.raises(wf.WFCredentialError):
+            run_benchmark(sim, reads=10, passwd="wrong")
+        assert time.monotonic() - start < 5
+        assert sim.stats["reads"] == 0
+
+    def test_cli(self):
+        result = CliRunner().invoke(
+            simulator.main, ["--gateways", "2", "--reads", "5", "--json"]
+        )
+        assert result.exit_code == 0, result.output
+        data = json.loads(result.output)
+        assert data["reads"] == 10
+        assert data["p99"] >= data["p50"]
@@ -0,0 +1,243 @@
+"""Tests for streaming readings over a persistent websocket."""
+
+import json
+import threading
+import time
+from unittest import mock
+
+import pytest
+import websocket
+
+from waterfurnace import waterfurnace as wf
+
+
+class StreamWebsocket:
+    """Fake Symphony websocket answering reads at once, until ``reads`` run out."""
+
+    def __init__(self, login_response, reads=None):
+        self.login_response = login_response
+        self.reads = reads
+        # seconds each reply spends on the wire
+        self.latency = 0.0
+        self.cond = threading.Condition()
+        self.replies = []
+        self.sent = []
+        # read numbers answered with an error, and the threads that sent
+        self.errors = set()
+        self.senders = set()
+        self.closed = False
+
+    def send(self, message):
+        req = json.loads(message)
+        with self.cond:
+            if self.closed:
+                raise websocket.WebSocketConnectionClosedException()
+            if req["cmd"] == "read":
+                self.sent.append(time.monotonic())
+                self.senders.add(threading.current_thread().name)
+                if self.reads is not None and len(self.sent) > self.reads:
+                    # dropped by the server
+                    self.closed = True
+                    self.cond.notify_all()
+                    return
+                reply = {"rsp": "read", "tid": req["tid"], "err": ""}
+                reply["totalunitpower"] = len(self.sent)
+                if len(self.sent) in self.errors:
+                    reply["err"] = "unit busy"
+            else:
+                reply = self.login_response
+            self.replies.append(reply)
+            self.cond.notify_all()
+
+    def recv(self):
+        with self.cond:
+            while not self.replies:
+                if self.closed:
+                    raise websocket.WebSocketConnectionClosedException()
+                self.cond.wait()
+            reply = self.replies.pop(0)
+        time.sleep(self.latency)
+        return json.dumps(reply)
+
+    def abort(self):
+        self.close()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+@pytest.fixture
+def sockets(mock_requests_post, sample_login_response):
+    """Each websocket connection gets a StreamWebsocket, the first dies after 3."""
+    created = []
+
+    def connect(*args, **kwargs):
+        ws = StreamWebsocket(sample_login_response, reads=3 if not created else None)
+        created.append(ws)
+        return ws
+
+    with mock.patch("websocket.create_connection", side_effect=connect):
+        yield created
+
+
+@pytest.fixture
+def client(sockets):
+    client = wf.WaterFurnace("test@example.com", "password")
+    client.login()
+    sockets[0].reads = None
+    return client
+
+
+class FakeClock:
+    """Stands in for the time module in waterfurnace.waterfurnace, and for
+    a client's scheduler, so ticks only pass when ``advance`` says so."""
+
+    def __init__(self):
+        self.now = 1000.0
+        # (deadline, callback, args) of every deadline not yet due
+        self.pending = []
+        self.scheduled = []
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+    def __len__(self):
+        return sum(not deadline.cancelled for deadline, _, _ in self.pending)
+
+    def monotonic(self):
+        return self.now
+
+    def schedule(self, delay, callback, *args):
+        deadline = mock.Mock(when=self.now + delay, cancelled=False)
+        deadline.cancel.side_effect = lambda: setattr(deadline, "cancelled", True)
+        self.scheduled.append(deadline.when)
+        if delay <= 0:
+            callback(*args)
+        else:
+            self.pending.append((deadline, callback, args))
+        return deadline
+
+    def advance(self, seconds):
+        """Move the clock on and run what fell due, waiting for the sends."""
+        self.now += seconds
+        due = [entry for entry in self.pending if entry[0].when <= self.now]
+        self.pending = [entry for entry in self.pending if entry not in due]
+        for deadline, callback, args in due:
+            if not deadline.cancelled:
+                callback(*args).result(5)
+
+
+@pytest.fixture
+def clock(client):
+    clock = FakeClock()
+    client.scheduler = clock
+    with mock.patch.object(wf, "time", clock):
+        yield clock
+
+
+class TestStream:
+    def test_readings_on_schedule(self, client, sockets, clock):
+        stream = client.stream(0.05)
+        powers = []
+        for _ in range(5):
+            powers.append(next(stream).totalunitpower)
+            # the next tick's request is waiting for its tick
+            assert len(clock) == 1
+            assert len(sockets[0].sent) == len(powers)
+            clock.advance(0.05)
+        stream.close()
+        assert powers == [1, 2, 3, 4, 5]
+        # scheduled on a fixed 50ms grid, so the latency doesn't add up
+        assert clock.scheduled == pytest.approx([1000 + 0.05 * i for i in range(6)])
+
+    def test_next_request_sent_ahead(self, client, sockets, clock):
+        stream = client.stream(0.1)
+        next(stream)
+        # busy, but not for a whole tick
+        clock.advance(0.15)
+        assert len(sockets[0].sent) == 2
+        assert next(stream).totalunitpower == 2
+        assert len(sockets[0].sent) == 2
+        stream.close()
+
+    def test_skips_missed_ticks(self, client, sockets, clock):
+        stream = client.stream(0.05)
+        next(stream)
+        clock.advance(0.32)
+        # the request for the missed tick is dropped for a fresh one
+        assert next(stream).totalunitpower == 3
+        assert len(sockets[0].sent) == 3
+        # back on the grid from the fresh one
+        assert clock.scheduled[-1] == pytest.approx(1000.35)
+        stream.close()
+
+    def test_close_cancels_next_request(self, client, sockets, clock):
+        stream = client.stream(0.1)
+        next(stream)
+        stream.close()
+        assert len(clock) == 0
+        clock.advance(0.15)
+        assert len(sockets[0].sent) == 1
+
+    def test_reconnects(self, client, sockets):
+        sockets[0].reads = 2
+        stream = client.stream(0.02, sensors="power")
+        with mock.patch("requests.Session.get") as check_session:
+            check_session.return_value.json.return_value = {"emailaddress": "x"}
+            powers = [next(stream).totalunitpower for _ in range(4)]
+        stream.close()
+        assert powers == [1, 2, 1, 2]
+        assert len(sockets) == 2
+        # the session was still good, only the websocket is new
+        assert check_session.call_count == 1
+        assert client.fails == 0
+        assert client.breaker().state == wf.CircuitBreaker.CLOSED
+
+    @pytest.mark.parametrize(
+        "reply", ['{"rsp": "read", "err": "unit busy"}', "not json"]
+    )
+    def test_bad_reply_reconnects(self, client, sockets, reply):
+        if reply == "not json":
+            original = sockets[0].recv
+
+            def recv():
+                data = original()
+                return reply if '"totalunitpower": 2' in data else data
+
+            sockets[0].recv = recv
+        else:
+            sockets[0].errors = {2}
+        stream = client.stream(0.02)
+        with mock.patch("requests.Session.get") as check_session:
+            check_session.return_value.json.return_value = {"emailaddress": "x"}
+            powers = [next(stream).totalunitpower for _ in range(3)]
+        stream.close()
+        assert powers == [1, 1, 2]
+        assert len(sockets) == 2
+
+    def test_sent_off_the_scheduler_thread(self, client, sockets):
+        stream = client.stream(0.02)
+        for _ in range(3):
+            next(stream)
+        stream.close()
+        assert client.scheduler.name not in sockets[0].senders
+        assert all(name.startswith("waterfurnace-send") for name in sockets[0].senders)
+
+    def test_request_never_sent(self, client, sockets):
+        """A tick that never fires is given up on after request_timeout."""
+        client.scheduler = mock.Mock()
+        client.request_timeout = 0.1
+        stream = client.stream(0.02)
+        start = time.monotonic()
+        with mock.patch("requests.Session.get") as check_session:
+            check_session.return_value.json.return_value = {"emailaddress": "x"}
+            assert next(stream).totalunitpower == 1
+        stream.close()
+        assert 0.1 <= time.monotonic() - start < 1
+        assert len(sockets) == 2
+
+    def test_invalid_interval(self, client):
+        with pytest.raises(ValueError):
+            next(client.stream(0))
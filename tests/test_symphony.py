@@ -2,11 +2,16 @@
 
 """Tests for `waterfurnace` package."""
 
+import copy
 import json
+import threading
+import tracemalloc
+import types
 import unittest
 from unittest import mock
 
 import pytest
+import websocket
 
 from waterfurnace import waterfurnace as wf
 
@@ -20,6 +25,31 @@ FAKE_RESPONSE = {
 FAKE_CONTENT = json.dumps(FAKE_RESPONSE)
 
 
+def echo_tids(m_ws):
+    """Answer with ``m_ws.recv.return_value`` under each request's tid.
+
+    The client drops replies whose tid it isn't waiting for, the real
+    service echoes the tid of the request.
+    """
+    sent = threading.Condition()
+    tids = []
+
+    def send(message):
+        with sent:
+            tids.append(json.loads(message).get("tid"))
+            sent.notify_all()
+
+    def recv():
+        with sent:
+            sent.wait_for(lambda: tids, timeout=1)
+            tid = tids.pop(0) if tids else None
+        data = json.loads(m_ws.recv.return_value)
+        return json.dumps(dict(data, tid=tid))
+
+    m_ws.send.side_effect = send
+    m_ws.recv.side_effect = recv
+
+
 class FakeRequest:
     def __init__(self, status_code=200, content="", cookies=None):
         self.status_code = status_code
@@ -31,14 +61,14 @@ class FakeRequest:
 
 
 class TestSymphony(unittest.TestCase):
-    @mock.patch("requests.post")
+    @mock.patch("requests.Session.post")
     def test_unknown_failure(self, mock_req):
         mock_req.return_value = FakeRequest(content="Error")
         w = wf.WaterFurnace(mock.sentinel.email, mock.sentinel.passwd)
         with pytest.raises(wf.WFError):
             w.login()
 
-    @mock.patch("requests.post")
+    @mock.patch("requests.Session.post")
     def test_failled_login(self, mock_req):
         LOGIN_MSG = (
             "Something went wrong. Your login failed. "
@@ -51,7 +81,7 @@ class TestSymphony(unittest.TestCase):
         with pytest.raises(wf.WFCredentialError):
             w.login()
 
-    @mock.patch("requests.post")
+    @mock.patch("requests.Session.post")
     def test_success_get_session_id(self, mock_req):
         mock_req.return_value = FakeRequest(
             cookies={"sessionid": mock.sentinel.sessionid}
@@ -62,7 +92,7 @@ class TestSymphony(unittest.TestCase):
 
     @mock.patch("websocket.create_connection")
     @mock.patch("websocket.recv")
-    @mock.patch("requests.post")
+    @mock.patch("requests.Session.post")
     def test_success_login(self, mock_req, m_recv, mock_ws_create):
         mock_req.return_value = FakeRequest(
             cookies={"sessionid": str(mock.sentinel.sessionid)},
@@ -73,21 +103,19 @@ class TestSymphony(unittest.TestCase):
 
         w = wf.WaterFurnace(str(mock.sentinel.email), str(mock.sentinel.passwd))
         w.login()
-        assert m_ws.method_calls[0] == mock.call.send(
-            json.dumps(
-                {
-                    "cmd": "login",
-                    "tid": 1,
-                    "source": "consumer dashboard",
-                    "sessionid": "sentinel.sessionid",
-                }
-            )
-        )
+        name, args, _ = m_ws.method_calls[0]
+        assert name == "send"
+        assert json.loads(args[0]) == {
+            "cmd": "login",
+            "tid": 1,
+            "source": "consumer dashboard",
+            "sessionid": "sentinel.sessionid",
+        }
         assert m_ws.method_calls[1] == mock.call.recv()
 
     @mock.patch("websocket.create_connection")
     @mock.patch("websocket.recv")
-    @mock.patch("requests.post")
+    @mock.patch("requests.Session.post")
     def test_get_account_id(self, mock_req, m_recv, mock_ws_create):
         mock_req.return_value = FakeRequest(
             cookies={"sessionid": str(mock.sentinel.sessionid)},
@@ -101,7 +129,7 @@ class TestSymphony(unittest.TestCase):
         assert w.account_id == 1234
 
     @mock.patch("websocket.create_connection")
-    @mock.patch("requests.post")
+    @mock.patch("requests.Session.post")
     def test_increment_tid(self, mock_req, mock_ws_create):
         mock_req.return_value = FakeRequest(
             cookies={"sessionid": str(mock.sentinel.sessionid)}
@@ -113,6 +141,7 @@ class TestSymphony(unittest.TestCase):
         m_ws = mock.MagicMock()
         m_ws.recv.return_value = FAKE_CONTENT
         mock_ws_create.return_value = m_ws
+        echo_tids(m_ws)
 
         w = wf.WaterFurnace(mock.sentinel.email, mock.sentinel.passwd)
         w.login()
@@ -130,7 +159,7 @@ class TestSymphony(unittest.TestCase):
 
 class TestReadData(unittest.TestCase):
     @mock.patch("websocket.create_connection")
-    @mock.patch("requests.post")
+    @mock.patch("requests.Session.post")
     def test_increment_read_data(self, mock_req, mock_ws_create):
         mock_req.return_value = FakeRequest(
             cookies={"sessionid": str(mock.sentinel.sessionid)}
@@ -197,6 +226,7 @@ class TestReadData(unittest.TestCase):
         # otherwise it can't deserialize
         m_ws.recv.return_value = FAKE_CONTENT
         mock_ws_create.return_value = m_ws
+        echo_tids(m_ws)
 
         w = wf.WaterFurnace(mock.sentinel.email, mock.sentinel.passwd)
         w.login()
@@ -221,7 +251,7 @@ class TestReadData(unittest.TestCase):
         assert data.activesettings.coolingsp_read == 75
 
     @mock.patch("websocket.create_connection")
-    @mock.patch("requests.post")
+    @mock.patch("requests.Session.post")
     def test_catch_error(self, mock_req, mock_ws_create):
         mock_req.return_value = FakeRequest(
             cookies={"sessionid": str(mock.sentinel.sessionid)}
@@ -231,6 +261,7 @@ class TestReadData(unittest.TestCase):
         # otherwise it can't deserialize
         m_ws.recv.return_value = FAKE_CONTENT
         mock_ws_create.return_value = m_ws
+        echo_tids(m_ws)
 
         w = wf.WaterFurnace(
             mock.sentinel.email, mock.sentinel.passwd, str(mock.sentinel.unit)
@@ -394,9 +425,9 @@ class TestEnergyData(unittest.TestCase):
         assert len(energy_data) == 0
         assert len(energy_data.readings) == 0
 
-    @mock.patch("requests.get")
+    @mock.patch("requests.Session.get")
     @mock.patch("websocket.create_connection")
-    @mock.patch("requests.post")
+    @mock.patch("requests.Session.post")
     def test_get_energy_data_success(self, mock_post, mock_ws_create, mock_get):
         """Test successful get_energy_data call."""
         # Setup login mocks
@@ -414,6 +445,7 @@ class TestEnergyData(unittest.TestCase):
 
         mock_response = mock.MagicMock()
         mock_response.json.return_value = fake_energy_response
+        mock_response.content = json.dumps(fake_energy_response).encode()
         mock_response.raise_for_status = mock.MagicMock()
         mock_get.return_value = mock_response
 
@@ -447,7 +479,7 @@ class TestEnergyData(unittest.TestCase):
             w.get_energy_data("2026-01-03", "2026-01-04")
 
     @mock.patch("websocket.create_connection")
-    @mock.patch("requests.post")
+    @mock.patch("requests.Session.post")
     def test_get_energy_data_invalid_frequency(self, mock_post, mock_ws_create):
         """Test get_energy_data raises error with invalid frequency."""
         # Setup login mocks
@@ -462,9 +494,9 @@ class TestEnergyData(unittest.TestCase):
         with pytest.raises(ValueError):
             w.get_energy_data("2026-01-03", "2026-01-04", frequency="invalid")
 
-    @mock.patch("requests.get")
+    @mock.patch("requests.Session.get")
     @mock.patch("websocket.create_connection")
-    @mock.patch("requests.post")
+    @mock.patch("requests.Session.post")
     def test_get_energy_data_http_error(self, mock_post, mock_ws_create, mock_get):
         """Test get_energy_data handles HTTP errors."""
         import requests
@@ -488,9 +520,9 @@ class TestEnergyData(unittest.TestCase):
         with pytest.raises(wf.WFError):
             w.get_energy_data("2026-01-03", "2026-01-04")
 
-    @mock.patch("requests.get")
+    @mock.patch("requests.Session.get")
     @mock.patch("websocket.create_connection")
-    @mock.patch("requests.post")
+    @mock.patch("requests.Session.post")
     def test_get_energy_data_empty_response(self, mock_post, mock_ws_create, mock_get):
         """Test get_energy_data raises WFNoDataError on empty response."""
         # Setup login mocks
@@ -580,3 +612,452 @@ class TestSymphonyLocationMethods:
         symphony._location_data = [loc_data]
 
         assert symphony.devices == []
+
+
+class ReorderingWebsocket:
+    """Websocket that holds replies until `batch` requests are in flight,
+    then answers them newest first."""
+
+    def __init__(self, batch):
+        self.batch = batch
+        self.cond = threading.Condition()
+        self.requests = []
+        self.replies = []
+        self.closed = False
+
+    def send(self, message):
+        req = json.loads(message)
+        with self.cond:
+            self.requests.append(req)
+            if len(self.requests) % self.batch == 0:
+                for pending in reversed(self.requests[-self.batch :]):
+                    self.replies.append(self._reply(pending))
+            self.cond.notify_all()
+
+    def _reply(self, req):
+        if req["cmd"] == "write":
+            return json.dumps({"rsp": "write", "tid": req["tid"], "err": ""})
+        return json.dumps(
+            {
+                "rsp": "read",
+                "tid": req["tid"],
+                "err": "",
+                "awlid": req["awlid"],
+                "totalunitpower": req["tid"],
+            }
+        )
+
+    def recv(self):
+        with self.cond:
+            while not self.replies:
+                if self.closed:
+                    raise websocket.WebSocketConnectionClosedException()
+                self.cond.wait()
+            return self.replies.pop(0)
+
+    def abort(self):
+        self.close()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class TestMultiplexing:
+    def _login(self, ws):
+        with (
+            mock.patch("requests.Session.post") as mock_req,
+            mock.patch("websocket.create_connection") as mock_ws_create,
+        ):
+            mock_req.return_value = FakeRequest(cookies={"sessionid": "sess"})
+            m_ws = mock.MagicMock()
+            m_ws.recv.return_value = FAKE_CONTENT
+            mock_ws_create.return_value = m_ws
+            w = wf.WaterFurnace("test@example.com", "password")
+            w.login()
+        w.ws = ws
+        w._mux = wf.WSMultiplexer(ws)
+        return w
+
+    def test_concurrent_reads_get_their_own_reply(self):
+        w = self._login(ReorderingWebsocket(batch=8))
+        results = {}
+
+        def reader(n):
+            results[n] = w.read()
+
+        threads = [threading.Thread(target=reader, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(5)
+
+        assert len(results) == 8
+        tids = [r.tid for r in results.values()]
+        assert len(set(tids)) == 8
+        for reading in results.values():
+            assert reading.totalunitpower == reading.tid
+        w._mux.close()
+
+    def test_pipelined_reads_and_writes(self):
+        ws = ReorderingWebsocket(batch=4)
+        w = self._login(ws)
+        replies = [
+            w._ws_submit(w._read_request),
+            w._ws_submit(w._write_request, activemode_write=1),
+            w._ws_submit(w._read_request),
+            w._ws_submit(w._write_request, activemode_write=2),
+        ]
+        data = [reply.result(5) for reply in replies]
+        assert [d["rsp"] for d in data] == ["read", "write", "read", "write"]
+        assert [d["tid"] for d in data] == [r.tid for r in replies]
+        w._mux.close()
+
+    def test_closed_socket_fails_all_waiters(self):
+        ws = ReorderingWebsocket(batch=100)
+        w = self._login(ws)
+        replies = [w._ws_submit(w._read_request) for _ in range(3)]
+        ws.close()
+        for reply in replies:
+            with pytest.raises(websocket.WebSocketConnectionClosedException):
+                reply.result(5)
+        with pytest.raises(wf.WFWebsocketClosedError):
+            w.read()
+
+    def test_unknown_tid_is_dropped(self, caplog):
+        ws = ReorderingWebsocket(batch=1)
+        w = self._login(ws)
+        # a late reply to a request that already timed out
+        ws.replies.append(json.dumps({"rsp": "read", "tid": 999, "err": ""}))
+        reading = w.read()
+        assert reading.totalunitpower == reading.tid
+        assert reading.tid != 999
+        assert "unknown tid" in caplog.text
+        w._mux.close()
+
+    def test_undecodable_reply_fails_oldest(self):
+        ws = ReorderingWebsocket(batch=100)
+        w = self._login(ws)
+        replies = [w._ws_submit(w._read_request) for _ in range(2)]
+        with ws.cond:
+            ws.replies.append("not json")
+            ws.cond.notify_all()
+        with pytest.raises(ValueError, match="Unable to decode"):
+            replies[0].result(5)
+        assert not replies[1].done()
+        w._mux.close()
+
+    def test_tid_space(self):
+        w = wf.WaterFurnace("test@example.com", "password")
+        w.tid = wf.TID_SPACE - 1
+        assert w._claim_tid() == wf.TID_SPACE - 1
+        assert w.tid == 0
+        assert wf.TID_SPACE > 100
+
+    def test_tids_unique_across_threads(self):
+        w = wf.WaterFurnace("test@example.com", "password")
+        claimed = []
+
+        def claim():
+            claimed.extend(w._claim_tid() for _ in range(1000))
+
+        threads = [threading.Thread(target=claim) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(set(claimed)) == 8000
+
+    def test_relogin_stops_old_receiver(self):
+        ws = ReorderingWebsocket(batch=100)
+        w = self._login(ws)
+        old_mux = w._mux
+        with mock.patch("websocket.create_connection") as mock_ws_create:
+            m_ws = mock.MagicMock()
+            m_ws.recv.return_value = FAKE_CONTENT
+            mock_ws_create.return_value = m_ws
+            w._login_ws()
+        assert old_mux.closed
+        assert ws.closed
+        old_mux._thread.join(5)
+        assert not old_mux._thread.is_alive()
+
+
+def _deepcopy_read_request(tid, gwid):
+    """How read requests were built before the template cache."""
+    req = copy.deepcopy(wf.DATA_REQUEST)
+    req["tid"] = tid
+    req["awlid"] = gwid
+    return json.dumps(req)
+
+
+class TestReadRequestTemplate:
+    @pytest.mark.parametrize("tid", [0, 1, 99, 12345, wf.TID_SPACE - 1])
+    @pytest.mark.parametrize("gwid", ["ABC123456", 'quote"gw', None])
+    def test_identical_to_json_dumps(self, tid, gwid):
+        w = wf.WaterFurnace("test@example.com", "password")
+        assert w._read_request(tid, gwid) == _deepcopy_read_request(tid, gwid)
+
+    def test_uses_logged_in_gateway(self):
+        w = wf.WaterFurnace("test@example.com", "password")
+        w.gwid = "ABC123456"
+        assert json.loads(w._read_request(7))["awlid"] == "ABC123456"
+
+    def test_template_cached_per_gateway(self):
+        wf.read_request_template.cache_clear()
+        w = wf.WaterFurnace("test@example.com", "password")
+        for tid in range(10):
+            w._read_request(tid, "GW-1")
+            w._read_request(tid, "GW-2")
+        info = wf.read_request_template.cache_info()
+        assert info.misses == 2
+        assert info.hits == 18
+
+
+class TestSensorSelection:
+    def test_default_is_full_rlist(self):
+        assert wf.resolve_sensors() == tuple(wf.DATA_REQUEST["rlist"])
+
+    @pytest.mark.parametrize("profile", sorted(wf.SENSOR_PROFILES))
+    def test_profiles_are_known_sensors(self, profile):
+        rlist = wf.resolve_sensors(profile)
+        assert rlist == wf.SENSOR_PROFILES[profile]
+        assert set(rlist) <= set(wf.DATA_REQUEST["rlist"])
+
+    def test_names_are_case_insensitive(self):
+        assert wf.resolve_sensors(["tstatroomtemp", "TOTALUNITPOWER"]) == (
+            "TStatRoomTemp",
+            "totalunitpower",
+        )
+
+    def test_attribute_aliases(self):
+        assert wf.resolve_sensors(["mode", "raw_humidity_offset_settings"]) == (
+            "ModeOfOperation",
+            "humidity_offset_settings",
+        )
+
+    @pytest.mark.parametrize(
+        ("sensor", "attr"),
+        [
+            ("TStatRoomTemp", "tstatroomtemp"),
+            ("ModeOfOperation", "modeofoperation"),
+            ("humidity_offset_settings", "raw_humidity_offset_settings"),
+            ("bogus", None),
+        ],
+    )
+    def test_sensor_attribute(self, sensor, attr):
+        assert wf.sensor_attribute(sensor) == attr
+
+    def test_reply_fields_and_duplicates_are_skipped(self):
+        assert wf.resolve_sensors(["tid", "fanpower", "FanPower"]) == ("fanpower",)
+
+    def test_unknown_sensor(self):
+        with pytest.raises(ValueError, match="Unknown sensors: bogus"):
+            wf.resolve_sensors(["fanpower", "bogus"])
+
+    def test_unknown_profile(self):
+        with pytest.raises(ValueError, match="Unknown sensor profile"):
+            wf.resolve_sensors("everything")
+
+    def test_empty(self):
+        with pytest.raises(ValueError):
+            wf.resolve_sensors([])
+
+
+class TestSubsetRead:
+    def test_profile_read_sends_smaller_rlist(
+        self, mock_waterfurnace_client, sample_reading_data
+    ):
+        client = mock_waterfurnace_client
+        client.ws.recv_data.append(
+            json.dumps(
+                {
+                    key: sample_reading_data[key]
+                    for key in ("rsp", "tid", "err", "zone", "awlid", "totalunitpower")
+                }
+            )
+        )
+        reading = client.read(sensors="power")
+
+        sent = client.ws.sent_messages[-1]
+        assert json.loads(sent)["rlist"] == list(wf.SENSOR_PROFILES["power"])
+        assert len(sent) < len(client._read_request(client.tid))
+        assert reading.totalunitpower == 1664
+        assert reading.enteringwatertemp is None
+
+    def test_invalid_sensor_fails_before_sending(self, mock_waterfurnace_client):
+        client = mock_waterfurnace_client
+        sent = len(client.ws.sent_messages)
+        with pytest.raises(ValueError):
+            client.read(sensors=["bogus"])
+        assert len(client.ws.sent_messages) == sent
+
+    def test_partial_reading(self):
+        reading = wf.WFReading({"err": "", "totalunitpower": 1664})
+        assert reading.totalunitpower == 1664
+        assert reading.mode is None
+        assert reading.activesettings.mode is None
+        assert reading.raw_humidity_offset_settings == {}
+        assert repr(reading) == (
+            "<FurnaceReading power=1664, mode=None, activemode=None, "
+            "looptemp=None, airtemp=None, roomtemp=None, setpoint=None>"
+        )
+
+
+class TestCompactModels:
+    @pytest.mark.parametrize(
+        "model",
+        [
+            wf.WFReading(),
+            wf.ActiveSettings(),
+            wf.WFEnergyReading(0, [1.0], ["total_power"]),
+            wf.WFGateway({"gwid": "gw-1"}),
+            wf.WFLocation({}),
+        ],
+    )
+    def test_no_instance_dict(self, model):
+        assert not hasattr(model, "__dict__")
+        with pytest.raises(AttributeError):
+            model.not_a_field = 1
+
+    def test_energy_reading_raw_data(self):
+        reading = wf.WFEnergyReading(0, [1.5, 2], ["total_power", "id", "extra"])
+        assert reading._raw_data == {"total_power": 1.5, "id": 2}
+        assert reading.get("id") == 2
+        assert reading.get("extra", "missing") == "missing"
+
+
+def _bytes_per(factory, count):
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        objs = [factory() for _ in range(count)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert len(objs) == count
+    return (after - before) / count
+
+
+@pytest.mark.benchmark
+def test_reading_memory(sample_reading_data):
+    """Bytes per retained WFReading, slotted vs an equivalent __dict__ object."""
+    count = 10000
+
+    def unslotted():
+        reading = wf.WFReading(sample_reading_data)
+        fields = {name: getattr(reading, name) for name in wf.WFReading.__slots__}
+        fields["activesettings"] = types.SimpleNamespace(
+            **{
+                name: getattr(reading.activesettings, name)
+                for name in wf.ActiveSettings.__slots__
+            }
+        )
+        return types.SimpleNamespace(**fields)
+
+    slotted = _bytes_per(lambda: wf.WFReading(sample_reading_data), count)
+    baseline = _bytes_per(unslotted, count)
+    assert slotted < baseline * 0.75, (
+        f"__slots__ {slotted:.0f} B, __dict__ {baseline:.0f} B"
+    )
+
+
+def _energy_response(rows, start=1767571200000, step=900000):
+    columns = ["total_heat_1", "total_power", "heat_runtime", "id", "time_zone"]
+    return {
+        "columns": columns,
+        "index": [start + i * step for i in range(rows)],
+        "data": [
+            [i * 0.01, i * 0.02, None if i % 4 else 1.0, i, "America/New_York"]
+            for i in range(rows)
+        ],
+    }
+
+
+class TestColumnarEnergyData:
+    def test_columns_are_packed(self):
+        energy = wf.WFEnergyData(_energy_response(8))
+        assert energy.column("total_power").typecode == "d"
+        assert energy.column("id").typecode == "q"
+        assert energy.column("time_zone") == ["America/New_York"] * 8
+        assert energy.timestamps.typecode == "q"
+        with pytest.raises(KeyError):
+            energy.column("bogus")
+
+    def test_views_round_trip(self):
+        response = _energy_response(8)
+        energy = wf.WFEnergyData(response)
+        assert energy.index == response["index"]
+        assert energy.data == response["data"]
+        reading = energy[-1]
+        assert reading.timestamp_ms == response["index"][-1]
+        assert reading.id == 7
+        assert reading.heat_runtime is None
+        assert reading.time_zone == "America/New_York"
+        assert [r.id for r in energy[2:5]] == [2, 3, 4]
+        with pytest.raises(IndexError):
+            energy[8]
+
+    def test_int_column_with_missing_values(self):
+        response = {
+            "columns": ["total_records", "total_power"],
+            "index": [1, 2, 3],
+            "data": [[3, 1.5], [None, 2.5], [4, None]],
+        }
+        body = json.dumps(response).encode()
+        for energy in (
+            wf.WFEnergyData(response),
+            wf.WFEnergyData.from_events(wf.energy_events([body])),
+        ):
+            assert energy.data == response["data"]
+            assert type(energy[0].total_records) is int
+            assert energy[1].total_records is None
+            assert type(energy.max("total_records")) is int
+            assert energy.min("total_records") == 3
+            assert energy.sum("total_records") == 7
+
+    def test_short_rows_are_padded(self):
+        energy = wf.WFEnergyData(
+            {"columns": ["a", "b"], "index": [1, 2, 3], "data": [[1.0], [2.0, 3.0]]}
+        )
+        assert len(energy) == 2
+        assert energy.data == [[1.0, None], [2.0, 3.0]]
+
+    def test_column_stats(self):
+        energy = wf.WFEnergyData(_energy_response(8))
+        assert energy.sum("id") == 28
+        assert energy.min("total_power") == 0.0
+        assert energy.max("total_power") == pytest.approx(0.14)
+        assert energy.mean("heat_runtime") == 1.0
+        assert energy.sum("heat_runtime") == 2.0
+
+    def test_stats_of_empty_column(self):
+        energy = wf.WFEnergyData({"columns": ["a"], "index": [1], "data": [[None]]})
+        assert energy.min("a") is None
+        assert energy.max("a") is None
+        assert energy.mean("a") is None
+        assert energy.sum("a") == 0
+
+    def test_to_numpy(self):
+        numpy = pytest.importorskip("numpy")
+        energy = wf.WFEnergyData(_energy_response(8))
+        assert numpy.nansum(energy.to_numpy("heat_runtime")) == 2.0
+
+
+def _per_row_energy(data):
+    return [
+        wf.WFEnergyReading(ts, row, data["columns"])
+        for ts, row in zip(data["index"], data["data"], strict=True)
+    ]
+
+
+@pytest.mark.benchmark
+def test_energy_data_memory():
+    """A year of 15min energy data: per-row readings vs columnar."""
+    response = _energy_response(35040)
+    row_bytes = _bytes_per(lambda: _per_row_energy(response), 1)
+    columnar_bytes = _bytes_per(lambda: wf.WFEnergyData(response), 1)
+    assert columnar_bytes < row_bytes / 4, (
+        f"columnar {columnar_bytes / 1e6:.1f}MB, per-row {row_bytes / 1e6:.1f}MB"
+    )
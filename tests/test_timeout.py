@@ -4,6 +4,7 @@
 
 import json
 import logging
+import threading
 import time
 import unittest
 from unittest import mock
@@ -55,7 +56,7 @@ class FakeRequest:
 
 class TestTimeout(unittest.TestCase):
     @mock.patch("websocket.create_connection")
-    @mock.patch("requests.post")
+    @mock.patch("requests.Session.post")
     def test_increment_read_data(self, mock_req, mock_ws_create):
         mock_req.return_value = FakeRequest(
             cookies={"sessionid": str(mock.sentinel.sessionid)}
@@ -71,3 +72,96 @@ class TestTimeout(unittest.TestCase):
 
         with pytest.raises(wf.WFWebsocketClosedError):
             w.read()
+
+    @mock.patch("websocket.create_connection")
+    @mock.patch("requests.Session.post")
+    def test_per_call_timeout(self, mock_req, mock_ws_create):
+        mock_req.return_value = FakeRequest(
+            cookies={"sessionid": str(mock.sentinel.sessionid)}
+        )
+        mock_ws_create.return_value = FakeWebsocket()
+        w = wf.WaterFurnace(mock.sentinel.email, mock.sentinel.passwd)
+        w.login()
+
+        start = time.monotonic()
+        with pytest.raises(wf.WFWebsocketClosedError):
+            w.read(timeout=0.1)
+        # the fake notices the abort on its next one second poll
+        assert time.monotonic() - start < 2.5
+
+
+class TestDeadlineScheduler:
+    def test_runs_in_deadline_order(self):
+        scheduler = wf.DeadlineScheduler()
+        fired = []
+        done = threading.Event()
+        scheduler.schedule(0.06, lambda: (fired.append("c"), done.set()))
+        scheduler.schedule(0.02, fired.append, "a")
+        scheduler.schedule(0.04, fired.append, "b")
+        assert done.wait(2)
+        assert fired == ["a", "b", "c"]
+        assert len(scheduler) == 0
+
+    def test_cancel(self):
+        scheduler = wf.DeadlineScheduler()
+        fired = []
+        done = threading.Event()
+        cancelled = scheduler.schedule(0.01, fired.append, "cancelled")
+        scheduler.schedule(0.05, done.set)
+        cancelled.cancel()
+        cancelled.cancel()
+        assert len(scheduler) == 1
+        assert done.wait(2)
+        assert fired == []
+
+    def test_cancelled_entries_are_compacted(self):
+        scheduler = wf.DeadlineScheduler()
+        for deadline in [scheduler.schedule(60, print) for _ in range(1000)]:
+            deadline.cancel()
+        assert len(scheduler) == 0
+        assert len(scheduler._heap) <= 130
+
+    def test_failing_callback_is_logged(self, caplog):
+        scheduler = wf.DeadlineScheduler()
+        done = threading.Event()
+        scheduler.schedule(0, lambda: 1 / 0)
+        scheduler.schedule(0.01, done.set)
+        assert done.wait(2)
+        assert "Deadline callback" in caplog.text
+
+
+def test_no_thread_per_request(
+    mock_requests_post,
+    create_mock_websocket,
+    sample_login_response,
+    sample_reading_data,
+):
+    """Many clients reading many times start no watchdog threads."""
+    login = json.dumps(sample_login_response)
+    reading = json.dumps(sample_reading_data)
+    scheduler = wf.DeadlineScheduler()
+    clients = []
+    with mock.patch(
+        "websocket.create_connection",
+        side_effect=lambda *a, **kw: create_mock_websocket([login] + [reading] * 25),
+    ):
+        for _ in range(20):
+            client = wf.WaterFurnace(
+                "test@example.com", "password", scheduler=scheduler
+            )
+            client.login()
+            clients.append(client)
+
+    started = []
+    real_start = threading.Thread.start
+
+    def start(thread):
+        started.append(thread.name)
+        real_start(thread)
+
+    with mock.patch.object(threading.Thread, "start", start):
+        for _ in range(25):
+            for client in clients:
+                assert client.read().tstatroomtemp == 69.7
+    assert started == [scheduler.name]
+    assert len(scheduler) == 0
@@ -2,10 +2,13 @@
 
 """Tests for `waterfurnace` package."""
 
+from unittest import mock
+
 import pytest
 from click.testing import CliRunner
 
 from waterfurnace import cli
+from waterfurnace import waterfurnace as wf
 
 
 @pytest.fixture
@@ -102,3 +105,125 @@ def test_energy_requires_end():
     )
     assert result.exit_code != 0
     assert "end" in result.output.lower() or "missing" in result.output.lower()
+
+
+def _sensors_cli(args):
+    client = mock.MagicMock()
+    client.read.return_value = wf.WFReading({"err": "", "totalunitpower": 1664})
+    runner = CliRunner()
+    with mock.patch.object(cli, "get_client", return_value=client):
+        result = runner.invoke(
+            cli.main, ["sensors", "-u", "user@example.com", "-p", "pass", *args]
+        )
+    return result, client
+
+
+def test_sensors_profile():
+    """sensors -s <profile> only requests that profile."""
+    result, client = _sensors_cli(["-s", "power"])
+    assert result.exit_code == 0
+    client.read.assert_called_once_with(sensors="power")
+    assert "totalunitpower = 1664" in result.output
+    assert "compressorpower = None" in result.output
+
+
+def test_sensors_list():
+    """sensors -s a,b requests just those sensors."""
+    result, client = _sensors_cli(["-s", "totalunitpower,mode"])
+    assert result.exit_code == 0
+    client.read.assert_called_once_with(sensors=["totalunitpower", "mode"])
+    assert "mode = None" in result.output
+
+
+def test_sensors_unknown():
+    """Unknown sensors are rejected before logging in."""
+    result, client = _sensors_cli(["-s", "bogus"])
+    assert result.exit_code != 0
+    assert "Unknown sensors: bogus" in result.output
+    assert not client.read.called
+
+
+def test_sensors_continuous():
+    """sensors --continuous prints each reading from stream()."""
+    client = mock.MagicMock()
+    client.stream.return_value = [
+        wf.WFReading({"err": "", "totalunitpower": power}) for power in (1664, 900)
+    ]
+    runner = CliRunner()
+    with mock.patch.object(cli, "get_client", return_value=client):
+        result = runner.invoke(
+            cli.main,
+            ["sensors", "-u", "user@example.com", "-p", "pass", "-s", "power", "-c"],
+        )
+    assert result.exit_code == 0
+    client.stream.assert_called_once_with(15, sensors="power")
+    assert not client.read.called
+    assert "totalunitpower = 1664" in result.output
+    assert "totalunitpower = 900" in result.output
+
+
+def test_energy_summary():
+    """energy prints per column stats, skipping missing values."""
+    client = mock.MagicMock()
+    client.get_energy_data.return_value = wf.WFEnergyData(
+        {
+            "columns": ["total_power", "heat_runtime", "time_zone"],
+            "index": [3000, 2000, 1000],
+            "data": [[1.0, None, "UTC"], [3.0, None, "UTC"], [None, None, "UTC"]],
+        }
+    )
+    runner = CliRunner()
+    with mock.patch.object(cli, "get_client", return_value=client):
+        result = runner.invoke(
+            cli.main,
+            ["energy", "-u", "user@example.com", "-p", "pass"]
+            + ["--start", "2026-01-01", "--end", "2026-01-02"],
+        )
+    assert result.exit_code == 0
+    assert "Received 3 energy readings" in result.output
+    assert "Total Power:\n   Min: 1.00\n   Max: 3.00\n   Avg: 2.00\n   Total: 4.00" in (
+        result.output
+    )
+    assert "Heat Runtime" not in result.output
+
+
+def test_energy_chunk_days():
+    """--chunk-days switches to the bulk download."""
+    client = mock.MagicMock()
+    client.get_energy_data_bulk.return_value = wf.WFEnergyData(
+        {"columns": ["total_power"], "index": [1000], "data": [[1.0]]}
+    )
+    runner = CliRunner()
+    with mock.patch.object(cli, "get_client", return_value=client):
+        result = runner.invoke(
+            cli.main,
+            ["energy", "-u", "user@example.com", "-p", "pass", "--chunk-days", "7"]
+            + ["--start", "2026-01-01", "--end", "2026-03-01"],
+        )
+    assert result.exit_code == 0
+    client.get_energy_data_bulk.assert_called_once_with(
+        "2026-01-01", "2026-03-01", "1H", "America/New_York", chunk_days=7
+    )
+    assert not client.get_energy_data.called
+
+
+def test_energy_cache_dir(tmp_path):
+    """--cache-dir gives the client an EnergyCache, --refresh clears the range."""
+    client = mock.MagicMock(gwid="GW")
+    client.get_energy_data.return_value = wf.WFEnergyData()
+    runner = CliRunner()
+    with (
+        mock.patch.object(cli, "get_client", return_value=client),
+        mock.patch("waterfurnace.energy_cache.EnergyCache.invalidate") as invalidate,
+    ):
+        result = runner.invoke(
+            cli.main,
+            ["energy", "-u", "user@example.com", "-p", "pass"]
+            + ["--start", "2026-01-01", "--end", "2026-01-02"]
+            + ["--cache-dir", str(tmp_path), "--refresh"],
+        )
+    assert result.exit_code == 0
+    assert client.energy_cache.directory == str(tmp_path)
+    invalidate.assert_called_once_with(
+        "GW", "1H", "America/New_York", "2026-01-01", "2026-01-02"
+    )
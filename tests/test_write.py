@@ -1,6 +1,7 @@
 """Tests for write control commands."""
 
 import json
+import time
 
 import pytest
 import websocket
@@ -28,7 +29,7 @@ class TestWsWrite:
         tid_before = client.tid
         client.ws.recv_data.append(json.dumps(sample_write_success))
         client._ws_write(activemode_write=0)
-        assert client.tid == (tid_before + 1) % 100
+        assert client.tid == (tid_before + 1) % wf.TID_SPACE
 
     def test_raises_wferror_on_error_response(
         self, mock_waterfurnace_client, sample_write_error
@@ -279,6 +280,46 @@ class TestSetHumidity:
         assert sent["humidity_offset_settings"]["humdity_control_option"] == 1
         assert sent["humidity_offset_settings"]["humidity_offset"] == 0
 
+    def test_reads_only_what_it_needs(
+        self, mock_waterfurnace_client, sample_write_success, sample_reading_data
+    ):
+        client = mock_waterfurnace_client
+        client.ws.recv_data.append(json.dumps(sample_reading_data))
+        client.ws.recv_data.append(json.dumps(sample_write_success))
+        client.set_humidity(48)
+
+        read = json.loads(client.ws.sent_messages[-2])
+        assert read["cmd"] == "read"
+        assert read["rlist"] == list(wf.HUMIDITY_WRITE_SENSORS)
+
+    def test_uses_recent_reading(
+        self, mock_waterfurnace_client, sample_write_success, sample_reading_data
+    ):
+        client = mock_waterfurnace_client
+        client.ws.recv_data.append(json.dumps(sample_reading_data))
+        client.read()
+        sent_before = len(client.ws.sent_messages)
+        client.ws.recv_data.append(json.dumps(sample_write_success))
+        client.set_humidity(48)
+
+        assert len(client.ws.sent_messages) == sent_before + 1
+        sent = json.loads(client.ws.sent_messages[-1])
+        assert sent["dehumid_humid_sp"]["dehumidification"] == 50
+
+    def test_reads_again_after_a_write(
+        self, mock_waterfurnace_client, sample_write_success, sample_reading_data
+    ):
+        client = mock_waterfurnace_client
+        client.ws.recv_data.append(json.dumps(sample_reading_data))
+        client.read()
+        client.ws.recv_data.append(json.dumps(sample_write_success))
+        client.set_mode(1)
+        client.ws.recv_data.append(json.dumps(sample_reading_data))
+        client.ws.recv_data.append(json.dumps(sample_write_success))
+        client.set_humidity(48)
+
+        assert json.loads(client.ws.sent_messages[-2])["cmd"] == "read"
+
     def test_out_of_range_low(self, mock_waterfurnace_client):
         with pytest.raises(ValueError, match="humidity must be an integer"):
             mock_waterfurnace_client.set_humidity(14)
@@ -290,3 +331,141 @@ class TestSetHumidity:
     def test_invalid_type(self, mock_waterfurnace_client):
         with pytest.raises(ValueError, match="humidity must be an integer"):
             mock_waterfurnace_client.set_humidity(45.5)
+
+
+class TestSettingsCache:
+    """Tests for the SettingsCache used by set_humidity."""
+
+    def test_fresh_values(self):
+        cache = wf.SettingsCache(max_age=30)
+        cache.update("A", {"tstatdehumidsetpoint": 50}, time.perf_counter())
+        assert cache.get("A", ["TStatDehumidSetpoint"]) == {"tstatdehumidsetpoint": 50}
+        assert cache.get("A", wf.HUMIDITY_WRITE_SENSORS) is None
+        assert cache.get("B", ["TStatDehumidSetpoint"]) is None
+
+    def test_max_age(self):
+        cache = wf.SettingsCache(max_age=30)
+        cache.update("A", {"tstatdehumidsetpoint": 50}, time.perf_counter() - 31)
+        assert cache.get("A", ["TStatDehumidSetpoint"]) is None
+        cache = wf.SettingsCache(max_age=0)
+        cache.update("A", {"tstatdehumidsetpoint": 50}, time.perf_counter())
+        assert cache.get("A", ["TStatDehumidSetpoint"]) is None
+
+    def test_reads_sent_before_a_write_are_ignored(self):
+        cache = wf.SettingsCache()
+        sent = time.perf_counter()
+        cache.update("A", {"tstatdehumidsetpoint": 50}, sent)
+        cache.invalidate("A")
+        assert cache.get("A", ["TStatDehumidSetpoint"]) is None
+        # a read that was in flight during the write
+        cache.update("A", {"tstatdehumidsetpoint": 50}, sent)
+        assert cache.get("A", ["TStatDehumidSetpoint"]) is None
+        cache.update("A", {"tstatdehumidsetpoint": 45}, time.perf_counter())
+        assert cache.get("A", ["TStatDehumidSetpoint"]) == {"tstatdehumidsetpoint": 45}
+
+
+class TestApply:
+    """Tests for apply()."""
+
+    def test_mode_first_then_one_write_per_setting(
+        self, mock_waterfurnace_client, sample_write_success
+    ):
+        client = mock_waterfurnace_client
+        sent_before = len(client.ws.sent_messages)
+        client.ws.recv_data.extend([json.dumps(sample_write_success)] * 4)
+        result = client.apply(
+            {
+                "mode": 1,
+                "cooling_setpoint": 75,
+                "heating_setpoint": 68,
+                "fan_mode": 2,
+                "intertimeon": 5,
+                "intertimeoff": 10,
+            }
+        )
+
+        sent = [json.loads(m) for m in client.ws.sent_messages[sent_before:]]
+        assert [m["cmd"] for m in sent] == ["write"] * 4
+        mode, cooling, heating, fan = sent
+        assert set(mode) - {"cmd", "tid", "awlid", "source"} == {"activemode_write"}
+        assert mode["activemode_write"] == 1
+        assert cooling["coolingsp_write"] == 75
+        assert "activemode_write" not in cooling
+        assert heating["heatingsp_write"] == 68
+        assert fan["fanmode_write"] == 2
+        assert fan["intertimeon_write"] == 5
+        assert fan["intertimeoff_write"] == 10
+        assert len({m["tid"] for m in sent}) == 4
+        assert result.ok
+        assert set(result.replies) == {
+            "mode",
+            "cooling_setpoint",
+            "heating_setpoint",
+            "fan_mode",
+            "intertimeon",
+            "intertimeoff",
+        }
+        # every setting has the reply to its own write
+        assert result.replies["mode"]["tid"] == mode["tid"]
+        assert result.replies["heating_setpoint"]["tid"] == heating["tid"]
+        assert result.replies["intertimeon"]["tid"] == fan["tid"]
+        assert result.replies["mode"]["data"] == "ok"
+
+    def test_with_humidity(
+        self,
+        mock_waterfurnace_client,
+        sample_write_success,
+        sample_reading_data,
+    ):
+        client = mock_waterfurnace_client
+        client.ws.recv_data.append(json.dumps(sample_write_success))
+        client.ws.recv_data.append(json.dumps(sample_reading_data))
+        client.ws.recv_data.append(json.dumps(sample_write_success))
+        result = client.apply({"mode": 3, "humidity": 45})
+
+        write, read, humidity = (json.loads(m) for m in client.ws.sent_messages[-3:])
+        assert write["activemode_write"] == 3
+        assert "dehumid_humid_sp" not in write
+        assert read["cmd"] == "read"
+        assert humidity["dehumid_humid_sp"]["humidification"] == 45
+        assert set(result.replies) == {"mode", "humidity"}
+
+    def test_reports_errors_per_setting(
+        self,
+        mock_waterfurnace_client,
+        sample_write_error,
+        sample_reading_data,
+        sample_write_success,
+    ):
+        client = mock_waterfurnace_client
+        client.ws.recv_data.append(json.dumps(sample_write_success))
+        client.ws.recv_data.append(json.dumps(sample_write_error))
+        client.ws.recv_data.append(json.dumps(sample_write_success))
+        client.ws.recv_data.append(json.dumps(sample_reading_data))
+        client.ws.recv_data.append(json.dumps(sample_write_success))
+        result = client.apply(
+            {"mode": 1, "cooling_setpoint": 75, "heating_setpoint": 68, "humidity": 45}
+        )
+
+        assert not result.ok
+        assert set(result.errors) == {"cooling_setpoint"}
+        assert isinstance(result.errors["cooling_setpoint"], wf.WFError)
+        assert set(result.replies) == {"mode", "heating_setpoint", "humidity"}
+
+    @pytest.mark.parametrize(
+        ("settings", "match"),
+        [
+            ({}, "no settings"),
+            ({"mode": 1, "fan": 0}, "unknown settings: fan"),
+            ({"mode": 1, "cooling_setpoint": 95}, "cooling temperature"),
+            ({"intertimeon": 5}, "need a fan_mode"),
+            ({"fan_mode": 2, "intertimeon": 5}, "are required"),
+            ({"mode": 1, "humidity": 10}, "humidity must be"),
+        ],
+    )
+    def test_validates_before_sending(self, mock_waterfurnace_client, settings, match):
+        client = mock_waterfurnace_client
+        sent_before = len(client.ws.sent_messages)
+        with pytest.raises(ValueError, match=match):
+            client.apply(settings)
+        assert len(client.ws.sent_messages) == sent_before
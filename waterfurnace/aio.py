@@ -0,0 +1,590 @@
+"""Asyncio client for WaterFurnace / GeoStar Symphony.
+
+Needs the optional aiohttp dependency (``pip install waterfurnace[async]``).
+"""
+
+import asyncio
+import logging
+import time
+
+try:
+    import aiohttp
+except ImportError as e:  # pragma: no cover
+    raise ImportError(
+        "waterfurnace.aio requires aiohttp, install waterfurnace[async]"
+    ) from e
+
+from waterfurnace.waterfurnace import (
+    ENERGY_CHUNK_DAYS,
+    ENERGY_RETRIES,
+    ENERGY_RETRY_DELAY,
+    ENERGY_WORKERS,
+    FAILED_LOGIN,
+    GS_BASE_URL,
+    GS_LOGIN_URL,
+    GS_WS_URL,
+    HUMIDITY_WRITE_SENSORS,
+    POOL_MAXSIZE,
+    REQUEST_TIMEOUT,
+    SETTINGS_MAX_AGE,
+    STREAM_INTERVAL,
+    TIMEOUT,
+    USER_AGENT,
+    WF_BASE_URL,
+    WF_LOGIN_URL,
+    WF_WS_URL,
+    SymphonyBase,
+    WFCircuitOpenError,
+    WFCredentialError,
+    WFEnergyData,
+    WFError,
+    WFException,
+    WFNoDataError,
+    WFReading,
+    WFWebsocketClosedError,
+    WriteResult,
+    cooling_setpoint_write,
+    energy_chunks,
+    fan_mode_write,
+    heating_setpoint_write,
+    humidity_write,
+    legacy_ssl_context,
+    mode_write,
+    resolve_sensors,
+    settings_write,
+    validate_humidity,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class AsyncSymphonyGeothermal(SymphonyBase):
+    """Non-blocking Symphony client.
+
+    Has the same login / read / write / energy surface as
+    SymphonyGeothermal, with every network call awaitable. Pass one
+    ``aiohttp.ClientSession`` to many clients so hundreds of units share
+    a connection pool on a single event loop.
+    """
+
+    def __init__(
+        self,
+        base_url,
+        login_url,
+        ws_url,
+        user,
+        passwd,
+        max_fails=5,
+        device=0,
+        location=0,
+        sessionid=None,
+        session=None,
+        request_timeout=REQUEST_TIMEOUT,
+        codec=None,
+        retry_policy=None,
+        instrumentation=None,
+        settings_max_age=SETTINGS_MAX_AGE,
+    ):
+        super().__init__(
+            base_url,
+            login_url,
+            ws_url,
+            user,
+            passwd,
+            max_fails,
+            device,
+            location,
+            sessionid=sessionid,
+            codec=codec,
+            retry_policy=retry_policy,
+            instrumentation=instrumentation,
+            settings_max_age=settings_max_age,
+        )
+        self._session = session
+        self._owns_session = session is None
+        self.request_timeout = request_timeout
+        self.ws = None
+        # one request / response exchange on the websocket at a time
+        self._ws_lock = asyncio.Lock()
+        _LOGGER.debug(self)
+
+    def __repr__(self):
+        return f"<AsyncSymphony user={self.user}>"
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    @property
+    def session(self):
+        """The aiohttp session used for HTTP and the websocket."""
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=POOL_MAXSIZE),
+                # every call passes its own sessionid cookie
+                cookie_jar=aiohttp.DummyCookieJar(),
+            )
+        return self._session
+
+    async def close(self):
+        """Close the websocket, and the HTTP session if we created it."""
+        if self.ws is not None:
+            await self.ws.close()
+            self.ws = None
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _check_session_id(self):
+        """Check an existing session ID."""
+        _LOGGER.debug("Checking existing session.")
+        async with self.session.get(
+            f"{self.base_url}/api.php/user",
+            headers={"user-agent": USER_AGENT},
+            cookies={"legal-acknowledge": "yes", "sessionid": self.sessionid},
+            timeout=aiohttp.ClientTimeout(total=TIMEOUT),
+            allow_redirects=False,
+        ) as res:
+            content = await res.text()
+        try:
+            self.codec.loads(content)["emailaddress"]
+        except (KeyError, ValueError) as e:
+            _LOGGER.exception("Existing session is not valid")
+            _LOGGER.debug("Response Content: %s", content)
+            raise WFCredentialError() from e
+
+    async def _get_session_id(self):
+        async with self.session.post(
+            self.login_url,
+            data=self._login_form(),
+            headers={"user-agent": USER_AGENT},
+            cookies={
+                "legal-acknowledge": "yes",
+                "energy-base-price": "0.15",
+                "temp_unit": "f",
+            },
+            timeout=aiohttp.ClientTimeout(total=TIMEOUT),
+            allow_redirects=False,
+        ) as res:
+            content = await res.text()
+            cookie = res.cookies.get("sessionid")
+        if cookie is not None:
+            self.sessionid = cookie.value
+            return
+        _LOGGER.error("Did not find expected session cookie, login failed.")
+        _LOGGER.debug("Response Content: %s", content)
+        if FAILED_LOGIN in content:
+            raise WFCredentialError()
+        raise WFError()
+
+    async def _login_ws(self):
+        if self.ws is not None:
+            await self.ws.close()
+        hooks = self.instrumentation
+        ssl_ctx = legacy_ssl_context() if self.ws_url.startswith("wss") else True
+        with hooks.phase("ws_connect", self.gwid):
+            self.ws = await self.session.ws_connect(self.ws_url, ssl=ssl_ctx)
+        with hooks.phase("ws_login", self.gwid):
+            req = self.codec.dumps(self._login_request())
+            await self.ws.send_str(req)
+            recv = await self._ws_recv(TIMEOUT)
+            data = self.codec.loads(recv)
+        _LOGGER.debug("Login response: %s", data)
+
+        self._handle_login(data)
+        hooks.count("bytes_out", len(req), self.gwid)
+        hooks.count("bytes_in", len(recv), self.gwid)
+        self.next_tid()
+
+    async def login(self):
+        with self.instrumentation.phase("http_login", self.gwid):
+            if self.sessionid:
+                try:
+                    await self._check_session_id()
+                except WFCredentialError:
+                    await self._get_session_id()
+            else:
+                await self._get_session_id()
+        # reset the transaction id if we start over
+        self.tid = 1
+        await self._login_ws()
+
+    async def _ws_recv(self, timeout):
+        try:
+            msg = await asyncio.wait_for(self.ws.receive(), timeout)
+        except asyncio.TimeoutError as e:
+            _LOGGER.warning("Timeout on websocket request. Closing websocket")
+            self.instrumentation.count("timeouts", 1, self.gwid)
+            await self.ws.close()
+            raise WFWebsocketClosedError() from e
+        if msg.type != aiohttp.WSMsgType.TEXT:
+            _LOGGER.error("Websocket closed: %s", msg)
+            raise WFWebsocketClosedError()
+        return msg.data
+
+    async def _ws_request(self, build, **kwargs):
+        if self.ws is None or self.ws.closed:
+            raise WFWebsocketClosedError()
+        hooks = self.instrumentation
+        gwid = kwargs.get("gwid") or self.gwid
+        loop = asyncio.get_running_loop()
+        async with self._ws_lock:
+            tid = self._claim_tid()
+            req = build(tid, **kwargs)
+            try:
+                with hooks.phase("send", gwid):
+                    await self.ws.send_str(req)
+            except (ConnectionError, aiohttp.ClientError) as e:
+                _LOGGER.exception("Websocket send failed")
+                raise WFWebsocketClosedError() from e
+            hooks.count("bytes_out", len(req), gwid)
+            deadline = loop.time() + self.request_timeout
+            while True:
+                with hooks.phase("recv", gwid):
+                    data = await self._ws_recv(max(0.0, deadline - loop.time()))
+                hooks.count("bytes_in", len(data), gwid)
+                try:
+                    with hooks.phase("decode", gwid):
+                        decoded = self.codec.loads(data)
+                    reply_tid = decoded.get("tid")
+                except (ValueError, AttributeError) as e:
+                    _LOGGER.exception("Unable to decode data as json: %s", data)
+                    raise WFWebsocketClosedError() from e
+                if reply_tid == tid:
+                    return decoded
+                # the reply to a call that was cancelled after sending
+                _LOGGER.warning("Dropping websocket message with unknown tid: %s", data)
+
+    async def _ws_write(self, **kwargs):
+        try:
+            datadecoded = await self._ws_request(self._write_request, **kwargs)
+        finally:
+            self.settings_cache.invalidate(kwargs.get("gwid") or self.gwid)
+        _LOGGER.debug("Write resp: %s", datadecoded)
+        if datadecoded["err"]:
+            raise WFError(datadecoded["err"])
+        return datadecoded
+
+    async def read(self, sensors=None):
+        rlist = resolve_sensors(sensors)
+        sent = time.perf_counter()
+        datadecoded = await self._ws_request(self._read_request, rlist=rlist)
+        _LOGGER.debug("Resp: %s", datadecoded)
+        if datadecoded.get("err"):
+            _LOGGER.error("Read failed: %s", datadecoded["err"])
+            raise WFWebsocketClosedError(datadecoded["err"])
+        with self.instrumentation.phase("model", datadecoded.get("awlid") or self.gwid):
+            reading = WFReading(datadecoded)
+        self.settings_cache.update(reading.awlid or self.gwid, datadecoded, sent)
+        return reading
+
+    async def read_with_retry(self, sensors=None, block=True):
+        """Read, logging in again on failure.
+
+        Backs off and trips the gateway's CircuitBreaker like
+        SymphonyGeothermal.read_with_retry, including ``block=False``.
+        The backoff is an ``asyncio.sleep``, so cancelling the calling
+        task stops the retries without tying up a thread.
+        """
+        breaker = self.breaker()
+        while True:
+            if not breaker.allow():
+                if not block:
+                    raise WFCircuitOpenError(self.gwid, breaker.retry_in)
+                await asyncio.sleep(breaker.retry_in)
+                continue
+            try:
+                if self.fails >= 1:
+                    await self.login()
+                    _LOGGER.debug("Reconnected to furnace")
+                data = await self.read(sensors)
+            except (
+                aiohttp.ClientError,
+                asyncio.TimeoutError,
+                WFWebsocketClosedError,
+            ) as e:
+                if isinstance(e, WFWebsocketClosedError):
+                    _LOGGER.exception("websocket read failed, reconnecting")
+                else:
+                    _LOGGER.exception("relogin failed, trying again")
+                self.fails = self.fails + 1
+                self.instrumentation.count("retries", 1, self.gwid)
+                delay = breaker.record_failure()
+                if not block:
+                    raise
+            else:
+                self.fails = 0
+                breaker.record_success()
+                return data
+            if self.fails > self.max_fails:
+                raise WFWebsocketClosedError(
+                    "Failed to refresh credentials after retries"
+                )
+            if breaker.retry_in == 0:
+                await asyncio.sleep(delay)
+
+    async def _scheduled_read(self, delay, sensors):
+        await asyncio.sleep(delay)
+        return await self.read(sensors)
+
+    async def stream(self, interval=STREAM_INTERVAL, sensors=None):
+        """Async iterator yielding a reading every ``interval`` seconds.
+
+        Works like SymphonyGeothermal.stream: each tick's read is started
+        on time as a task, missed ticks are skipped, and failures
+        reconnect through read_with_retry::
+
+            async for reading in client.stream(15, sensors="power"):
+                ...
+        """
+        if interval <= 0:
+            raise ValueError(f"interval must be positive, got: {interval}")
+        resolve_sensors(sensors)
+        loop = asyncio.get_running_loop()
+        tick = loop.time()
+        request = None
+        try:
+            while True:
+                if request is None:
+                    request = asyncio.ensure_future(self._scheduled_read(0, sensors))
+                try:
+                    reading = await request
+                except (
+                    aiohttp.ClientError,
+                    asyncio.TimeoutError,
+                    WFWebsocketClosedError,
+                ):
+                    _LOGGER.warning("Stream read failed, reconnecting", exc_info=True)
+                    self.fails = self.fails + 1
+                    self.instrumentation.count("retries", 1, self.gwid)
+                    self.breaker().record_failure()
+                    reading = await self.read_with_retry(sensors)
+                    tick = loop.time()
+                else:
+                    self.fails = 0
+                    self.breaker().record_success()
+                tick += interval
+                request = asyncio.ensure_future(
+                    self._scheduled_read(max(0.0, tick - loop.time()), sensors)
+                )
+                yield reading
+                behind = loop.time() - tick
+                if behind >= interval:
+                    missed = int(behind // interval)
+                    _LOGGER.debug("Stream fell behind, skipping %d ticks", missed)
+                    tick += missed * interval
+                    # a read still in flight can't be abandoned without
+                    # leaving its reply on the socket, so only drop done ones
+                    if request.done():
+                        if not request.cancelled():
+                            request.exception()
+                        request = None
+        finally:
+            if request is not None:
+                request.cancel()
+
+    async def set_mode(self, mode):
+        """Set the active thermostat mode (Off=0, Auto=1, Cool=2, Heat=3, E-Heat=4)."""
+        return await self._ws_write(**mode_write(mode))
+
+    async def set_cooling_setpoint(self, temperature):
+        """Set the cooling temperature setpoint (60-90F)."""
+        return await self._ws_write(**cooling_setpoint_write(temperature))
+
+    async def set_heating_setpoint(self, temperature):
+        """Set the heating temperature setpoint (40-80F)."""
+        return await self._ws_write(**heating_setpoint_write(temperature))
+
+    async def set_fan_mode(self, mode, intertimeon=None, intertimeoff=None):
+        """Set the fan mode (Auto=0, Continuous=1, Intermittent=2)."""
+        return await self._ws_write(**fan_mode_write(mode, intertimeon, intertimeoff))
+
+    async def set_humidity(self, humidity):
+        """Set the humidification target (15-95 percent)."""
+        validate_humidity(humidity)
+        reading = self._cached_reading(HUMIDITY_WRITE_SENSORS)
+        if reading is None:
+            reading = await self.read(HUMIDITY_WRITE_SENSORS)
+        return await self._ws_write(**humidity_write(humidity, reading))
+
+    async def _write_outcome(self, **params):
+        try:
+            return await self._ws_write(**params), None
+        except WFException as e:
+            return None, e
+
+    async def apply(self, settings):
+        """Write several settings in as few round trips as possible.
+
+        Like SymphonyGeothermal.apply, returning a WriteResult, except
+        that the writes go one after another, mode first, as this client
+        has one request on the websocket at a time.
+        """
+        writes, humidity = settings_write(settings)
+        result = WriteResult()
+        start = time.monotonic()
+        for fields, params in writes:
+            result.record(fields, *await self._write_outcome(**params))
+        if humidity is not None:
+            try:
+                result.record(("humidity",), await self.set_humidity(humidity))
+            except WFException as e:
+                result.record(("humidity",), error=e)
+        result.elapsed = time.monotonic() - start
+        return result
+
+    async def get_energy_data(
+        self, start_date, end_date, frequency="1H", timezone_str="America/New_York"
+    ):
+        """Get energy data for a date range.
+
+        See SymphonyGeothermal.get_energy_data for the arguments.
+        """
+        url = self._energy_url(start_date, end_date, frequency, timezone_str)
+        _LOGGER.debug(f"Requesting energy data from: {url}")
+        with self.instrumentation.phase("energy", self.gwid):
+            return await self._download_energy_data(url, start_date, end_date)
+
+    async def _download_energy_data(self, url, start_date, end_date):
+        try:
+            async with self.session.get(
+                url,
+                headers={"user-agent": USER_AGENT},
+                cookies={"sessionid": self.sessionid, "legal-acknowledge": "yes"},
+                timeout=aiohttp.ClientTimeout(total=TIMEOUT),
+            ) as res:
+                res.raise_for_status()
+                content = await res.read()
+            self.instrumentation.count("bytes_in", len(content), self.gwid)
+            if not content.strip():
+                raise WFNoDataError(
+                    f"No energy data available for {start_date} to {end_date}"
+                )
+            data = self.codec.loads(content)
+            _LOGGER.debug(f"Received energy data: {len(data.get('index', []))} records")
+            return WFEnergyData(data)
+        except WFNoDataError:
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            _LOGGER.exception(f"Request error getting energy data: {e}")
+            raise WFError(f"Failed to get energy data: {e}") from e
+        except (ValueError, KeyError) as e:
+            _LOGGER.exception(f"Error parsing energy data response: {e}")
+            raise WFError(f"Invalid energy data response: {e}") from e
+
+    async def _energy_chunk(
+        self, start_date, end_date, frequency, timezone_str, retries, limit
+    ):
+        for attempt in range(retries + 1):
+            try:
+                async with limit:
+                    return await self.get_energy_data(
+                        start_date, end_date, frequency, timezone_str
+                    )
+            except WFNoDataError:  # noqa: PERF203
+                return None
+            except WFError as e:
+                if attempt == retries:
+                    raise WFError(
+                        f"Failed to get energy data for {start_date} to {end_date}"
+                        f" after {retries + 1} attempts: {e}"
+                    ) from e
+                _LOGGER.warning(
+                    "Energy data for %s to %s failed, retrying", start_date, end_date
+                )
+                await asyncio.sleep(ENERGY_RETRY_DELAY * (attempt + 1))
+
+    async def get_energy_data_bulk(
+        self,
+        start_date,
+        end_date,
+        frequency="1H",
+        timezone_str="America/New_York",
+        chunk_days=None,
+        max_workers=ENERGY_WORKERS,
+        retries=ENERGY_RETRIES,
+    ):
+        """Get energy data for a long date range in concurrent chunks.
+
+        See SymphonyGeothermal.get_energy_data_bulk for the arguments,
+        ``max_workers`` bounds the requests in flight.
+        """
+        self._energy_url(start_date, end_date, frequency, timezone_str)
+        if chunk_days is None:
+            chunk_days = ENERGY_CHUNK_DAYS[frequency]
+        chunks = energy_chunks(start_date, end_date, chunk_days)
+        limit = asyncio.Semaphore(max(1, max_workers))
+        tasks = [
+            asyncio.ensure_future(
+                self._energy_chunk(start, end, frequency, timezone_str, retries, limit)
+            )
+            for start, end in chunks
+        ]
+        try:
+            parts = await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        parts = [part for part in parts if part is not None]
+        if not parts:
+            raise WFNoDataError(
+                f"No energy data available for {start_date} to {end_date}"
+            )
+        return WFEnergyData.merge(parts)
+
+
+class AsyncWaterFurnace(AsyncSymphonyGeothermal):
+    vendor = "waterfurnace"
+
+    def __init__(
+        self,
+        user,
+        passwd,
+        max_fails=5,
+        device=0,
+        location=0,
+        sessionid=None,
+        **kwargs,
+    ):
+        super().__init__(
+            WF_BASE_URL,
+            WF_LOGIN_URL,
+            WF_WS_URL,
+            user,
+            passwd,
+            max_fails,
+            device,
+            location,
+            sessionid=sessionid,
+            **kwargs,
+        )
+
+
+class AsyncGeoStar(AsyncSymphonyGeothermal):
+    vendor = "geostar"
+
+    def __init__(
+        self,
+        user,
+        passwd,
+        max_fails=5,
+        device=0,
+        location=0,
+        sessionid=None,
+        **kwargs,
+    ):
+        super().__init__(
+            GS_BASE_URL,
+            GS_LOGIN_URL,
+            GS_WS_URL,
+            user,
+            passwd,
+            max_fails,
+            device,
+            location,
+            sessionid=sessionid,
+            **kwargs,
+        )
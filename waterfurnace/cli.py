@@ -2,10 +2,13 @@
 
 import datetime
 import logging
-import time
 
 import click
 
+import waterfurnace.energy_cache
+import waterfurnace.exporter
+import waterfurnace.instrumentation
+import waterfurnace.session_store
 import waterfurnace.waterfurnace
 
 logging.basicConfig()
@@ -38,6 +41,14 @@ COMMON_OPTIONS = [
         required=False,
         help="Symphony session ID (or set WF_SESSIONID env var)",
     ),
+    click.option(
+        "--session-cache",
+        "session_cache",
+        envvar="WF_SESSION_CACHE",
+        required=False,
+        type=click.Path(dir_okay=False),
+        help="File to share session IDs between runs (or set WF_SESSION_CACHE)",
+    ),
     click.option(
         "-D",
         "--device",
@@ -76,18 +87,44 @@ def common_options(func):
     return func
 
 
-def get_client(user, passwd, sessionid, device, location, vendor, debug):
+def make_client(
+    user,
+    passwd,
+    sessionid,
+    session_cache,
+    device,
+    location,
+    vendor,
+    debug,
+    instrumentation=None,
+):
+    """Build a client from the common options, without logging in."""
     if debug:
         logger.setLevel(logging.DEBUG)
 
+    session_store = None
+    if session_cache:
+        session_store = waterfurnace.session_store.SessionStore(session_cache)
+
     if vendor == "geostar":
-        wf = waterfurnace.waterfurnace.GeoStar(
-            user, passwd, device=device, location=location, sessionid=sessionid
-        )
+        cls = waterfurnace.waterfurnace.GeoStar
     else:
-        wf = waterfurnace.waterfurnace.WaterFurnace(
-            user, passwd, device=device, location=location, sessionid=sessionid
-        )
+        cls = waterfurnace.waterfurnace.WaterFurnace
+    return cls(
+        user,
+        passwd,
+        device=device,
+        location=location,
+        sessionid=sessionid,
+        session_store=session_store,
+        instrumentation=instrumentation,
+    )
+
+
+def get_client(user, passwd, sessionid, session_cache, device, location, vendor, debug):
+    wf = make_client(
+        user, passwd, sessionid, session_cache, device, location, vendor, debug
+    )
     wf.login()
 
     click.echo(f"Login Succeeded: session_id = {wf.sessionid}")
@@ -113,10 +150,20 @@ def main():
       WF_USERNAME   Symphony username
       WF_PASSWORD   Symphony password
       WF_SESSIONID  Existing session ID (optional)
+      WF_SESSION_CACHE  File to share session IDs between runs (optional)
     """
     pass
 
 
+def _profile_attributes(profile):
+    """WFReading attribute names for the sensors in a profile."""
+    attrs = (
+        waterfurnace.waterfurnace.sensor_attribute(name)
+        for name in waterfurnace.waterfurnace.SENSOR_PROFILES[profile]
+    )
+    return [attr for attr in attrs if attr is not None]
+
+
 @main.command("sensors")
 @common_options
 @click.option(
@@ -124,7 +171,11 @@ def main():
     "--sensors",
     "sensors",
     required=False,
-    help='Comma separated list of sensors.  Can be "all"',
+    help=(
+        "Comma separated list of sensors, or a profile "
+        f"({', '.join(waterfurnace.waterfurnace.SENSOR_PROFILES)}).  "
+        'Can be "all"'
+    ),
 )
 @click.option(
     "-c",
@@ -135,19 +186,49 @@ def main():
     help="Read sensors every 15 seconds continuously",
 )
 def sensors_cmd(
-    user, passwd, sessionid, device, location, vendor, debug, sensors, continuous
+    user,
+    passwd,
+    sessionid,
+    session_cache,
+    device,
+    location,
+    vendor,
+    debug,
+    sensors,
+    continuous,
 ):
     """Read live sensor data from the unit."""
+    # Only the sensors that get printed are requested from the unit
+    selection = None
+    sensorlist = None
+    if sensors in waterfurnace.waterfurnace.SENSOR_PROFILES:
+        selection = sensors
+        sensorlist = _profile_attributes(sensors)
+    elif sensors is not None and sensors != "all":
+        sensorlist = list(sensors.split(","))
+        selection = sensorlist
+    try:
+        waterfurnace.waterfurnace.resolve_sensors(selection)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="--sensors") from e
+
     click.echo("\nStep 1: Login")
-    wf = get_client(user, passwd, sessionid, device, location, vendor, debug)
+    wf = get_client(
+        user, passwd, sessionid, session_cache, device, location, vendor, debug
+    )
+
+    if continuous:
+        # requests go out on a 15 second schedule over the one websocket
+        readings = wf.stream(15, sensors=selection)
+    else:
+        readings = [wf.read(sensors=selection)]
 
-    while True:
+    for data in readings:
         dt = datetime.datetime.now()
         now = dt.strftime("%Y-%m-%d %H:%M:%S")
 
         click.echo("")
-        click.echo(f"Attempting to read data {now}")
-        data = wf.read()
+        click.echo(f"Read data {now}")
 
         if sensors is None:
             click.echo(data)
@@ -155,16 +236,43 @@ def sensors_cmd(
             if sensors == "all":
                 attrs = dir(data)
                 sensorlist = [attr for attr in attrs if not attr.startswith("_")]
-            else:
-                sensorlist = list(sensors.split(","))
 
             for sensor in sensorlist:
                 click.echo(f"{sensor} = {getattr(data, sensor)}")
 
-        if continuous:
-            time.sleep(15)
-        else:
-            break
+
+ENERGY_METRICS = {
+    "Total Power": "total_power",
+    "Total Heat 1": "total_heat_1",
+    "Total Heat 2": "total_heat_2",
+    "Total Cool 1": "total_cool_1",
+    "Total Cool 2": "total_cool_2",
+    "Total Electric Heat": "total_electric_heat",
+    "Total Fan Only": "total_fan_only",
+    "Total Loop Pump": "total_loop_pump",
+    "Heat Runtime": "heat_runtime",
+    "Cool Runtime": "cool_runtime",
+}
+
+
+def energy_summary(energy_data):
+    """(name, min, max, mean, total) of each ENERGY_METRICS column with data."""
+    rows = []
+    for metric_name, column in ENERGY_METRICS.items():
+        if column not in energy_data.columns:
+            continue
+        min_val = energy_data.min(column)
+        if min_val is not None:
+            rows.append(
+                (
+                    metric_name,
+                    min_val,
+                    energy_data.max(column),
+                    energy_data.mean(column),
+                    energy_data.sum(column),
+                )
+            )
+    return rows
 
 
 @main.command("energy")
@@ -197,10 +305,29 @@ def sensors_cmd(
     show_default=True,
     help="Timezone for energy data",
 )
+@click.option(
+    "--chunk-days",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Download the range in chunks of this many days, several at a time",
+)
+@click.option(
+    "--cache-dir",
+    envvar="WF_ENERGY_CACHE",
+    default=None,
+    help="Keep energy data in this directory; closed days are not downloaded again",
+)
+@click.option(
+    "--refresh",
+    is_flag=True,
+    default=False,
+    help="With --cache-dir, drop the cached days in the range first",
+)
 def energy_cmd(
     user,
     passwd,
     sessionid,
+    session_cache,
     device,
     location,
     vendor,
@@ -209,10 +336,21 @@ def energy_cmd(
     end_date,
     frequency,
     timezone_str,
+    chunk_days,
+    cache_dir,
+    refresh,
 ):
     """Get historical energy data from the unit."""
     click.echo("\nStep 1: Login")
-    wf = get_client(user, passwd, sessionid, device, location, vendor, debug)
+    wf = get_client(
+        user, passwd, sessionid, session_cache, device, location, vendor, debug
+    )
+    if cache_dir:
+        wf.energy_cache = waterfurnace.energy_cache.EnergyCache(cache_dir)
+        if refresh:
+            wf.energy_cache.invalidate(
+                wf.gwid, frequency, timezone_str, start_date, end_date
+            )
 
     click.echo("\nStep 2: Get Energy Data")
     click.echo(
@@ -221,7 +359,14 @@ def energy_cmd(
     )
 
     try:
-        energy_data = wf.get_energy_data(start_date, end_date, frequency, timezone_str)
+        if chunk_days:
+            energy_data = wf.get_energy_data_bulk(
+                start_date, end_date, frequency, timezone_str, chunk_days=chunk_days
+            )
+        else:
+            energy_data = wf.get_energy_data(
+                start_date, end_date, frequency, timezone_str
+            )
         click.echo(f"\nReceived {len(energy_data)} energy readings")
 
         if len(energy_data) == 0:
@@ -230,34 +375,12 @@ def energy_cmd(
 
         click.echo("\nEnergy Data Summary:")
 
-        def calc_stats(values):
-            filtered = [v for v in values if v is not None]
-            if not filtered:
-                return None, None, None, None
-            total = sum(filtered)
-            return (min(filtered), max(filtered), total / len(filtered), total)
-
-        metrics = {
-            "Total Power": [r.total_power for r in energy_data],
-            "Total Heat 1": [r.total_heat_1 for r in energy_data],
-            "Total Heat 2": [r.total_heat_2 for r in energy_data],
-            "Total Cool 1": [r.total_cool_1 for r in energy_data],
-            "Total Cool 2": [r.total_cool_2 for r in energy_data],
-            "Total Electric Heat": [r.total_electric_heat for r in energy_data],
-            "Total Fan Only": [r.total_fan_only for r in energy_data],
-            "Total Loop Pump": [r.total_loop_pump for r in energy_data],
-            "Heat Runtime": [r.heat_runtime for r in energy_data],
-            "Cool Runtime": [r.cool_runtime for r in energy_data],
-        }
-
-        for metric_name, values in metrics.items():
-            min_val, max_val, avg_val, total_val = calc_stats(values)
-            if min_val is not None:
-                click.echo(f"\n{metric_name}:")
-                click.echo(f"   Min: {min_val:.2f}")
-                click.echo(f"   Max: {max_val:.2f}")
-                click.echo(f"   Avg: {avg_val:.2f}")
-                click.echo(f"   Total: {total_val:.2f}")
+        for metric_name, min_val, max_val, mean, total in energy_summary(energy_data):
+            click.echo(f"\n{metric_name}:")
+            click.echo(f"   Min: {min_val:.2f}")
+            click.echo(f"   Max: {max_val:.2f}")
+            click.echo(f"   Avg: {mean:.2f}")
+            click.echo(f"   Total: {total:.2f}")
 
     except waterfurnace.waterfurnace.WFNoDataError as e:
         click.echo(f"No data available: {e}")
@@ -278,9 +401,13 @@ MODE_MAP = {
 @main.command("set-mode")
 @common_options
 @click.argument("mode", type=click.Choice(list(MODE_MAP.keys())))
-def set_mode(user, passwd, sessionid, device, location, vendor, debug, mode):
+def set_mode(
+    user, passwd, sessionid, session_cache, device, location, vendor, debug, mode
+):
     """Set the thermostat mode (off, auto, cool, heat, eheat)."""
-    wf = get_client(user, passwd, sessionid, device, location, vendor, debug)
+    wf = get_client(
+        user, passwd, sessionid, session_cache, device, location, vendor, debug
+    )
     try:
         wf.set_mode(MODE_MAP[mode])
     except ValueError as e:
@@ -292,10 +419,12 @@ def set_mode(user, passwd, sessionid, device, location, vendor, debug, mode):
 @common_options
 @click.argument("temperature", type=float)
 def set_cooling_temp(
-    user, passwd, sessionid, device, location, vendor, debug, temperature
+    user, passwd, sessionid, session_cache, device, location, vendor, debug, temperature
 ):
     """Set the cooling temperature setpoint (60-90F)."""
-    wf = get_client(user, passwd, sessionid, device, location, vendor, debug)
+    wf = get_client(
+        user, passwd, sessionid, session_cache, device, location, vendor, debug
+    )
     try:
         wf.set_cooling_setpoint(temperature)
     except ValueError as e:
@@ -307,10 +436,12 @@ def set_cooling_temp(
 @common_options
 @click.argument("temperature", type=float)
 def set_heating_temp(
-    user, passwd, sessionid, device, location, vendor, debug, temperature
+    user, passwd, sessionid, session_cache, device, location, vendor, debug, temperature
 ):
     """Set the heating temperature setpoint (40-80F)."""
-    wf = get_client(user, passwd, sessionid, device, location, vendor, debug)
+    wf = get_client(
+        user, passwd, sessionid, session_cache, device, location, vendor, debug
+    )
     try:
         wf.set_heating_setpoint(temperature)
     except ValueError as e:
@@ -318,5 +449,74 @@ def set_heating_temp(
     click.echo(f"Heating setpoint set to {temperature}F")
 
 
+@main.command("exporter")
+@common_options
+@click.option(
+    "--host",
+    default="",
+    help="Address to serve metrics on (default all interfaces)",
+)
+@click.option(
+    "--port",
+    type=click.IntRange(0, 65535),
+    default=waterfurnace.exporter.EXPORTER_PORT,
+    show_default=True,
+    help="Port to serve /metrics on",
+)
+@click.option(
+    "--interval",
+    type=click.FloatRange(min=1),
+    default=15,
+    show_default=True,
+    help="Seconds between polls of the account",
+)
+@click.option(
+    "--connections",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Websockets to spread the account's gateways over",
+)
+def exporter_cmd(
+    user,
+    passwd,
+    sessionid,
+    session_cache,
+    device,
+    location,
+    vendor,
+    debug,
+    host,
+    port,
+    interval,
+    connections,
+):
+    """Serve sensor values of every gateway on the account to Prometheus.
+
+    Logs in once and polls in the background, scrapes of /metrics are
+    answered from the last poll, along with how long each phase of
+    talking to Symphony takes.
+    """
+    wf = make_client(
+        user,
+        passwd,
+        sessionid,
+        session_cache,
+        device,
+        location,
+        vendor,
+        debug,
+        instrumentation=waterfurnace.instrumentation.MetricsRegistry(),
+    )
+    exporter = waterfurnace.exporter.Exporter(
+        wf, interval=interval, connections=connections
+    )
+    click.echo(f"Serving metrics on {host or '0.0.0.0'}:{port}/metrics")
+    try:
+        exporter.serve_forever(host, port)
+    except KeyboardInterrupt:
+        pass
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,69 @@
+"""JSON codecs for websocket frames and HTTP bodies.
+
+orjson is used when it is installed (``pip install waterfurnace[fast]``),
+otherwise the stdlib json module. A client can be given any object with
+the same ``dumps`` / ``loads`` methods through ``codec=``.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+class JSONCodec:
+    """The stdlib json module."""
+
+    name = "json"
+
+    def dumps(self, obj):
+        """Encode ``obj`` as a JSON str."""
+        return json.dumps(obj)
+
+    def loads(self, data):
+        """Decode a JSON str or bytes, raising ValueError if it isn't valid."""
+        return json.loads(data)
+
+    def __repr__(self):
+        return f"<{type(self).__name__}>"
+
+
+class OrjsonCodec(JSONCodec):
+    """orjson, several times faster than the stdlib for our payloads.
+
+    Its output has no spaces after separators, and its decode errors
+    are ValueErrors like the stdlib's.
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("OrjsonCodec requires orjson")
+
+    def dumps(self, obj):
+        # websocket frames are text, so hand back a str like json.dumps
+        return orjson.dumps(obj).decode()
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+CODECS = {"json": JSONCodec, "orjson": OrjsonCodec}
+
+
+def get_codec(name=None):
+    """Return a codec by name, or the fastest one available for None."""
+    if name is None:
+        name = "orjson" if orjson is not None else "json"
+    try:
+        return CODECS[name]()
+    except KeyError as e:
+        raise ValueError(
+            f"Unknown JSON codec: {name}, must be one of {sorted(CODECS)}"
+        ) from e
+
+
+DEFAULT_CODEC = get_codec()
@@ -0,0 +1,138 @@
+"""Emit only what changed between successive readings of a gateway."""
+
+from operator import attrgetter
+
+from waterfurnace.waterfurnace import ActiveSettings, WFReading
+
+# Bookkeeping fields that differ on every read or never change
+_SKIP = ("zone", "err", "awlid", "tid", "activesettings")
+
+# Every compared field, activesettings flattened to dotted names
+DELTA_FIELDS = tuple(f for f in WFReading.__slots__ if f not in _SKIP) + tuple(
+    f"activesettings.{f}" for f in ActiveSettings.__slots__
+)
+
+# Compared fields whose values aren't numbers, so have no deadband
+_NOT_NUMERIC = ("raw_humidity_offset_settings",)
+
+
+class ReadingDelta:
+    """The fields of a reading that changed since the last one emitted.
+
+    ``changes`` maps field name (``activesettings.*`` for the active
+    settings) to its new value. The first reading of a gateway is a
+    ``baseline`` with every field in it. A delta with no changes is
+    false.
+    """
+
+    __slots__ = ("gwid", "changes", "reading", "baseline")
+
+    def __init__(self, gwid, changes, reading, baseline=False):
+        self.gwid = gwid
+        self.changes = changes
+        self.reading = reading
+        self.baseline = baseline
+
+    def __bool__(self):
+        return bool(self.changes)
+
+    def __len__(self):
+        return len(self.changes)
+
+    def __repr__(self):
+        return f"<ReadingDelta gwid={self.gwid}, changes={self.changes}>"
+
+
+class DeltaTracker:
+    """Compares each reading to the previous one for the same gwid.
+
+    ``deadbands`` maps a numeric field to how far it may move from the
+    last emitted value before it counts as changed, e.g.
+    ``{"totalunitpower": 1}`` ignores ±1 W of jitter. Comparing against
+    the last emitted value, rather than the last reading, means a slow
+    drift is still reported once it adds up. Other fields, and moves to
+    or from None, are reported on any change; a deadband on a field that
+    isn't numeric is a ValueError. ``fields`` limits the
+    comparison to a subset of DELTA_FIELDS.
+    """
+
+    def __init__(self, deadbands=None, fields=DELTA_FIELDS):
+        self.fields = tuple(fields)
+        unknown = set(self.fields).difference(DELTA_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        deadbands = dict(deadbands or {})
+        unknown = set(deadbands).difference(self.fields)
+        if unknown:
+            raise ValueError(
+                f"Deadbands for unknown fields: {', '.join(sorted(unknown))}"
+            )
+        not_numeric = set(deadbands).intersection(_NOT_NUMERIC)
+        if not_numeric:
+            raise ValueError(
+                f"Deadbands for non-numeric fields: {', '.join(sorted(not_numeric))}"
+            )
+        self.deadbands = deadbands
+        # field index -> band, for the fields that have one
+        self._bands = {
+            i: deadbands[f] for i, f in enumerate(self.fields) if f in deadbands
+        }
+        self._get = attrgetter(*self.fields)
+        # gwid -> list of the last emitted value of each field
+        self._last = {}
+
+    def __repr__(self):
+        return f"<DeltaTracker gateways={len(self._last)}, fields={len(self.fields)}>"
+
+    def _values(self, reading):
+        values = self._get(reading)
+        # attrgetter returns a bare value, not a tuple, for a single field
+        return list(values) if len(self.fields) > 1 else [values]
+
+    def update(self, reading, gwid=None):
+        """Record ``reading`` and return a ReadingDelta of what changed.
+
+        ``gwid`` defaults to the reading's ``awlid``.
+        """
+        if gwid is None:
+            gwid = reading.awlid
+        values = self._values(reading)
+        last = self._last.get(gwid)
+        if last is None:
+            self._last[gwid] = values
+            return ReadingDelta(
+                gwid, dict(zip(self.fields, values, strict=True)), reading, True
+            )
+
+        changes = {}
+        for i, (new, old) in enumerate(zip(values, last, strict=True)):
+            if new == old:
+                continue
+            band = self._bands.get(i)
+            if band is not None and new is not None and old is not None:
+                if abs(new - old) <= band:
+                    continue
+            last[i] = new
+            changes[self.fields[i]] = new
+        return ReadingDelta(gwid, changes, reading)
+
+    def track(self, readings, gwid=None):
+        """Yield a ReadingDelta for each reading that changed something.
+
+        ``readings`` is any iterable of WFReading, e.g. client.stream().
+        """
+        for reading in readings:
+            delta = self.update(reading, gwid)
+            if delta:
+                yield delta
+
+    def reset(self, gwid=None):
+        """Forget one gateway, or all of them, so the next reading is a baseline."""
+        if gwid is None:
+            self._last.clear()
+        else:
+            self._last.pop(gwid, None)
+
+    def last(self, gwid):
+        """The last emitted value of each field for ``gwid``."""
+        return dict(zip(self.fields, self._last[gwid], strict=True))
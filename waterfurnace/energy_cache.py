@@ -0,0 +1,216 @@
+"""Local SQLite cache of Symphony energy data, one row per gateway day."""
+
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from waterfurnace.waterfurnace import WFEnergyData, WFNoDataError
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "waterfurnace")
+
+# Seconds after a day ends (in the requested timezone) before it is
+# treated as closed, to give late readings time to arrive.
+SETTLE_TIME = 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS energy_days (
+    gwid TEXT NOT NULL,
+    frequency TEXT NOT NULL,
+    timezone TEXT NOT NULL,
+    day TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (gwid, frequency, timezone, day)
+)
+"""
+
+
+def _zone(timezone_str):
+    try:
+        return ZoneInfo(timezone_str)
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        raise ValueError(f"Unknown timezone: {timezone_str}") from e
+
+
+def split_days(energy, timezone_str):
+    """Split WFEnergyData into API style dicts per local day."""
+    tz = _zone(timezone_str)
+    days = {}
+    for timestamp, row in zip(energy.timestamps, energy.data, strict=True):
+        day = datetime.fromtimestamp(timestamp / 1000.0, tz).date()
+        part = days.setdefault(
+            day, {"columns": energy.columns, "index": [], "data": []}
+        )
+        part["index"].append(timestamp)
+        part["data"].append(row)
+    return days
+
+
+def _runs(days):
+    """Group sorted dates into (first, last) runs of consecutive days."""
+    runs = []
+    for day in days:
+        if runs and day == runs[-1][1] + timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return runs
+
+
+class EnergyCache:
+    """Energy data keyed by (gwid, frequency, timezone, day).
+
+    A day that has ended (plus ``settle_time``) can't change any more,
+    so once fetched it is served from the cache. Days still open, like
+    today, and closed days that came back empty are always fetched
+    again. The database lives in
+    ``directory`` and can be shared between processes.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, settle_time=SETTLE_TIME):
+        self.directory = directory
+        self.path = os.path.join(directory, "energy.sqlite3")
+        self.settle_time = settle_time
+
+    def __repr__(self):
+        return f"<EnergyCache path={self.path}>"
+
+    @contextlib.contextmanager
+    def _connect(self):
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                conn.execute(_SCHEMA)
+                yield conn
+        finally:
+            conn.close()
+
+    def closed_before(self, timezone_str, now=None):
+        """The first day, in ``timezone_str``, that isn't closed yet."""
+        if now is None:
+            now = time.time()
+        local = datetime.fromtimestamp(now - self.settle_time, _zone(timezone_str))
+        return local.date()
+
+    def get(self, gwid, frequency, timezone_str, start_day, end_day):
+        """Return {day: WFEnergyData} for the cached days in the range."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT day, payload FROM energy_days WHERE gwid = ? AND "
+                "frequency = ? AND timezone = ? AND day BETWEEN ? AND ?",
+                (
+                    gwid,
+                    frequency,
+                    timezone_str,
+                    start_day.isoformat(),
+                    end_day.isoformat(),
+                ),
+            ).fetchall()
+        return {
+            date.fromisoformat(day): WFEnergyData(json.loads(payload))
+            for day, payload in rows
+        }
+
+    def put(self, gwid, frequency, timezone_str, day, data):
+        """Store the API style dict ``data`` for one closed day."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO energy_days VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    gwid,
+                    frequency,
+                    timezone_str,
+                    day.isoformat(),
+                    json.dumps(data),
+                    time.time(),
+                ),
+            )
+
+    def invalidate(
+        self,
+        gwid=None,
+        frequency=None,
+        timezone_str=None,
+        start_date=None,
+        end_date=None,
+    ):
+        """Forget cached days; every argument left as None matches all.
+
+        Returns the number of days removed.
+        """
+        clauses = []
+        params = []
+        for column, value in (
+            ("gwid", gwid),
+            ("frequency", frequency),
+            ("timezone", timezone_str),
+        ):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if start_date is not None:
+            clauses.append("day >= ?")
+            params.append(date.fromisoformat(str(start_date)).isoformat())
+        if end_date is not None:
+            clauses.append("day <= ?")
+            params.append(date.fromisoformat(str(end_date)).isoformat())
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            return conn.execute(f"DELETE FROM energy_days{where}", params).rowcount
+
+    def get_energy_data(
+        self, gwid, start_date, end_date, frequency, timezone_str, fetch
+    ):
+        """Get energy data for start_date through end_date, inclusive.
+
+        Cached closed days are served locally. Each run of missing or
+        open days is requested with ``fetch(start, end)``, which returns
+        WFEnergyData, and the closed days with rows in it are stored.
+        """
+        start = date.fromisoformat(str(start_date))
+        end = date.fromisoformat(str(end_date))
+        if end < start:
+            raise ValueError(f"end date {end} is before start date {start}")
+        closed = self.closed_before(timezone_str)
+        parts = self.get(gwid, frequency, timezone_str, start, end)
+        missing = [
+            start + timedelta(days=n)
+            for n in range((end - start).days + 1)
+            if start + timedelta(days=n) not in parts
+        ]
+        _LOGGER.debug(
+            "Energy cache: %d days cached, %d to fetch", len(parts), len(missing)
+        )
+
+        for first, last in _runs(missing):
+            # ask for one more day so an exclusive end still covers `last`
+            try:
+                energy = fetch(
+                    first.isoformat(), (last + timedelta(days=1)).isoformat()
+                )
+            except WFNoDataError:
+                energy = WFEnergyData()
+            by_day = split_days(energy, timezone_str)
+            day = first
+            while day <= last:
+                data = by_day.get(day, {"columns": [], "index": [], "data": []})
+                # a closed day without rows may just be late, ask again next time
+                if day < closed and data["index"]:
+                    self.put(gwid, frequency, timezone_str, day, data)
+                parts[day] = WFEnergyData(data)
+                day += timedelta(days=1)
+
+        energy = WFEnergyData.merge([parts[day] for day in sorted(parts)])
+        if not len(energy):
+            raise WFNoDataError(
+                f"No energy data available for {start_date} to {end_date}"
+            )
+        return energy
@@ -0,0 +1,313 @@
+"""Prometheus exporter serving cached readings for every gateway on an account.
+
+A background thread polls the account with an AccountPoller on a fixed
+schedule and renders the text exposition format once per cycle, so a
+scrape only copies bytes and never waits on Symphony.
+"""
+
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from waterfurnace.history import HISTORY_FIELDS
+from waterfurnace.instrumentation import MetricsRegistry
+from waterfurnace.poller import AccountPoller
+from waterfurnace.waterfurnace import STREAM_INTERVAL, WFCircuitOpenError
+
+_LOGGER = logging.getLogger(__name__)
+
+EXPORTER_PORT = 9809
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "waterfurnace_"
+
+# MetricsRegistry counters -> metric name and help
+COUNTER_METRICS = {
+    "bytes_out": ("sent_bytes_total", "Bytes of requests sent to Symphony"),
+    "bytes_in": ("received_bytes_total", "Bytes of replies received from Symphony"),
+    "retries": ("retries_total", "Failed reads retried after logging in again"),
+    "timeouts": ("timeouts_total", "Requests that got no reply in time"),
+}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class GatewayHealth:
+    """Counters for one gateway, kept across poll cycles."""
+
+    __slots__ = ("reading", "up", "errors", "last_success", "circuit_open")
+
+    def __init__(self):
+        self.reading = None
+        self.up = False
+        self.errors = 0
+        self.last_success = None
+        self.circuit_open = False
+
+
+def _labels(labels):
+    label = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+    return f"{{{label}}}" if label else ""
+
+
+def _render_registry(lines, registry):
+    histograms, counters = registry.collect()
+    name = f"{PREFIX}phase_seconds"
+    lines.append(f"# HELP {name} Time spent in each phase of talking to Symphony")
+    lines.append(f"# TYPE {name} histogram")
+    for (phase, gwid), histogram in sorted(
+        histograms.items(), key=lambda item: (item[0][0], str(item[0][1]))
+    ):
+        labels = {"phase": phase}
+        if gwid is not None:
+            labels["gwid"] = gwid
+        total = 0
+        bounds = [_number(b) for b in histogram.buckets] + ["+Inf"]
+        for bound, count in zip(bounds, histogram.counts, strict=True):
+            total += count
+            lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {total}")
+        lines.append(f"{name}_sum{_labels(labels)} {_number(histogram.sum)}")
+        lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+    for counter in sorted({name for name, _ in counters}):
+        metric, help_text = COUNTER_METRICS.get(
+            counter, (f"{counter}_total", f"Instrumentation counter {counter}")
+        )
+        lines.append(f"# HELP {PREFIX}{metric} {help_text}")
+        lines.append(f"# TYPE {PREFIX}{metric} counter")
+        for gwid in sorted((g for n, g in counters if n == counter), key=str):
+            labels = _labels({"gwid": gwid} if gwid is not None else {})
+            value = _number(counters[counter, gwid])
+            lines.append(f"{PREFIX}{metric}{labels} {value}")
+
+
+def render(gateways, polls, poll_errors, last_poll, last_duration, registry=None):
+    """The text exposition of the exporter state.
+
+    ``gateways`` maps gwid to GatewayHealth. Readings are the last good
+    one for each gateway, ``waterfurnace_up`` says whether the latest
+    poll got it. With a MetricsRegistry, its phase timings and counters
+    are added as ``waterfurnace_phase_seconds`` and friends.
+    """
+    lines = []
+
+    def family(name, kind, help_text, samples):
+        lines.append(f"# HELP {PREFIX}{name} {help_text}")
+        lines.append(f"# TYPE {PREFIX}{name} {kind}")
+        for labels, value in samples:
+            if value is None:
+                continue
+            lines.append(f"{PREFIX}{name}{_labels(labels)} {_number(value)}")
+
+    gwids = sorted(gateways)
+    for field in HISTORY_FIELDS:
+        family(
+            field,
+            "gauge",
+            f"Last {field} reading from the unit",
+            [
+                ({"gwid": gwid}, getattr(gateways[gwid].reading, field))
+                for gwid in gwids
+                if gateways[gwid].reading is not None
+            ],
+        )
+    family(
+        "up",
+        "gauge",
+        "Whether the last poll read the gateway",
+        [({"gwid": gwid}, gateways[gwid].up) for gwid in gwids],
+    )
+    family(
+        "circuit_open",
+        "gauge",
+        "Whether the gateway's circuit breaker skipped it in the last poll",
+        [({"gwid": gwid}, gateways[gwid].circuit_open) for gwid in gwids],
+    )
+    family(
+        "read_errors_total",
+        "counter",
+        "Failed reads of the gateway",
+        [({"gwid": gwid}, gateways[gwid].errors) for gwid in gwids],
+    )
+    family(
+        "last_success_timestamp_seconds",
+        "gauge",
+        "Unix time of the last good reading of the gateway",
+        [({"gwid": gwid}, gateways[gwid].last_success) for gwid in gwids],
+    )
+    family("polls_total", "counter", "Poll cycles run", [({}, polls)])
+    family(
+        "poll_errors_total",
+        "counter",
+        "Poll cycles that failed outright, e.g. on login",
+        [({}, poll_errors)],
+    )
+    family(
+        "last_poll_timestamp_seconds",
+        "gauge",
+        "Unix time the last poll cycle finished",
+        [({}, last_poll)],
+    )
+    family(
+        "poll_duration_seconds",
+        "gauge",
+        "How long the last poll cycle took",
+        [({}, last_duration)],
+    )
+    if registry is not None:
+        _render_registry(lines, registry)
+    lines.append("")
+    return "\n".join(lines).encode()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        _LOGGER.debug("%s - " + format, self.address_string(), *args)
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.exporter.snapshot
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class Exporter:
+    """Polls an account in the background and serves the latest metrics.
+
+    ``client`` is a (not yet logged in) WaterFurnace / GeoStar client,
+    handed to an AccountPoller with ``connections`` websockets and
+    ``sensors``. A poll runs every ``interval`` seconds; a cycle that
+    fails outright is counted and the login is retried on the next one.
+    If the client's ``instrumentation`` is a MetricsRegistry, its phase
+    timings are served too.
+    """
+
+    def __init__(
+        self, client, interval=STREAM_INTERVAL, connections=1, sensors=None, poller=None
+    ):
+        if interval <= 0:
+            raise ValueError(f"interval must be positive, got: {interval}")
+        self.interval = interval
+        self.poller = (
+            poller
+            if poller is not None
+            else AccountPoller(client, connections=connections, sensors=sensors)
+        )
+        self.gateways = {}
+        self.polls = 0
+        self.poll_errors = 0
+        self.last_poll = None
+        self.last_duration = None
+        instrumentation = getattr(client, "instrumentation", None)
+        self.registry = (
+            instrumentation if isinstance(instrumentation, MetricsRegistry) else None
+        )
+        self.snapshot = self._render()
+        self._logged_in = False
+        self._stop = threading.Event()
+        self._thread = None
+        self._server = None
+
+    def __repr__(self):
+        return f"<Exporter gateways={len(self.gateways)}, polls={self.polls}>"
+
+    def _render(self):
+        return render(
+            self.gateways,
+            self.polls,
+            self.poll_errors,
+            self.last_poll,
+            self.last_duration,
+            self.registry,
+        )
+
+    def poll_once(self):
+        """Run one poll cycle and refresh the snapshot."""
+        start = time.monotonic()
+        try:
+            if not self._logged_in:
+                self.poller.login()
+                self._logged_in = True
+            result = self.poller.poll()
+        except Exception:
+            _LOGGER.exception("Poll failed, logging in again next cycle")
+            self._logged_in = False
+            self.poll_errors += 1
+            for health in self.gateways.values():
+                health.up = False
+        else:
+            now = time.time()
+            for gwid in set(result.readings) | set(result.errors):
+                health = self.gateways.get(gwid)
+                if health is None:
+                    health = self.gateways[gwid] = GatewayHealth()
+                error = result.errors.get(gwid)
+                health.up = error is None
+                health.circuit_open = isinstance(error, WFCircuitOpenError)
+                if error is None:
+                    health.reading = result.readings[gwid]
+                    health.last_success = now
+                elif not health.circuit_open:
+                    health.errors += 1
+        self.polls += 1
+        self.last_poll = time.time()
+        self.last_duration = time.monotonic() - start
+        # swapped in whole, a scrape sees one cycle or the next
+        self.snapshot = self._render()
+
+    def _run(self):
+        deadline = time.monotonic()
+        while not self._stop.is_set():
+            self.poll_once()
+            deadline += self.interval
+            now = time.monotonic()
+            if now > deadline:
+                # a slow cycle doesn't cause a burst of catch up polls
+                deadline = now
+            self._stop.wait(deadline - now)
+
+    def start(self):
+        """Start polling in a background thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="waterfurnace-exporter", daemon=True
+            )
+            self._thread.start()
+
+    def serve(self, host="", port=EXPORTER_PORT):
+        """Start polling and return the HTTP server, not yet serving."""
+        self._server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self._server.daemon_threads = True
+        self._server.exporter = self
+        self.start()
+        return self._server
+
+    def serve_forever(self, host="", port=EXPORTER_PORT):
+        """Serve /metrics until interrupted."""
+        server = self.serve(host, port)
+        try:
+            server.serve_forever()
+        finally:
+            self.close()
+
+    def close(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.server_close()
+        if self._thread is not None:
+            self._thread.join(self.interval)
+        self.poller.close()
@@ -0,0 +1,166 @@
+"""Write settings to many gateways at once."""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from waterfurnace.waterfurnace import (
+    SymphonyGeothermal,
+    WFException,
+    WFWebsocketClosedError,
+    settings_write,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Default number of units written at the same time
+FLEET_CONCURRENCY = 32
+
+
+class FleetResult:
+    """Outcome of a fleet write, per unit.
+
+    Units are keyed by what they were given to ``FleetWriter.write`` as,
+    a gwid or a client.
+    """
+
+    def __init__(self, results, errors, elapsed):
+        # unit -> WriteResult, its elapsed time including any login
+        self.results = results
+        # unit -> exception, for units that couldn't be written at all
+        self.errors = errors
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        return not self.errors and all(r.ok for r in self.results.values())
+
+    @property
+    def failed(self):
+        """Units with a setting that wasn't written."""
+        failed = [unit for unit, result in self.results.items() if not result.ok]
+        return failed + list(self.errors)
+
+    @property
+    def latencies(self):
+        """Seconds each written unit took, slowest first."""
+        return sorted((r.elapsed for r in self.results.values()), reverse=True)
+
+    def __getitem__(self, unit):
+        return self.results[unit]
+
+    def __contains__(self, unit):
+        return unit in self.results
+
+    def __len__(self):
+        return len(self.results)
+
+    def __repr__(self):
+        return (
+            f"<FleetResult written={len(self.results)}, errors={len(self.errors)}, "
+            f"elapsed={self.elapsed:.3f}>"
+        )
+
+
+class FleetWriter:
+    """Writes settings to many units concurrently.
+
+    Each unit is a client, written over its own websocket, or the gwid
+    of a gateway on ``client``'s account, written over ``client``'s
+    websocket alongside the others. At most ``concurrency`` units are
+    written at once, so the time a fleet takes grows with the number
+    of units over ``concurrency`` rather than the number of units.
+
+    Clients that are logged in keep their websocket; one that isn't,
+    or whose websocket died, logs in again first, reusing its session
+    ID where it can. A unit whose write found the websocket dead is
+    written once more over a new one.
+    """
+
+    def __init__(self, client=None, concurrency=FLEET_CONCURRENCY, timeout=None):
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be at least 1, got: {concurrency}")
+        self.client = client
+        self.concurrency = concurrency
+        self.timeout = timeout
+
+    def __repr__(self):
+        return f"<FleetWriter client={self.client!r}, concurrency={self.concurrency}>"
+
+    def _resolve(self, unit):
+        """The client to write ``unit`` with, and the gwid to write to."""
+        if isinstance(unit, SymphonyGeothermal):
+            return unit, None
+        if self.client is None:
+            raise ValueError(f"writing to gwid {unit} needs a FleetWriter client")
+        return self.client, unit
+
+    @staticmethod
+    def _connect(client):
+        """Log in again if ``client`` has no live websocket."""
+        if client._mux is not None and not client._mux.closed:
+            return
+        if client.sessionid and client.gwid:
+            try:
+                client.tid = 1
+                client._login_ws()
+                return
+            except Exception:
+                _LOGGER.warning(
+                    "Websocket login failed, logging in again", exc_info=True
+                )
+        client.login()
+
+    def write(self, units):
+        """Write settings to every unit.
+
+        ``units`` is a list of ``(unit, settings)``, a unit being a gwid
+        or a client and settings as for SymphonyGeothermal.apply. All
+        the settings are validated before anything is sent.
+
+        Returns a FleetResult. A unit that fails doesn't stop the others.
+        """
+        units = list(units)
+        seen = set()
+        for unit, settings in units:
+            if unit in seen:
+                raise ValueError(f"{unit} is given more than once")
+            seen.add(unit)
+            settings_write(settings)
+        plan = [(unit, *self._resolve(unit), settings) for unit, settings in units]
+        # one login at a time per client, however many of its units fail
+        locks = {id(client): threading.Lock() for _, client, _, _ in plan}
+
+        start = time.monotonic()
+        results = {}
+        errors = {}
+
+        def write_one(unit, client, gwid, settings):
+            begin = time.monotonic()
+            try:
+                with locks[id(client)]:
+                    self._connect(client)
+                result = client.apply(settings, self.timeout, gwid=gwid)
+                if not result.ok and client._mux.closed:
+                    # the socket died since it was last used, settings are
+                    # absolute so writing them again is safe
+                    with locks[id(client)]:
+                        self._connect(client)
+                    result = client.apply(settings, self.timeout, gwid=gwid)
+                result.elapsed = time.monotonic() - begin
+                results[unit] = result
+            except WFException as e:
+                errors[unit] = e
+            except Exception as e:
+                _LOGGER.exception("Writing %s failed", unit)
+                errors[unit] = WFWebsocketClosedError(str(e))
+
+        if plan:
+            with ThreadPoolExecutor(
+                max_workers=min(self.concurrency, len(plan)),
+                thread_name_prefix="waterfurnace-fleet",
+            ) as pool:
+                for args in plan:
+                    pool.submit(write_one, *args)
+        return FleetResult(results, errors, time.monotonic() - start)
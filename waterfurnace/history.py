@@ -0,0 +1,240 @@
+"""Fixed size, in-memory history of readings with rolling aggregates."""
+
+import time
+from array import array
+from collections import deque
+
+from waterfurnace.waterfurnace import WFReading
+
+# Fields of a WFReading that aren't numeric sensor values
+_SKIP = (
+    "zone",
+    "err",
+    "awlid",
+    "tid",
+    "raw_humidity_offset_settings",
+    "activesettings",
+)
+
+# Numeric fields of a WFReading that are kept
+HISTORY_FIELDS = tuple(f for f in WFReading.__slots__ if f not in _SKIP)
+
+# A day of readings every 15 seconds
+HISTORY_CAPACITY = 5760
+
+_NAN = float("nan")
+
+
+class RollingWindow:
+    """Mean, min and max of one field over the last ``seconds``.
+
+    Kept up to date by ReadingHistory.append, so every query is O(1):
+    a running sum and count for the mean, and monotonic deques of
+    sequence numbers for the min and max. The window ends at the
+    latest reading, not at the wall clock time.
+    """
+
+    def __init__(self, history, field, seconds):
+        self.history = history
+        self.field = field
+        self.seconds = seconds
+        self._values = history._columns[field]
+        # sequence number of the oldest reading in the window
+        self._start = history._seq
+        self._sum = 0.0
+        self._count = 0
+        self._min = deque()
+        self._max = deque()
+
+    def __repr__(self):
+        return f"<RollingWindow {self.field} {self.seconds}s, count={self._count}>"
+
+    def _value(self, seq):
+        return self._values[seq % self.history.capacity]
+
+    def _evict(self, seq, cutoff):
+        """Drop readings older than ``cutoff`` or before sequence ``seq``."""
+        history = self.history
+        end = history._seq
+        while self._start < end and (
+            self._start < seq or history._time(self._start) < cutoff
+        ):
+            value = self._value(self._start)
+            if value == value:
+                self._sum -= value
+                self._count -= 1
+            if self._min and self._min[0] == self._start:
+                self._min.popleft()
+            if self._max and self._max[0] == self._start:
+                self._max.popleft()
+            self._start += 1
+        if not self._count:
+            # don't carry float error over from readings long gone
+            self._sum = 0.0
+
+    def _add(self, seq):
+        value = self._value(seq)
+        if value != value:
+            return
+        self._sum += value
+        self._count += 1
+        while self._min and self._value(self._min[-1]) >= value:
+            self._min.pop()
+        self._min.append(seq)
+        while self._max and self._value(self._max[-1]) <= value:
+            self._max.pop()
+        self._max.append(seq)
+
+    @property
+    def count(self):
+        """Readings in the window with a value for the field."""
+        return self._count
+
+    @property
+    def mean(self):
+        return self._sum / self._count if self._count else None
+
+    @property
+    def min(self):
+        return self._value(self._min[0]) if self._min else None
+
+    @property
+    def max(self):
+        return self._value(self._max[0]) if self._max else None
+
+
+class ReadingHistory:
+    """The last ``capacity`` readings of one gateway, column-wise.
+
+    Each field in ``fields`` is a preallocated ``array('d')`` used as a
+    ring, with missing values stored as NaN, so memory stays fixed no
+    matter how long it runs and ``append`` is O(1). ``mean``, ``min`` and
+    ``max`` over the last N seconds use a RollingWindow, registered on
+    first use and updated on every append after that.
+    """
+
+    def __init__(self, capacity=HISTORY_CAPACITY, fields=HISTORY_FIELDS):
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got: {capacity}")
+        unknown = set(fields).difference(HISTORY_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        self.capacity = capacity
+        self.fields = tuple(fields)
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._columns = {f: array("d", [_NAN]) * capacity for f in self.fields}
+        # number of readings ever appended, the next sequence number
+        self._seq = 0
+        # (field, seconds) -> RollingWindow
+        self._windows = {}
+
+    def __repr__(self):
+        return f"<ReadingHistory len={len(self)}, capacity={self.capacity}>"
+
+    def __len__(self):
+        return min(self._seq, self.capacity)
+
+    def _time(self, seq):
+        return self._timestamps[seq % self.capacity]
+
+    @property
+    def latest_time(self):
+        """Timestamp of the newest reading, None when empty."""
+        return self._time(self._seq - 1) if self._seq else None
+
+    def append(self, reading, timestamp=None):
+        """Add a WFReading, taken at ``timestamp`` (default now)."""
+        if timestamp is None:
+            timestamp = time.time()
+        if self._seq and timestamp < self.latest_time:
+            raise ValueError(
+                f"timestamp {timestamp} is older than the latest {self.latest_time}"
+            )
+        seq = self._seq
+        # the reading in this slot is overwritten, windows let go of it first
+        oldest = seq - self.capacity + 1
+        for window in self._windows.values():
+            window._evict(oldest, timestamp - window.seconds)
+        slot = seq % self.capacity
+        self._timestamps[slot] = timestamp
+        for field, column in self._columns.items():
+            value = getattr(reading, field)
+            column[slot] = _NAN if value is None else value
+        self._seq = seq + 1
+        for window in self._windows.values():
+            window._add(seq)
+
+    def window(self, field, seconds):
+        """The RollingWindow for ``field`` over the last ``seconds``."""
+        key = (field, seconds)
+        window = self._windows.get(key)
+        if window is None:
+            if field not in self._columns:
+                raise KeyError(field)
+            window = RollingWindow(self, field, seconds)
+            # catch up with what is already stored, once
+            window._start = self._seq - len(self)
+            for seq in range(window._start, self._seq):
+                window._add(seq)
+            if self._seq:
+                window._evict(window._start, self.latest_time - seconds)
+            self._windows[key] = window
+        return window
+
+    def mean(self, field, seconds):
+        """Mean of ``field`` over the last ``seconds``, ignoring None."""
+        return self.window(field, seconds).mean
+
+    def min(self, field, seconds):
+        return self.window(field, seconds).min
+
+    def max(self, field, seconds):
+        return self.window(field, seconds).max
+
+    def timestamps(self):
+        """Timestamps of the stored readings, oldest first."""
+        return self._ordered(self._timestamps)
+
+    def column(self, field):
+        """Values of ``field``, oldest first, with None as NaN."""
+        return self._ordered(self._columns[field])
+
+    def _ordered(self, ring):
+        if self._seq <= self.capacity:
+            return ring[: self._seq]
+        split = self._seq % self.capacity
+        return ring[split:] + ring[:split]
+
+
+class HistoryStore:
+    """A ReadingHistory per gwid, created on first append."""
+
+    def __init__(self, capacity=HISTORY_CAPACITY, fields=HISTORY_FIELDS):
+        self.capacity = capacity
+        self.fields = tuple(fields)
+        self._histories = {}
+
+    def __repr__(self):
+        return f"<HistoryStore gateways={len(self._histories)}>"
+
+    def __getitem__(self, gwid):
+        return self._histories[gwid]
+
+    def __contains__(self, gwid):
+        return gwid in self._histories
+
+    def __iter__(self):
+        return iter(self._histories)
+
+    def __len__(self):
+        return len(self._histories)
+
+    def append(self, reading, gwid=None, timestamp=None):
+        """Add a reading to its gateway's history, ``gwid`` default its awlid."""
+        if gwid is None:
+            gwid = reading.awlid
+        history = self._histories.get(gwid)
+        if history is None:
+            history = self._histories[gwid] = ReadingHistory(self.capacity, self.fields)
+        history.append(reading, timestamp)
+        return history
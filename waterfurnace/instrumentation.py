@@ -0,0 +1,278 @@
+"""Timings and counters for the phases of talking to Symphony.
+
+Every client has an ``instrumentation``, called around each phase of
+a login, request or energy download:
+
+``observe(phase, seconds, gwid)``
+    a phase took ``seconds``, one of PHASES
+``count(name, value, gwid)``
+    add ``value`` to a counter, one of COUNTERS
+``phase(name, gwid)``
+    a context manager timing its block and passing it to ``observe``
+
+The default, NULL_INSTRUMENTATION, drops everything. MetricsRegistry
+keeps latency histograms and counters per gateway in memory, and
+OpenTelemetryHooks turns phases into spans. Anything else can subclass
+Instrumentation and override ``observe`` and ``count``.
+
+Hooks are called on whichever thread does the work, ``recv`` and
+``decode`` of websocket replies on the websocket's receive thread, so
+they have to be thread safe.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+
+PHASES = (
+    # login POST or session check, through the session store if there is one
+    "http_login",
+    # TCP, TLS and websocket handshake
+    "ws_connect",
+    # websocket login frame and its reply
+    "ws_login",
+    # writing a request frame to the socket
+    "send",
+    # from sending a request until its reply arrives
+    "recv",
+    # JSON decode of a reply frame
+    "decode",
+    # building a WFReading from a decoded reply
+    "model",
+    # an energy data download, including its decode
+    "energy",
+)
+
+COUNTERS = ("bytes_out", "bytes_in", "retries", "timeouts")
+
+# Upper bounds in seconds, from a decode to a slow login
+LATENCY_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+class _Timer:
+    __slots__ = ("hooks", "name", "gwid", "start")
+
+    def __init__(self, hooks, name, gwid):
+        self.hooks = hooks
+        self.name = name
+        self.gwid = gwid
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hooks.observe(self.name, time.perf_counter() - self.start, self.gwid)
+
+
+class Instrumentation:
+    """Base for instrumentation hooks, ignores what it is given."""
+
+    def observe(self, phase, seconds, gwid=None):
+        """Record that ``phase`` took ``seconds`` for gateway ``gwid``."""
+
+    def count(self, name, value=1, gwid=None):
+        """Add ``value`` to counter ``name`` for gateway ``gwid``."""
+
+    def phase(self, name, gwid=None):
+        """Context manager timing its block as ``name``, failed or not."""
+        return _Timer(self, name, gwid)
+
+
+class NullInstrumentation(Instrumentation):
+    """Does nothing, cheaply, the default of every client."""
+
+    _NULL_PHASE = nullcontext()
+
+    def phase(self, name, gwid=None):
+        return self._NULL_PHASE
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
+
+
+class Histogram:
+    """Counts of observations in fixed buckets, plus their sum.
+
+    ``counts[i]`` is the number of values at most ``buckets[i]`` and
+    above the bucket before, the last count is everything above the
+    last bound.
+    """
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def __repr__(self):
+        return f"<Histogram count={self.count}, sum={self.sum:.6f}>"
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def copy(self):
+        other = Histogram(self.buckets)
+        other.counts = list(self.counts)
+        other.count = self.count
+        other.sum = self.sum
+        return other
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+    def quantile(self, q):
+        """Estimate the ``q`` quantile (0-1), None when empty.
+
+        Interpolates linearly inside the bucket the rank falls in, like
+        Prometheus' histogram_quantile, so it is only as precise as the
+        buckets. Values past the last bound are reported as that bound.
+        """
+        if not 0 <= q <= 1:
+            raise ValueError(f"quantile must be between 0 and 1, got: {q}")
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class MetricsRegistry(Instrumentation):
+    """Keeps a Histogram per (phase, gwid) and a total per (counter, gwid).
+
+    Thread safe; ``collect()`` returns a consistent copy for reporting,
+    e.g. by the exporter, which serves it along with the readings.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def __repr__(self):
+        return (
+            f"<MetricsRegistry histograms={len(self._histograms)}, "
+            f"counters={len(self._counters)}>"
+        )
+
+    def observe(self, phase, seconds, gwid=None):
+        key = (phase, gwid)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def count(self, name, value=1, gwid=None):
+        key = (name, gwid)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def histogram(self, phase, gwid=None):
+        """A copy of the Histogram of ``phase`` for ``gwid``, None if unseen."""
+        with self._lock:
+            histogram = self._histograms.get((phase, gwid))
+            return histogram.copy() if histogram is not None else None
+
+    def counter(self, name, gwid=None):
+        with self._lock:
+            return self._counters.get((name, gwid), 0)
+
+    def collect(self):
+        """Copies of the histograms and counters, keyed by (name, gwid)."""
+        with self._lock:
+            histograms = {k: h.copy() for k, h in self._histograms.items()}
+            return histograms, dict(self._counters)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+class OpenTelemetryHooks(Instrumentation):
+    """Reports phases as OpenTelemetry spans.
+
+    A ``phase()`` block is a span named ``waterfurnace.<phase>`` made
+    current for its duration, so it nests under the caller's own spans.
+    Phases that are only ``observe``d, the websocket ``recv`` and
+    ``decode`` on the receive thread, become spans back-dated to when
+    they started, without a parent. The gwid is the
+    ``waterfurnace.gwid`` attribute.
+
+    Needs ``opentelemetry-api`` unless a ``tracer`` is given. Counters
+    aren't spans, they and the timings also go to ``metrics`` if set,
+    e.g. a MetricsRegistry.
+    """
+
+    def __init__(self, tracer=None, metrics=None):
+        if tracer is None:
+            try:
+                from opentelemetry import trace
+            except ImportError as e:
+                raise ImportError(
+                    "OpenTelemetryHooks requires opentelemetry-api"
+                ) from e
+            tracer = trace.get_tracer("waterfurnace")
+        self.tracer = tracer
+        self.metrics = metrics if metrics is not None else NULL_INSTRUMENTATION
+
+    def __repr__(self):
+        return f"<OpenTelemetryHooks metrics={self.metrics!r}>"
+
+    @staticmethod
+    def _attributes(gwid):
+        return {"waterfurnace.gwid": gwid} if gwid is not None else {}
+
+    def observe(self, phase, seconds, gwid=None):
+        end = time.time_ns()
+        span = self.tracer.start_span(
+            f"waterfurnace.{phase}",
+            start_time=end - int(seconds * 1e9),
+            attributes=self._attributes(gwid),
+        )
+        span.end(end_time=end)
+        self.metrics.observe(phase, seconds, gwid)
+
+    def count(self, name, value=1, gwid=None):
+        self.metrics.count(name, value, gwid)
+
+    @contextmanager
+    def phase(self, name, gwid=None):
+        with self.tracer.start_as_current_span(
+            f"waterfurnace.{name}", attributes=self._attributes(gwid)
+        ):
+            with self.metrics.phase(name, gwid):
+                yield
@@ -0,0 +1,231 @@
+"""Poll every gateway on a Symphony account over a single login."""
+
+import logging
+import time
+
+import websocket
+
+from waterfurnace.waterfurnace import (
+    REQUEST_TIMEOUT,
+    SymphonyGeothermal,
+    WFCircuitOpenError,
+    WFError,
+    WFWebsocketClosedError,
+    resolve_sensors,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class PollResult:
+    """Readings from one poll cycle, with per-gateway errors."""
+
+    def __init__(self, readings, errors, elapsed):
+        # gwid -> WFReading
+        self.readings = readings
+        # gwid -> exception, for gateways that didn't produce a reading
+        self.errors = errors
+        self.elapsed = elapsed
+
+    @property
+    def throughput(self):
+        """Successful reads per second in this cycle."""
+        if not self.elapsed:
+            return 0.0
+        return len(self.readings) / self.elapsed
+
+    def __getitem__(self, gwid):
+        return self.readings[gwid]
+
+    def __contains__(self, gwid):
+        return gwid in self.readings
+
+    def __len__(self):
+        return len(self.readings)
+
+    def __repr__(self):
+        return (
+            f"<PollResult readings={len(self.readings)}, errors={len(self.errors)}, "
+            f"elapsed={self.elapsed:.3f}>"
+        )
+
+
+class AccountPoller:
+    """Reads every gateway on an account with one HTTP login.
+
+    ``client`` is a (not yet logged in) WaterFurnace / GeoStar client.
+    Its login is used to enumerate the gateways of every location, and
+    the read requests for all of them are pipelined over its websocket.
+    With ``connections > 1`` the gateways are spread over that many
+    websockets, all sharing the one session ID. ``sensors`` limits
+    every read to a subset, as for SymphonyGeothermal.read.
+
+    Each gateway has a CircuitBreaker (``client.breaker(gwid)``). While
+    one is open that gateway is skipped, with a WFCircuitOpenError in
+    ``errors``, so an unhealthy unit costs the cycle nothing.
+    """
+
+    def __init__(self, client, connections=1, timeout=REQUEST_TIMEOUT, sensors=None):
+        if connections < 1:
+            raise ValueError(f"connections must be at least 1, got: {connections}")
+        self.client = client
+        self.rlist = resolve_sensors(sensors)
+        self.connections = connections
+        self.timeout = timeout
+        self.gateways = []
+        self._clients = []
+        # gwid -> the client whose websocket reads that gateway
+        self._assignment = {}
+
+    def __repr__(self):
+        return (
+            f"<AccountPoller user={self.client.user}, "
+            f"gateways={len(self.gateways)}, connections={len(self._clients)}>"
+        )
+
+    def _new_connection(self):
+        """Another websocket configured like ``self.client``, on its session."""
+        client = self.client
+        conn = SymphonyGeothermal(
+            client.base_url,
+            client.login_url,
+            client.ws_url,
+            client.user,
+            client.passwd,
+            client.max_fails,
+            device=client.device,
+            location=client.location,
+            sessionid=client.sessionid,
+            http_session=client._http_session,
+            http_pool=client.http_pool,
+            codec=client.codec,
+            request_timeout=client.request_timeout,
+            scheduler=client.scheduler,
+            retry_policy=client.retry_policy,
+            instrumentation=client.instrumentation,
+            settings_max_age=client.settings_cache.max_age,
+        )
+        conn.tid = 1
+        conn._login_ws()
+        return conn
+
+    def login(self):
+        """Log in once, then open the websockets and assign gateways."""
+        self.client.login()
+        self.gateways = [
+            gateway
+            for location in self.client.locations
+            for gateway in location.gateways
+        ]
+        self._clients = [self.client]
+        self._clients.extend(self._new_connection() for _ in range(1, self.connections))
+        self._assignment = {
+            gateway.gwid: self._clients[i % len(self._clients)]
+            for i, gateway in enumerate(self.gateways)
+        }
+        _LOGGER.debug("Polling %s", self)
+
+    def _reconnect(self, conn):
+        """Reopen a dead websocket, logging in again if the session is gone."""
+        conn.sessionid = self.client.sessionid
+        conn.tid = 1
+        try:
+            conn._login_ws()
+        except Exception:
+            _LOGGER.warning("Websocket login failed, logging in again", exc_info=True)
+            self.client.login()
+            if conn is not self.client:
+                conn.sessionid = self.client.sessionid
+                conn.tid = 1
+                conn._login_ws()
+
+    def _is_dead(self, conn):
+        return conn._mux is None or conn._mux.closed
+
+    def close(self):
+        """Close all the websockets."""
+        for conn in self._clients:
+            if conn._mux is not None:
+                conn._mux.close()
+
+    def _submit(self, conn, gwid, reconnected):
+        try:
+            return conn._ws_submit(conn._read_request, gwid=gwid, rlist=self.rlist)
+        except Exception:
+            # the socket died since the last cycle, reopen it once
+            if id(conn) in reconnected or not self._is_dead(conn):
+                raise
+            reconnected.add(id(conn))
+            self._reconnect(conn)
+            return conn._ws_submit(conn._read_request, gwid=gwid, rlist=self.rlist)
+
+    def poll(self):
+        """Read every gateway once.
+
+        Returns a PollResult. A gateway that fails is reported in
+        ``errors`` and does not stop the others from being read.
+        """
+        if not self._clients:
+            raise WFError("Must login before polling")
+        start = time.monotonic()
+        readings = {}
+        errors = {}
+        pending = {}
+
+        for gateway in self.gateways:
+            breaker = self.client.breaker(gateway.gwid)
+            if not breaker.allow():
+                errors[gateway.gwid] = WFCircuitOpenError(
+                    gateway.gwid, breaker.retry_in
+                )
+        skipped = set(errors)
+
+        for conn in self._clients:
+            gwids = [
+                gwid
+                for gwid, owner in self._assignment.items()
+                if owner is conn and gwid not in skipped
+            ]
+            if gwids and self._is_dead(conn):
+                try:
+                    self._reconnect(conn)
+                except Exception as e:
+                    _LOGGER.exception("Reconnect failed")
+                    for gwid in gwids:
+                        errors[gwid] = e
+
+        reconnected = set()
+        for gateway in self.gateways:
+            gwid = gateway.gwid
+            if gwid in errors:
+                continue
+            conn = self._assignment[gwid]
+            try:
+                pending[gwid] = self._submit(conn, gwid, reconnected)
+            except Exception as e:
+                errors[gwid] = WFWebsocketClosedError(str(e))
+
+        deadline = start + self.timeout
+        for gwid, reply in pending.items():
+            conn = self._assignment[gwid]
+            try:
+                data = reply.result(max(0.0, deadline - time.monotonic()))
+            except websocket.WebSocketTimeoutException as e:
+                _LOGGER.warning("Timeout reading %s, closing its websocket", gwid)
+                conn.instrumentation.count("timeouts", 1, gwid)
+                conn._mux.close(e)
+                errors[gwid] = WFWebsocketClosedError(str(e))
+                continue
+            except Exception as e:
+                errors[gwid] = WFWebsocketClosedError(str(e))
+                continue
+            try:
+                readings[gwid] = conn._decode_reading(data)
+            except Exception as e:
+                errors[gwid] = e if isinstance(e, WFError) else WFError(str(e))
+
+        for gwid in readings:
+            self.client.breaker(gwid).record_success()
+        for gwid in errors.keys() - skipped:
+            self.client.breaker(gwid).record_failure()
+        return PollResult(readings, errors, time.monotonic() - start)
@@ -0,0 +1,128 @@
+"""On-disk cache of Symphony session IDs shared across processes."""
+
+import contextlib
+import json
+import logging
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - windows
+    fcntl = None
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_SESSION_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "waterfurnace", "sessions.json"
+)
+
+# Skip the /api.php/user round trip when the session was validated
+# this recently (seconds).
+VALIDATE_INTERVAL = 300
+
+
+class SessionEntry:
+    """A cached session ID and when it was last known to be valid."""
+
+    def __init__(self, sessionid, validated_at=0.0):
+        self.sessionid = sessionid
+        self.validated_at = validated_at
+
+    def age(self, now=None):
+        if now is None:
+            now = time.time()
+        return now - self.validated_at
+
+    def __repr__(self):
+        return f"<SessionEntry validated_at={self.validated_at}>"
+
+
+class SessionStore:
+    """Session IDs keyed by (vendor, user), stored in a JSON file.
+
+    All access goes through an exclusive ``flock`` on a sidecar lock
+    file, so concurrent cron jobs and workers share one session. Holding
+    the lock across ``SymphonyGeothermal.login`` means only one process
+    does the HTTP login while the others wait and pick up its result.
+    """
+
+    def __init__(self, path=DEFAULT_SESSION_PATH, validate_interval=VALIDATE_INTERVAL):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.validate_interval = validate_interval
+
+    def __repr__(self):
+        return f"<SessionStore path={self.path}>"
+
+    @staticmethod
+    def _key(vendor, user):
+        return f"{vendor}:{user}"
+
+    @contextlib.contextmanager
+    def lock(self):
+        """Hold the store's exclusive lock."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            _LOGGER.warning("Ignoring corrupt session store %s", self.path)
+            return {}
+
+    def _save(self, entries):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(entries, f)
+        os.replace(tmp, self.path)
+
+    def get(self, vendor, user):
+        """Return the cached SessionEntry, or None.
+
+        Callers are expected to hold ``lock()``.
+        """
+        data = self._load().get(self._key(vendor, user))
+        if not data:
+            return None
+        return SessionEntry(data["sessionid"], data.get("validated_at", 0.0))
+
+    def put(self, vendor, user, sessionid, validated_at=None):
+        """Record a session ID that is known to be valid.
+
+        Callers are expected to hold ``lock()``.
+        """
+        if validated_at is None:
+            validated_at = time.time()
+        entries = self._load()
+        entries[self._key(vendor, user)] = {
+            "sessionid": sessionid,
+            "validated_at": validated_at,
+        }
+        self._save(entries)
+
+    def invalidate(self, vendor, user):
+        """Forget the session for (vendor, user)."""
+        with self.lock():
+            entries = self._load()
+            if entries.pop(self._key(vendor, user), None) is not None:
+                self._save(entries)
+
+    def is_fresh(self, entry, now=None):
+        """Whether the entry was validated recently enough to skip a check."""
+        return entry.age(now) < self.validate_interval
@@ -0,0 +1,596 @@
+"""Local stand-in for the Symphony service, for load and latency testing.
+
+SymphonySimulator serves the login form, the ``/api.php/user`` session
+check, the energy API and the awlclientproxy websocket from one aiohttp
+app on a background thread. A SymphonyGeothermal pointed at it goes
+through real sockets, HTTP and websocket framing, with configurable
+latency, jitter, dropped requests and error replies. Needs the optional
+aiohttp dependency (``pip install waterfurnace[async]``).
+
+run_benchmark drives every simulated gateway through its own client and
+reports reads per second and latency percentiles::
+
+    python -m waterfurnace.simulator --gateways 20 --reads 200 --latency 0.05
+"""
+
+import asyncio
+import json
+import logging
+import random
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import click
+
+try:
+    from aiohttp import WSMsgType, web
+except ImportError as e:  # pragma: no cover
+    raise ImportError(
+        "waterfurnace.simulator requires aiohttp, install waterfurnace[async]"
+    ) from e
+
+from waterfurnace.waterfurnace import (
+    FAILED_LOGIN,
+    REQUEST_TIMEOUT,
+    SymphonyGeothermal,
+    WFException,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+SIM_USER = "sim@example.com"
+SIM_PASSWORD = "password"
+
+# What a simulated unit reports, keyed by the lower cased sensor name
+SIM_READING = {
+    "compressorpower": 1500,
+    "fanpower": 39,
+    "auxpower": 0,
+    "looppumppower": 125,
+    "totalunitpower": 1664,
+    "awlabctype": 2,
+    "modeofoperation": 5,
+    "actualcompressorspeed": 45,
+    "airflowcurrentspeed": 2,
+    "auroraoutputeh1": 0,
+    "auroraoutputeh2": 0,
+    "auroraoutputcc": 0,
+    "auroraoutputcc2": 0,
+    "tstatdehumidsetpoint": 50,
+    "tstathumidsetpoint": 40,
+    "tstatrelativehumidity": 45,
+    "leavingairtemp": 95.5,
+    "tstatroomtemp": 69.7,
+    "enteringwatertemp": 41.4,
+    "aocenteringwatertemp": 0,
+    "leavingwatertemp": 36.7,
+    "waterflowrate": 12.2,
+    "lockoutstatus": {"lockoutstatuscode": 0, "lockedout": 0},
+    "lastfault": 0,
+    "lastlockout": {"lockoutstatuslast": 0},
+    "humidity_offset_settings": {
+        "humidity_offset": 0,
+        "humdity_control_option": 1,
+        "dehumidification_mode": 0,
+        "humidification_mode": 0,
+    },
+    "humidity": 45,
+    "outdoorair": 30,
+    "homeautomationalarm1": 0,
+    "homeautomationalarm2": 0,
+    "roomtemp": 69,
+    "activesettings": {
+        "temporaryoverride": 0,
+        "permanenthold": 0,
+        "vacationhold": 0,
+        "onpeakhold": 0,
+        "superboost": 0,
+        "tstatmode": 0,
+        "activemode": 3,
+        "heatingsp_read": 69,
+        "coolingsp_read": 75,
+        "fanmode_read": 1,
+        "intertimeon_read": 0,
+        "intertimeoff_read": 5,
+    },
+    "tstatactivesetpoint": 69,
+    "tstatmode": 0,
+    "tstatheatingsetpoint": 69,
+    "tstatcoolingsetpoint": 75,
+    "awltstattype": 103,
+}
+
+# write parameter -> activesettings field it changes
+_WRITE_SETTINGS = {
+    "activemode_write": "activemode",
+    "heatingsp_write": "heatingsp_read",
+    "coolingsp_write": "coolingsp_read",
+    "fanmode_write": "fanmode_read",
+    "intertimeon_write": "intertimeon_read",
+    "intertimeoff_write": "intertimeoff_read",
+}
+
+SIM_ENERGY_COLUMNS = (
+    "total_heat_1",
+    "total_cool_1",
+    "total_fan_only",
+    "total_loop_pump",
+    "total_power",
+)
+
+_ENERGY_STEP = {
+    "1D": timedelta(days=1),
+    "1H": timedelta(hours=1),
+    "15min": timedelta(minutes=15),
+}
+
+
+def _rate(name, value):
+    if not 0 <= value <= 1:
+        raise ValueError(f"{name} must be between 0 and 1, got: {value}")
+    return value
+
+
+class SymphonySimulator:
+    """Symphony login, energy and websocket endpoints on localhost.
+
+    Accepts any email address with ``password``. The websocket login
+    returns one location with ``gateways`` gateways (``gwids``), each
+    answering reads with SIM_READING plus some noise and applying
+    writes to its settings. Every request waits ``latency`` plus up to
+    ``jitter`` seconds, a websocket read or write is dropped without a
+    reply with probability ``drop_rate``, and answered with an ``err``
+    (or an energy request with a 500) with probability ``error_rate``.
+
+    Serves plain http / ws unless an ``ssl_context`` is given; the
+    clients verify certificates, so that needs one they trust. ``stats``
+    counts what was served.
+    """
+
+    def __init__(
+        self,
+        gateways=1,
+        latency=0.0,
+        jitter=0.0,
+        drop_rate=0.0,
+        error_rate=0.0,
+        password=SIM_PASSWORD,
+        host="127.0.0.1",
+        port=0,
+        ssl_context=None,
+        seed=None,
+    ):
+        if gateways < 1:
+            raise ValueError(f"gateways must be at least 1, got: {gateways}")
+        if latency < 0 or jitter < 0:
+            raise ValueError("latency and jitter can't be negative")
+        self.gwids = [f"SIM{n:06d}" for n in range(gateways)]
+        self.latency = latency
+        self.jitter = jitter
+        self.drop_rate = _rate("drop_rate", drop_rate)
+        self.error_rate = _rate("error_rate", error_rate)
+        self.password = password
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self.units = {gwid: json.loads(json.dumps(SIM_READING)) for gwid in self.gwids}
+        self.sessions = set()
+        self.stats = Counter()
+        self._rng = random.Random(seed)
+        self._loop = None
+        self._thread = None
+        self._runner = None
+        self._sockets = set()
+
+    def __repr__(self):
+        return (
+            f"<SymphonySimulator gateways={len(self.gwids)}, "
+            f"latency={self.latency}, port={self.port}>"
+        )
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def base_url(self):
+        scheme = "https" if self.ssl_context is not None else "http"
+        return f"{scheme}://{self.host}:{self.port}"
+
+    @property
+    def login_url(self):
+        return f"{self.base_url}/account/login"
+
+    @property
+    def ws_url(self):
+        scheme = "wss" if self.ssl_context is not None else "ws"
+        return f"{scheme}://{self.host}:{self.port}/ws"
+
+    def client(self, **kwargs):
+        """A SymphonyGeothermal for this simulator, not yet logged in."""
+        return SymphonyGeothermal(
+            self.base_url,
+            self.login_url,
+            self.ws_url,
+            SIM_USER,
+            kwargs.pop("passwd", self.password),
+            **kwargs,
+        )
+
+    def start(self):
+        """Start serving on a background thread, setting ``port``."""
+        if self._thread is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="waterfurnace-simulator", daemon=True
+        )
+        self._thread.start()
+        self._call(self._start())
+
+    def stop(self):
+        """Close every connection and stop serving."""
+        if self._thread is None:
+            return
+        self._call(self._stop())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._thread = None
+
+    def disconnect(self):
+        """Close every open websocket, as a server restart would."""
+        self._call(self._close_sockets())
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _start(self):
+        app = web.Application()
+        app.router.add_post("/account/login", self._handle_login)
+        app.router.add_get("/api.php/user", self._handle_user)
+        app.router.add_get("/api.php/v2/gateway/{gwid}/energy", self._handle_energy)
+        app.router.add_get("/ws", self._handle_ws)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(
+            self._runner, self.host, self.port, ssl_context=self.ssl_context
+        )
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def _stop(self):
+        await self._close_sockets()
+        await self._runner.cleanup()
+
+    async def _close_sockets(self):
+        for ws in list(self._sockets):
+            await ws.close()
+
+    async def _delay(self):
+        delay = self.latency
+        if self.jitter:
+            delay += self._rng.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def _location(self):
+        return {
+            "description": "Simulated",
+            "gateways": [
+                {"gwid": gwid, "description": f"Unit {n}", "online": 1}
+                for n, gwid in enumerate(self.gwids)
+            ],
+        }
+
+    async def _handle_login(self, request):
+        form = await request.post()
+        await self._delay()
+        self.stats["logins"] += 1
+        if form.get("password") != self.password:
+            return web.Response(text=f"Something went wrong. {FAILED_LOGIN}")
+        sessionid = uuid.uuid4().hex
+        self.sessions.add(sessionid)
+        response = web.Response(text="")
+        response.set_cookie("sessionid", sessionid)
+        return response
+
+    async def _handle_user(self, request):
+        await self._delay()
+        self.stats["session_checks"] += 1
+        if request.cookies.get("sessionid") not in self.sessions:
+            return web.json_response({})
+        return web.json_response({"emailaddress": SIM_USER})
+
+    async def _handle_energy(self, request):
+        await self._delay()
+        self.stats["energy"] += 1
+        if request.cookies.get("sessionid") not in self.sessions:
+            raise web.HTTPUnauthorized()
+        if request.match_info["gwid"] not in self.units:
+            raise web.HTTPNotFound()
+        if self._rng.random() < self.error_rate:
+            self.stats["errors"] += 1
+            raise web.HTTPInternalServerError()
+        query = request.query
+        try:
+            step = _ENERGY_STEP[query["freq"]]
+            start = datetime.strptime(query["start"], "%Y-%m-%d")
+            end = datetime.strptime(query["end"], "%Y-%m-%d") + timedelta(days=1)
+        except (KeyError, ValueError) as e:
+            raise web.HTTPBadRequest() from e
+        index = []
+        data = []
+        when = start.replace(tzinfo=timezone.utc)
+        end = end.replace(tzinfo=timezone.utc)
+        hours = step / timedelta(hours=1)
+        while when < end:
+            heat = round(1.2 * hours * (1 + when.hour % 3) / 3, 2)
+            row = [heat, 0.0, 0.0, round(heat / 5, 2)]
+            data.append([*row, round(sum(row), 2)])
+            index.append(int(when.timestamp() * 1000))
+            when += step
+        # newest first, like the service
+        return web.json_response(
+            {
+                "columns": list(SIM_ENERGY_COLUMNS),
+                "index": index[::-1],
+                "data": data[::-1],
+            }
+        )
+
+    async def _handle_ws(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.stats["connections"] += 1
+        self._sockets.add(ws)
+        pending = set()
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                req = json.loads(msg.data)
+                if req.get("cmd") == "login":
+                    await self._delay()
+                    if req.get("sessionid") not in self.sessions:
+                        await ws.send_str(
+                            json.dumps({"tid": req.get("tid"), "err": "Bad session"})
+                        )
+                        break
+                    await ws.send_str(
+                        json.dumps(
+                            {
+                                "tid": req.get("tid"),
+                                "err": "",
+                                "key": 1,
+                                "locations": [self._location()],
+                            }
+                        )
+                    )
+                    continue
+                # answered concurrently, replies are routed by tid
+                task = asyncio.ensure_future(self._answer(ws, req))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        finally:
+            self._sockets.discard(ws)
+            for task in pending:
+                task.cancel()
+            await ws.close()
+        return ws
+
+    async def _answer(self, ws, req):
+        await self._delay()
+        cmd = req.get("cmd")
+        self.stats[f"{cmd}s"] += 1
+        if self._rng.random() < self.drop_rate:
+            self.stats["dropped"] += 1
+            return
+        gwid = req.get("awlid")
+        unit = self.units.get(gwid)
+        reply = {"rsp": cmd, "tid": req.get("tid"), "err": "", "zone": 0, "awlid": gwid}
+        if unit is None:
+            reply["err"] = f"Unknown gateway {gwid}"
+        elif self._rng.random() < self.error_rate:
+            self.stats["errors"] += 1
+            reply["err"] = "Simulated error"
+        elif cmd == "read":
+            self._wander(unit)
+            for name in req.get("rlist", ()):
+                key = name.lower()
+                if key in unit:
+                    reply[key] = unit[key]
+        elif cmd == "write":
+            self._write(unit, req)
+            reply["data"] = "ok"
+        else:
+            reply["err"] = f"Unknown command {cmd}"
+        try:
+            await ws.send_str(json.dumps(reply))
+        except ConnectionError:
+            _LOGGER.debug("Client went away before tid %s", req.get("tid"))
+
+    def _wander(self, unit):
+        unit["compressorpower"] = 1500 + self._rng.randint(-25, 25)
+        unit["totalunitpower"] = (
+            unit["compressorpower"]
+            + unit["fanpower"]
+            + unit["auxpower"]
+            + unit["looppumppower"]
+        )
+
+    def _write(self, unit, req):
+        settings = unit["activesettings"]
+        for key, value in req.items():
+            if key in _WRITE_SETTINGS:
+                settings[_WRITE_SETTINGS[key]] = value
+        if "dehumid_humid_sp" in req:
+            unit["tstatdehumidsetpoint"] = req["dehumid_humid_sp"]["dehumidification"]
+            unit["tstathumidsetpoint"] = req["dehumid_humid_sp"]["humidification"]
+
+
+class BenchmarkResult:
+    """Latencies of the reads a benchmark did, and how long it ran."""
+
+    def __init__(self, gateways, latencies, errors, elapsed):
+        self.gateways = gateways
+        self.latencies = sorted(latencies)
+        self.errors = errors
+        self.elapsed = elapsed
+
+    def __repr__(self):
+        return (
+            f"<BenchmarkResult reads={self.reads}, errors={self.errors}, "
+            f"throughput={self.throughput:.0f}/s>"
+        )
+
+    @property
+    def reads(self):
+        """Successful reads."""
+        return len(self.latencies)
+
+    @property
+    def throughput(self):
+        """Successful reads per second."""
+        return self.reads / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, p):
+        """Latency in seconds that ``p`` percent of the reads were under."""
+        if not self.latencies:
+            return None
+        if len(self.latencies) == 1:
+            return self.latencies[0]
+        return statistics.quantiles(self.latencies, n=100, method="inclusive")[p - 1]
+
+    @property
+    def p50(self):
+        return self.percentile(50)
+
+    @property
+    def p99(self):
+        return self.percentile(99)
+
+    def as_dict(self):
+        return {
+            "gateways": self.gateways,
+            "reads": self.reads,
+            "errors": self.errors,
+            "elapsed": self.elapsed,
+            "throughput": self.throughput,
+            "p50": self.p50,
+            "p99": self.p99,
+        }
+
+
+def run_benchmark(
+    simulator, reads=100, request_timeout=REQUEST_TIMEOUT, sensors=None, **kwargs
+):
+    """Read every gateway of a running simulator ``reads`` times.
+
+    Each gateway gets its own SymphonyGeothermal (``kwargs`` are passed
+    to it) on its own thread, all logged in before the clock starts, and
+    reading back to back. A failed read is counted and the client logs
+    in again before carrying on. A failed first login is raised.
+    Returns a BenchmarkResult.
+    """
+    clients = [
+        simulator.client(device=n, request_timeout=request_timeout, **kwargs)
+        for n in range(len(simulator.gwids))
+    ]
+    start_line = threading.Barrier(len(clients) + 1)
+
+    def drive(client):
+        start_line.wait()
+        latencies = []
+        errors = 0
+        for _ in range(reads):
+            start = time.perf_counter()
+            try:
+                client.read(sensors=sensors)
+            except WFException:
+                errors += 1
+                client.login()
+            else:
+                latencies.append(time.perf_counter() - start)
+        return latencies, errors
+
+    try:
+        with ThreadPoolExecutor(
+            max_workers=len(clients), thread_name_prefix="waterfurnace-bench"
+        ) as pool:
+            # every login is done before any thread waits at the start
+            # line, so a failed one is raised here instead of stranding it
+            list(pool.map(SymphonyGeothermal.login, clients))
+            futures = [pool.submit(drive, client) for client in clients]
+            start_line.wait()
+            start = time.perf_counter()
+            results = [future.result() for future in futures]
+            elapsed = time.perf_counter() - start
+    finally:
+        for client in clients:
+            if client._mux is not None:
+                client._mux.close()
+    return BenchmarkResult(
+        len(clients),
+        [latency for latencies, _ in results for latency in latencies],
+        sum(errors for _, errors in results),
+        elapsed,
+    )
+
+
+@click.command()
+@click.option("--gateways", type=click.IntRange(min=1), default=10, show_default=True)
+@click.option(
+    "--reads",
+    type=click.IntRange(min=1),
+    default=100,
+    show_default=True,
+    help="Reads per gateway",
+)
+@click.option("--latency", type=float, default=0.0, help="Seconds per request")
+@click.option("--jitter", type=float, default=0.0, help="Up to this many more")
+@click.option("--drop", type=float, default=0.0, help="Fraction of requests dropped")
+@click.option("--error", type=float, default=0.0, help="Fraction of requests that fail")
+@click.option(
+    "--timeout",
+    type=float,
+    default=REQUEST_TIMEOUT,
+    show_default=True,
+    help="Client request timeout",
+)
+@click.option("--json", "as_json", is_flag=True, help="Print the result as JSON")
+def main(gateways, reads, latency, jitter, drop, error, timeout, as_json):
+    """Benchmark SymphonyGeothermal against a local simulated Symphony."""
+    # failures are injected on purpose, don't log a traceback for each
+    logger = logging.getLogger("waterfurnace")
+    level = logger.level
+    logger.setLevel(logging.CRITICAL)
+    try:
+        with SymphonySimulator(
+            gateways, latency=latency, jitter=jitter, drop_rate=drop, error_rate=error
+        ) as simulator:
+            result = run_benchmark(simulator, reads, request_timeout=timeout)
+    finally:
+        logger.setLevel(level)
+    if as_json:
+        click.echo(json.dumps(result.as_dict()))
+        return
+    click.echo(
+        f"{result.reads} reads of {gateways} gateways in {result.elapsed:.2f}s, "
+        f"{result.errors} errors"
+    )
+    click.echo(f"throughput: {result.throughput:.0f} reads/s")
+    if result.reads:
+        click.echo(f"p50: {result.p50 * 1e3:.1f}ms  p99: {result.p99 * 1e3:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
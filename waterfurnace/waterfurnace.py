@@ -1,15 +1,31 @@
 """Main module."""
 
-import copy
+import codecs
+import functools
+import heapq
+import itertools
 import json
 import logging
+import math
+import random
+import re
 import ssl
 import threading
 import time
-from datetime import datetime, timezone
+from array import array
+from collections import deque
+from collections.abc import Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import date, datetime, timedelta, timezone
+from http.cookiejar import DefaultCookiePolicy
 
 import requests
 import websocket
+from requests.adapters import HTTPAdapter
+
+from waterfurnace.codec import DEFAULT_CODEC
+from waterfurnace.instrumentation import NULL_INSTRUMENTATION
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -55,6 +71,45 @@ FAILED_LOGIN = (
 TIMEOUT = 30
 ERROR_INTERVAL = 300
 
+# read_with_retry backoff: first delay, growth factor and cap in seconds,
+# and the fraction of each delay that is randomized
+RETRY_BASE = 10.0
+RETRY_FACTOR = 2.0
+RETRY_CAP = ERROR_INTERVAL
+RETRY_JITTER = 0.5
+
+# Consecutive failures before a gateway's circuit breaker opens
+BREAKER_THRESHOLD = 3
+
+# Seconds before an unanswered websocket request aborts the socket
+REQUEST_TIMEOUT = 10.0
+
+# Default seconds between readings from stream(). Symphony closes a
+# websocket that goes 30 seconds without a read.
+STREAM_INTERVAL = 15.0
+
+# Default seconds a reading's values are reused by read-modify-write
+# setters like set_humidity, unless a write to the gateway came since
+SETTINGS_MAX_AGE = 30.0
+
+# Transaction ids wrap at this value. Replies are matched to requests by
+# tid, so it has to be larger than the number of requests in flight.
+TID_SPACE = 1 << 16
+
+# HTTP connection pool defaults, per base URL
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 16
+
+# Bulk energy downloads: days per request for each frequency, requests in
+# flight, and retries (with a growing delay in seconds) per failed chunk
+ENERGY_CHUNK_DAYS = {"1D": 366, "1H": 31, "15min": 7}
+ENERGY_WORKERS = 4
+ENERGY_RETRIES = 2
+ENERGY_RETRY_DELAY = 1.0
+
+# Bytes read at a time when streaming an energy response
+ENERGY_STREAM_CHUNK = 64 * 1024
+
 DATA_REQUEST = {
     "cmd": "read",
     "tid": None,
@@ -103,6 +158,126 @@ DATA_REQUEST = {
 }
 
 
+READ_RLIST = tuple(DATA_REQUEST["rlist"])
+
+# Named subsets of the rlist, for reads that don't need every sensor
+SENSOR_PROFILES = {
+    "power": (
+        "compressorpower",
+        "fanpower",
+        "auxpower",
+        "looppumppower",
+        "totalunitpower",
+    ),
+    "temps": (
+        "LeavingAirTemp",
+        "TStatRoomTemp",
+        "EnteringWaterTemp",
+        "LeavingWaterTemp",
+    ),
+    "humidity": (
+        "TStatDehumidSetpoint",
+        "TStatHumidSetpoint",
+        "TStatRelativeHumidity",
+        "humidity_offset_settings",
+    ),
+    "settings": (
+        "activesettings",
+        "TStatActiveSetpoint",
+        "TStatHeatingSetpoint",
+        "TStatCoolingSetpoint",
+    ),
+}
+
+# WFReading attribute names that aren't just the lower cased sensor name
+_SENSOR_ALIASES = {
+    "mode": "ModeOfOperation",
+    "raw_humidity_offset_settings": "humidity_offset_settings",
+}
+
+# Fields that come back with every reply, whatever is requested
+_REPLY_FIELDS = ("zone", "err", "awlid", "tid")
+
+_SENSOR_NAMES = {name.lower(): name for name in READ_RLIST}
+_SENSOR_NAMES.update({alias: name for alias, name in _SENSOR_ALIASES.items()})
+
+
+def resolve_sensors(sensors=None):
+    """Turn a sensor selection into the rlist to request.
+
+    Args:
+        sensors: None for every sensor, a SENSOR_PROFILES name, or an
+                 iterable of sensor names. Names are matched without
+                 regard to case, and WFReading attribute names such as
+                 ``mode`` are accepted too.
+
+    Returns:
+        Tuple of sensor names as the server spells them.
+
+    Raises:
+        ValueError: for an unknown profile or sensor name
+    """
+    if sensors is None:
+        return READ_RLIST
+    if isinstance(sensors, str):
+        try:
+            return SENSOR_PROFILES[sensors]
+        except KeyError as e:
+            raise ValueError(
+                f"Unknown sensor profile {sensors!r}. "
+                f"Must be one of {sorted(SENSOR_PROFILES)}"
+            ) from e
+    rlist = []
+    unknown = []
+    for sensor in sensors:
+        if sensor in _REPLY_FIELDS:
+            continue
+        name = _SENSOR_NAMES.get(sensor.lower())
+        if name is None:
+            unknown.append(sensor)
+        elif name not in rlist:
+            rlist.append(name)
+    if unknown:
+        raise ValueError(f"Unknown sensors: {', '.join(unknown)}")
+    if not rlist:
+        raise ValueError("At least one sensor is required")
+    return tuple(rlist)
+
+
+def sensor_attribute(sensor):
+    """The WFReading attribute a sensor is read into, or None.
+
+    Args:
+        sensor: A sensor name as the server spells it, e.g. from
+                SENSOR_PROFILES
+    """
+    attr = sensor.lower()
+    if attr in WFReading.__slots__:
+        return attr
+    for alias, name in _SENSOR_ALIASES.items():
+        if name.lower() == attr and alias in WFReading.__slots__:
+            return alias
+    return None
+
+
+# Stand-in for the tid while serializing a request template
+_TID_SLOT = "\x00tid\x00"
+
+
+@functools.lru_cache(maxsize=1024)
+def read_request_template(gwid, rlist):
+    """Pre-serialize the read request for a gateway and sensor list.
+
+    Only the tid changes between polls, so the JSON is built once per
+    (gwid, rlist) and split around the tid. Returns ``(prefix, suffix)``
+    such that ``prefix + str(tid) + suffix`` is exactly
+    ``json.dumps`` of the request.
+    """
+    req = dict(DATA_REQUEST, tid=_TID_SLOT, awlid=gwid, rlist=list(rlist))
+    prefix, suffix = json.dumps(req).split(json.dumps(_TID_SLOT))
+    return prefix, suffix
+
+
 class WFException(Exception):
     pass
 
@@ -123,7 +298,890 @@ class WFNoDataError(WFException):
     pass
 
 
-class SymphonyGeothermal:
+class WFCircuitOpenError(WFWebsocketClosedError):
+    """A gateway's circuit breaker is open, so it wasn't contacted."""
+
+    def __init__(self, gwid, retry_in):
+        super().__init__(f"Circuit open for {gwid}, retry in {retry_in:.1f}s")
+        self.gwid = gwid
+        self.retry_in = retry_in
+
+
+def mode_write(mode):
+    """Validate a thermostat mode and return its write parameters.
+
+    Args:
+        mode: Integer 0-4 (Off=0, Auto=1, Cool=2, Heat=3, E-Heat=4)
+    """
+    if isinstance(mode, bool) or not isinstance(mode, int) or mode < 0 or mode > 4:
+        raise ValueError(f"mode must be an integer 0-4, got: {mode}")
+    return {"activemode_write": mode}
+
+
+def cooling_setpoint_write(temperature):
+    """Validate a cooling setpoint and return its write parameters.
+
+    Args:
+        temperature: Temperature in degrees Fahrenheit (60-90)
+    """
+    if not isinstance(temperature, (int, float)):
+        raise ValueError(
+            f"temperature must be numeric, got: {type(temperature).__name__}"
+        )
+    if temperature < 60 or temperature > 90:
+        raise ValueError(
+            f"cooling temperature must be between 60-90F, got: {temperature}"
+        )
+    return {"coolingsp_write": temperature}
+
+
+def heating_setpoint_write(temperature):
+    """Validate a heating setpoint and return its write parameters.
+
+    Args:
+        temperature: Temperature in degrees Fahrenheit (40-80)
+    """
+    if not isinstance(temperature, (int, float)):
+        raise ValueError(
+            f"temperature must be numeric, got: {type(temperature).__name__}"
+        )
+    if temperature < 40 or temperature > 80:
+        raise ValueError(
+            f"heating temperature must be between 40-80F, got: {temperature}"
+        )
+    return {"heatingsp_write": temperature}
+
+
+def fan_mode_write(mode, intertimeon=None, intertimeoff=None):
+    """Validate a fan mode and return its write parameters.
+
+    Args:
+        mode: Integer 0-2 (Auto=0, Continuous=1, Intermittent=2)
+        intertimeon: Minutes on-time, required when mode=2
+        intertimeoff: Minutes off-time, required when mode=2
+    """
+    if isinstance(mode, bool) or not isinstance(mode, int) or mode < 0 or mode > 2:
+        raise ValueError(f"fan mode must be an integer 0-2, got: {mode}")
+    if mode == 2:
+        if intertimeon is None or intertimeoff is None:
+            raise ValueError(
+                "intertimeon and intertimeoff are required for intermittent mode"
+            )
+        if not isinstance(intertimeon, int) or intertimeon <= 0:
+            raise ValueError(
+                f"intertimeon must be a positive integer, got: {intertimeon}"
+            )
+        if not isinstance(intertimeoff, int) or intertimeoff <= 0:
+            raise ValueError(
+                f"intertimeoff must be a positive integer, got: {intertimeoff}"
+            )
+        return {
+            "fanmode_write": mode,
+            "intertimeon_write": intertimeon,
+            "intertimeoff_write": intertimeoff,
+        }
+    if intertimeon is not None or intertimeoff is not None:
+        raise ValueError(
+            "intertimeon and intertimeoff are only valid for intermittent mode"
+        )
+    return {"fanmode_write": mode}
+
+
+def validate_humidity(humidity):
+    """Validate a humidification target (15-95 percent)."""
+    if (
+        isinstance(humidity, bool)
+        or not isinstance(humidity, int)
+        or humidity < 15
+        or humidity > 95
+    ):
+        raise ValueError(f"humidity must be an integer between 15-95, got: {humidity}")
+
+
+def humidity_write(humidity, reading):
+    """Return the write parameters for a humidification target.
+
+    The unit expects the current humidity_offset_settings and
+    dehumidification setpoint back with every humidity write, so they
+    are taken from a recent reading.
+    """
+    validate_humidity(humidity)
+    return {
+        "humidity_offset_settings": reading.raw_humidity_offset_settings,
+        "dehumid_humid_sp": {
+            "dehumidification": reading.tstatdehumidsetpoint,
+            "humidification": humidity,
+        },
+    }
+
+
+# What set_humidity sends back unchanged with every humidity write
+HUMIDITY_WRITE_SENSORS = ("humidity_offset_settings", "TStatDehumidSetpoint")
+
+
+# Settings apply() takes, each named after its setter or setter argument
+SETTINGS = (
+    "mode",
+    "cooling_setpoint",
+    "heating_setpoint",
+    "fan_mode",
+    "intertimeon",
+    "intertimeoff",
+    "humidity",
+)
+
+
+def settings_write(settings):
+    """Validate apply() settings and split them into writes.
+
+    Returns ``(writes, humidity)``. ``writes`` is a list of ``(fields,
+    params)``, the settings each write sets and its ``*_write``
+    parameters, with mode first if it's being set. Each setter's
+    parameters are a write of their own, as for the set_* methods, so
+    every setting gets the service's own reply. ``humidity`` is the
+    validated humidity or None, as its write carries back the humidity
+    settings of a current reading.
+
+    Raises ValueError for an unknown or invalid setting, before
+    anything is sent.
+    """
+    unknown = set(settings) - set(SETTINGS)
+    if unknown:
+        raise ValueError(f"unknown settings: {', '.join(sorted(unknown))}")
+    if not settings:
+        raise ValueError("no settings to write")
+    writes = []
+    if "mode" in settings:
+        writes.append((("mode",), mode_write(settings["mode"])))
+    if "cooling_setpoint" in settings:
+        params = cooling_setpoint_write(settings["cooling_setpoint"])
+        writes.append((("cooling_setpoint",), params))
+    if "heating_setpoint" in settings:
+        params = heating_setpoint_write(settings["heating_setpoint"])
+        writes.append((("heating_setpoint",), params))
+    if "fan_mode" in settings:
+        params = fan_mode_write(
+            settings["fan_mode"],
+            settings.get("intertimeon"),
+            settings.get("intertimeoff"),
+        )
+        fields = ("fan_mode", "intertimeon", "intertimeoff")
+        writes.append((tuple(f for f in fields if f in settings), params))
+    elif "intertimeon" in settings or "intertimeoff" in settings:
+        raise ValueError("intertimeon and intertimeoff need a fan_mode")
+    humidity = settings.get("humidity")
+    if "humidity" in settings:
+        validate_humidity(humidity)
+    return writes, humidity
+
+
+class WriteResult:
+    """Outcome of each setting written by apply()."""
+
+    def __init__(self):
+        # setting -> decoded write reply
+        self.replies = {}
+        # setting -> exception, for settings that weren't written
+        self.errors = {}
+        self.elapsed = 0.0
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def record(self, fields, reply=None, error=None):
+        """Record the reply to, or error of, the write of ``fields``."""
+        for field in fields:
+            if error is None:
+                self.replies[field] = reply
+            else:
+                self.errors[field] = error
+
+    def __repr__(self):
+        return (
+            f"<WriteResult written={sorted(self.replies)}, "
+            f"errors={sorted(self.errors)}, elapsed={self.elapsed:.3f}>"
+        )
+
+
+class SettingsCache:
+    """The latest value of each field read from a gateway, for a short while.
+
+    Read-modify-write setters, like set_humidity, send back current
+    values along with what they change. Values read within ``max_age``
+    seconds save them a read first. A write to a gateway throws away
+    its values, and values from reads sent before the write finished
+    are ignored, as they could be from before the write.
+
+    Times are ``time.perf_counter()``, as for PendingReply.sent.
+    """
+
+    def __init__(self, max_age=SETTINGS_MAX_AGE):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        # gwid -> {field: value} and {field: when its read was sent}
+        self._values = {}
+        self._sent = {}
+        # gwid -> when its last write finished
+        self._written = {}
+
+    def __repr__(self):
+        return f"<SettingsCache max_age={self.max_age}, gateways={len(self._values)}>"
+
+    def update(self, gwid, data, sent):
+        """Keep the fields of a decoded read reply, its request sent at ``sent``."""
+        with self._lock:
+            if sent < self._written.get(gwid, float("-inf")):
+                return
+            self._values.setdefault(gwid, {}).update(data)
+            self._sent.setdefault(gwid, {}).update(dict.fromkeys(data, sent))
+
+    def get(self, gwid, sensors):
+        """The read reply fields of ``sensors`` if all are fresh, else None."""
+        keys = [name.lower() for name in sensors]
+        oldest = time.perf_counter() - self.max_age
+        with self._lock:
+            values = self._values.get(gwid, {})
+            sent = self._sent.get(gwid, {})
+            if all(sent.get(key, oldest) > oldest for key in keys):
+                return {key: values[key] for key in keys}
+        return None
+
+    def invalidate(self, gwid):
+        """Forget ``gwid``'s values, after a write to it."""
+        with self._lock:
+            self._written[gwid] = time.perf_counter()
+            self._values.pop(gwid, None)
+            self._sent.pop(gwid, None)
+
+
+def energy_chunks(start_date, end_date, days):
+    """Split a YYYY-MM-DD date range into ranges of at most ``days`` days.
+
+    Neighbouring ranges share their boundary date, so nothing is lost
+    whether the API treats ``end`` as inclusive or not. The duplicate
+    rows this gives are dropped by WFEnergyData.merge.
+    """
+    if days < 1:
+        raise ValueError(f"chunk days must be at least 1, got: {days}")
+    start = date.fromisoformat(str(start_date))
+    end = date.fromisoformat(str(end_date))
+    if end < start:
+        raise ValueError(f"end date {end} is before start date {start}")
+    chunks = []
+    while True:
+        stop = min(start + timedelta(days=days), end)
+        chunks.append((start.isoformat(), stop.isoformat()))
+        if stop >= end:
+            return chunks
+        start = stop
+
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# Keys of an energy response whose arrays are parsed item by item
+_STREAMED_KEYS = ("index", "data")
+
+
+def energy_events(chunks):
+    """Incrementally parse an energy response body.
+
+    ``chunks`` is an iterable of bytes (UTF-8) or str pieces of the JSON
+    object. Yields ``(key, value)`` for each top level key, except that
+    the ``index`` and ``data`` arrays are yielded one item at a time as
+    they arrive, so the whole body is never held at once. An empty body
+    yields nothing.
+
+    Raises:
+        ValueError: If the body is not a JSON object, or is truncated
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buf = ""
+    pos = 0
+    done = False
+    state = "start"
+    key = None
+
+    def more():
+        # append the next piece of the body, dropping what was parsed
+        nonlocal buf, pos, done
+        chunk = next(chunks, None)
+        if chunk is None:
+            done = True
+            chunk = utf8.decode(b"", final=True)
+        elif isinstance(chunk, bytes):
+            chunk = utf8.decode(chunk)
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    while True:
+        pos = _WHITESPACE.match(buf, pos).end()
+        if pos == len(buf):
+            if not done:
+                more()
+                continue
+            if state not in ("start", "end"):
+                raise ValueError("Truncated energy data response")
+            return
+
+        char = buf[pos]
+        if state == "value" and key in _STREAMED_KEYS and char == "[":
+            pos += 1
+            state = "first_item"
+            continue
+        if state == "first_item":
+            if char == "]":
+                pos += 1
+                state = "next_key"
+            else:
+                state = "item"
+            continue
+        if state in ("value", "item") or (state == "key" and char != "}"):
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                end = None
+            # a value is only taken once something follows it, a number
+            # at the end of the buffer may not be complete yet
+            if end is None or (end == len(buf) and not done):
+                if done:
+                    raise ValueError(f"Invalid energy data response at: {buf[pos:]!r}")
+                more()
+                continue
+            pos = end
+            if state == "key":
+                if not isinstance(value, str):
+                    raise ValueError(f"Invalid energy data key: {value!r}")
+                key = value
+                state = "colon"
+            else:
+                yield key, value
+                state = "next_key" if state == "value" else "next_item"
+            continue
+
+        pos += 1
+        if state == "start" and char == "{":
+            state = "key"
+        elif state in ("key", "next_key") and char == "}":
+            state = "end"
+        elif state == "colon" and char == ":":
+            state = "value"
+        elif state == "next_key" and char == ",":
+            state = "key"
+        elif state == "next_item" and char == ",":
+            state = "item"
+        elif state == "next_item" and char == "]":
+            state = "next_key"
+        else:
+            raise ValueError(f"Invalid energy data response at: {buf[pos - 1 :]!r}")
+
+
+def legacy_ssl_context():
+    """SSL context for the Symphony websocket.
+
+    The following is needed to allow legacy negotiation because
+    WF is kind of slow in updating infrastructure
+    """
+    ctx = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+    ctx.options |= 0x4  # OP_LEGACY_SERVER_CONNECT
+    return ctx
+
+
+class HTTPSessionPool:
+    """Keep-alive HTTP sessions shared by every client in a process.
+
+    One ``requests.Session`` is kept per base URL, so all the
+    WaterFurnace / GeoStar instances talking to the same Symphony host
+    reuse the same TCP + TLS connections instead of doing a fresh
+    handshake for every login, session check and energy call.
+
+    Sessions never store cookies. Every Symphony call passes its own
+    ``sessionid`` cookie, and a shared jar would leak one account's
+    session into another account's requests.
+    """
+
+    def __init__(
+        self, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, block=False
+    ):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.block = block
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return (
+            f"<HTTPSessionPool sessions={len(self._sessions)}, "
+            f"maxsize={self.pool_maxsize}>"
+        )
+
+    def _new_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.block,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        return session
+
+    def get(self, base_url):
+        """Get the shared session for a base URL, creating it if needed."""
+        with self._lock:
+            session = self._sessions.get(base_url)
+            if session is None:
+                session = self._new_session()
+                self._sessions[base_url] = session
+            return session
+
+    def set(self, base_url, session):
+        """Use a caller provided session for a base URL."""
+        with self._lock:
+            self._sessions[base_url] = session
+
+    def close(self):
+        """Close all pooled sessions and their connections."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+
+
+DEFAULT_HTTP_POOL = HTTPSessionPool()
+
+
+class Deadline:
+    """A callback scheduled on a DeadlineScheduler."""
+
+    __slots__ = ("when", "callback", "args", "cancelled", "_scheduler")
+
+    def __init__(self, scheduler, when, callback, args):
+        self._scheduler = scheduler
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        """Stop the callback from running, if it hasn't already."""
+        self._scheduler._cancel(self)
+
+    def __repr__(self):
+        return f"<Deadline in={self.when - time.monotonic():.3f}s>"
+
+
+class DeadlineScheduler:
+    """Runs callbacks at their deadlines on one shared thread.
+
+    Request watchdogs are scheduled here instead of starting a
+    threading.Timer, and its OS thread, for every request. The thread
+    is started on first use and sleeps until the earliest deadline.
+    Callbacks must be quick, they run one after another.
+    """
+
+    def __init__(self, name="waterfurnace-deadlines"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        # (when, seq, Deadline), cancelled entries are dropped lazily
+        self._heap = []
+        self._cancelled = 0
+        self._seq = itertools.count()
+        self._thread = None
+
+    def __repr__(self):
+        return f"<DeadlineScheduler pending={len(self)}>"
+
+    def __len__(self):
+        return len(self._heap) - self._cancelled
+
+    def schedule(self, delay, callback, *args):
+        """Call ``callback(*args)`` in ``delay`` seconds; returns a Deadline."""
+        deadline = Deadline(self, time.monotonic() + delay, callback, args)
+        with self._lock:
+            heapq.heappush(self._heap, (deadline.when, next(self._seq), deadline))
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=self.name, daemon=True
+                )
+                self._thread.start()
+            if self._heap[0][2] is deadline:
+                self._wakeup.notify()
+        return deadline
+
+    def _cancel(self, deadline):
+        with self._lock:
+            if deadline.cancelled:
+                return
+            deadline.cancelled = True
+            self._cancelled += 1
+            # most deadlines are cancelled long before they are due
+            if self._cancelled > 64 and self._cancelled * 2 > len(self._heap):
+                self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+                heapq.heapify(self._heap)
+                self._cancelled = 0
+
+    def _next(self):
+        with self._lock:
+            while True:
+                while self._heap and self._heap[0][2].cancelled:
+                    heapq.heappop(self._heap)
+                    self._cancelled -= 1
+                if not self._heap:
+                    self._wakeup.wait()
+                    continue
+                wait = self._heap[0][0] - time.monotonic()
+                if wait <= 0:
+                    deadline = heapq.heappop(self._heap)[2]
+                    # so a late cancel() is a no-op
+                    deadline.cancelled = True
+                    return deadline
+                self._wakeup.wait(wait)
+
+    def _run(self):
+        while True:
+            deadline = self._next()
+            try:
+                deadline.callback(*deadline.args)
+            except Exception:
+                _LOGGER.exception("Deadline callback %s failed", deadline.callback)
+
+
+DEFAULT_SCHEDULER = DeadlineScheduler()
+
+# Sends stream() requests at their tick, off the scheduler thread, so a
+# send blocked on a slow socket doesn't hold up every client's watchdogs
+STREAM_SEND_WORKERS = 4
+STREAM_SEND_POOL = ThreadPoolExecutor(
+    max_workers=STREAM_SEND_WORKERS, thread_name_prefix="waterfurnace-send"
+)
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter, and when to open a circuit.
+
+    The delay after the nth consecutive failure is
+    ``base * factor ** (n - 1)``, capped at ``cap``, with up to
+    ``jitter`` of it taken off at random so clients that failed together
+    don't all retry together.
+    """
+
+    def __init__(
+        self,
+        base=RETRY_BASE,
+        factor=RETRY_FACTOR,
+        cap=RETRY_CAP,
+        jitter=RETRY_JITTER,
+        threshold=BREAKER_THRESHOLD,
+        rng=None,
+    ):
+        if not 0 <= jitter <= 1:
+            raise ValueError(f"jitter must be between 0 and 1, got: {jitter}")
+        if threshold < 1:
+            raise ValueError(f"threshold must be at least 1, got: {threshold}")
+        self.base = base
+        self.factor = factor
+        self.cap = cap
+        self.jitter = jitter
+        self.threshold = threshold
+        self._rng = rng if rng is not None else random.Random()
+
+    def __repr__(self):
+        return (
+            f"<RetryPolicy base={self.base}, factor={self.factor}, "
+            f"cap={self.cap}, jitter={self.jitter}>"
+        )
+
+    def backoff(self, failures):
+        """Seconds to wait after ``failures`` consecutive failures."""
+        if failures < 1:
+            return 0.0
+        # min() before the power would overflow a float for large counts
+        exponent = min(failures - 1, 64)
+        delay = min(self.cap, self.base * self.factor**exponent)
+        return delay * (1 - self.jitter * self._rng.random())
+
+
+class CircuitBreaker:
+    """Tracks the health of one gateway.
+
+    Closed while reads succeed. After ``policy.threshold`` consecutive
+    failures it opens and ``allow()`` refuses calls until the backoff
+    for the failure count has passed. It is then half-open: one trial
+    call is let through, and its outcome closes the breaker or opens it
+    again with a longer backoff.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, policy=None, clock=time.monotonic):
+        self.policy = policy if policy is not None else RetryPolicy()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.retry_at = 0.0
+        self._state = self.CLOSED
+
+    def __repr__(self):
+        return f"<CircuitBreaker state={self.state}, failures={self.failures}>"
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and self._clock() >= self.retry_at:
+                # due for a trial, but nobody has asked for it yet
+                return self.HALF_OPEN
+            return self._state
+
+    @property
+    def retry_in(self):
+        """Seconds until the breaker lets a call through, 0 if it does now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return 0.0
+            return max(0.0, self.retry_at - self._clock())
+
+    def allow(self):
+        """Whether a call may be made now; claims the trial when half-open."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and self._clock() >= self.retry_at:
+                self._state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._state = self.CLOSED
+
+    def record_failure(self):
+        """Count a failure, returning the backoff before the next attempt."""
+        with self._lock:
+            self.failures += 1
+            delay = self.policy.backoff(self.failures)
+            if self._state == self.HALF_OPEN or self.failures >= self.policy.threshold:
+                self._state = self.OPEN
+                self.retry_at = self._clock() + delay
+            return delay
+
+
+class PendingReply:
+    """A websocket request waiting for its reply."""
+
+    def __init__(self, tid, gwid=None):
+        self.tid = tid
+        # the gateway asked, and perf_counter() when it was sent
+        self.gwid = gwid
+        self.sent = time.perf_counter()
+        self._event = threading.Event()
+        self._data = None
+        self._error = None
+
+    def set_result(self, data):
+        self._data = data
+        self._event.set()
+
+    def set_error(self, error):
+        self._error = error
+        self._event.set()
+
+    def done(self):
+        return self._event.is_set()
+
+    def result(self, timeout=None):
+        """Wait for the decoded reply, raising whatever the socket raised."""
+        if not self._event.wait(timeout):
+            raise websocket.WebSocketTimeoutException(
+                f"No reply for tid {self.tid} after {timeout}s"
+            )
+        if self._error is not None:
+            raise self._error
+        return self._data
+
+
+class ScheduledRead:
+    """A read request sent at its tick, scheduled by a DeadlineScheduler.
+
+    ``sent`` is a Future resolving to the PendingReply once the request
+    is on the wire, or to the error sending it raised. The send itself
+    runs on STREAM_SEND_POOL, as DeadlineScheduler callbacks must be
+    quick.
+    """
+
+    def __init__(self, client, rlist, delay):
+        self.sent = Future()
+        self.due = time.monotonic() + delay
+        self._deadline = client.scheduler.schedule(
+            delay, STREAM_SEND_POOL.submit, self._send, client, rlist
+        )
+
+    def reply(self, timeout):
+        """The PendingReply, waiting up to ``timeout`` seconds past the tick.
+
+        Raises concurrent.futures.TimeoutError if it wasn't sent by then.
+        """
+        return self.sent.result(max(0.0, self.due - time.monotonic()) + timeout)
+
+    def _send(self, client, rlist):
+        if not self.sent.set_running_or_notify_cancel():
+            return
+        try:
+            self.sent.set_result(client._ws_submit(client._read_request, rlist=rlist))
+        except Exception as e:
+            self.sent.set_exception(e)
+
+    def cancel(self):
+        self._deadline.cancel()
+        self.sent.cancel()
+
+
+class WSMultiplexer:
+    """Routes replies on one websocket to waiting callers by tid.
+
+    A background thread receives while any request is outstanding and
+    hands each reply to the caller that sent the matching tid, so reads
+    and writes from several threads can be pipelined on one socket
+    without swapping responses. A reply with a tid nobody is waiting
+    for, e.g. one that came after its request timed out, is dropped.
+    """
+
+    def __init__(
+        self,
+        ws,
+        name="waterfurnace-recv",
+        codec=DEFAULT_CODEC,
+        instrumentation=NULL_INSTRUMENTATION,
+    ):
+        self.ws = ws
+        self.codec = codec
+        self.instrumentation = instrumentation
+        self._send_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        # tid -> PendingReply, in send order
+        self._pending = {}
+        self._error = None
+        self._thread = threading.Thread(target=self._recv_loop, name=name, daemon=True)
+        self._thread.start()
+
+    def __repr__(self):
+        return f"<WSMultiplexer pending={len(self._pending)}>"
+
+    @property
+    def closed(self):
+        return self._error is not None
+
+    def submit(self, tid, message, gwid=None):
+        """Send a request, returning the PendingReply for its tid."""
+        reply = PendingReply(tid, gwid)
+        with self._lock:
+            if self._error is not None:
+                raise self._error
+            self._pending[tid] = reply
+            self._wakeup.notify()
+        try:
+            with self._send_lock, self.instrumentation.phase("send", gwid):
+                self.ws.send(message)
+        except Exception as e:
+            self._discard(reply)
+            if isinstance(e, (websocket.WebSocketException, OSError)):
+                # the socket is gone, fail anything else still waiting
+                self._fail(e)
+            raise
+        self.instrumentation.count("bytes_out", len(message), gwid)
+        return reply
+
+    def _discard(self, reply):
+        with self._lock:
+            if self._pending.get(reply.tid) is reply:
+                del self._pending[reply.tid]
+
+    def close(self, error=None):
+        """Stop routing replies and fail everything still waiting."""
+        self._fail(error or websocket.WebSocketConnectionClosedException())
+        try:
+            self.ws.close()
+        except Exception:
+            _LOGGER.debug("Error closing websocket", exc_info=True)
+
+    def _fail(self, error):
+        with self._lock:
+            if self._error is None:
+                self._error = error
+            pending = list(self._pending.values())
+            self._pending.clear()
+            self._wakeup.notify_all()
+        for reply in pending:
+            reply.set_error(error)
+
+    def _recv_loop(self):
+        while True:
+            with self._lock:
+                while not self._pending and self._error is None:
+                    self._wakeup.wait()
+                if self._error is not None:
+                    return
+            try:
+                self._dispatch(self.ws.recv())
+            except Exception as e:
+                self._fail(e)
+                return
+
+    def _dispatch(self, data):
+        arrived = time.perf_counter()
+        try:
+            decoded = self.codec.loads(data)
+            tid = decoded.get("tid")
+            error = None
+        except (TypeError, ValueError, AttributeError) as e:
+            _LOGGER.error("Unable to decode data as json: %s", data)
+            decoded, tid = None, None
+            error = ValueError(f"Unable to decode data as json: {data!r}")
+            error.__cause__ = e
+        decode_time = time.perf_counter() - arrived
+        with self._lock:
+            if error is not None and self._pending:
+                # no tid to go by, fail the oldest request rather than
+                # leave it waiting for a reply that won't come
+                reply = self._pending.pop(next(iter(self._pending)))
+            else:
+                reply = self._pending.pop(tid, None)
+        if reply is None:
+            _LOGGER.warning("Dropping websocket message with unknown tid: %s", data)
+            return
+        if error is not None:
+            reply.set_error(error)
+        else:
+            reply.set_result(decoded)
+        try:
+            hooks = self.instrumentation
+            hooks.count("bytes_in", len(data), reply.gwid)
+            hooks.observe("recv", arrived - reply.sent, reply.gwid)
+            hooks.observe("decode", decode_time, reply.gwid)
+        except Exception:
+            _LOGGER.exception("Instrumentation failed for tid %s", reply.tid)
+
+
+class SymphonyBase:
+    """The parts of the Symphony protocol that don't do any I/O.
+
+    Shared by the blocking SymphonyGeothermal client and the asyncio
+    client in waterfurnace.aio, which only differ in how they talk to
+    the network.
+    """
+
+    # Key for the shared session store, set by the vendor subclasses
+    vendor = None
+
     def __init__(
         self,
         base_url,
@@ -135,6 +1193,10 @@ class SymphonyGeothermal:
         device=0,
         location=0,
         sessionid=None,
+        codec=None,
+        retry_policy=None,
+        instrumentation=None,
+        settings_max_age=SETTINGS_MAX_AGE,
     ):
         self.base_url = base_url
         self.login_url = login_url
@@ -152,103 +1214,62 @@ class SymphonyGeothermal:
         self._location_data = None
         # Unique ID for the account, regardless of email changes.
         self.account_id = None
-        _LOGGER.debug(self)
+        self._tid_lock = threading.Lock()
+        # JSON codec for websocket frames and energy bodies
+        self.codec = codec if codec is not None else DEFAULT_CODEC
+        # Backoff for read_with_retry, and a CircuitBreaker per gwid
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.breakers = {}
+        # Timings and counters, see waterfurnace.instrumentation
+        self.instrumentation = (
+            instrumentation if instrumentation is not None else NULL_INSTRUMENTATION
+        )
+        # Recently read values for read-modify-write setters
+        self.settings_cache = SettingsCache(settings_max_age)
 
     def __repr__(self):
         return f"<Symphony user={self.user}>"
 
-    def next_tid(self):
-        self.tid = (self.tid + 1) % 100
+    def _cached_reading(self, sensors, gwid=None):
+        """A WFReading of ``sensors`` from the settings cache, None if stale."""
+        data = self.settings_cache.get(gwid or self.gwid, sensors)
+        return WFReading(data) if data is not None else None
 
-    def _check_session_id(self):
-        """Check an existing session ID."""
-        _LOGGER.debug("Checking existing session.")
-        headers = {
-            "user-agent": USER_AGENT,
-        }
-        res = requests.get(
-            f"{self.base_url}/api.php/user",
-            headers=headers,
-            cookies={
-                "legal-acknowledge": "yes",
-                "sessionid": self.sessionid,
-            },
-            timeout=TIMEOUT,
-            allow_redirects=False,
-        )
-        try:
-            res.json()["emailaddress"]
-        except KeyError as e:
-            _LOGGER.exception(
-                "Existing session is not valid A lot of debug info coming..."
-            )
-            _LOGGER.debug("Response: %s", res)
-            _LOGGER.debug("Response Cookies: %s", res.cookies)
-            _LOGGER.debug("Response Content: %s", res.content)
-            raise WFCredentialError() from e
+    def breaker(self, gwid=None):
+        """The CircuitBreaker for ``gwid``, default the current gateway."""
+        if gwid is None:
+            gwid = self.gwid
+        breaker = self.breakers.get(gwid)
+        if breaker is None:
+            breaker = self.breakers.setdefault(gwid, CircuitBreaker(self.retry_policy))
+        return breaker
 
-    def _get_session_id(self):
-        data = dict(
+    def next_tid(self):
+        with self._tid_lock:
+            self.tid = (self.tid + 1) % TID_SPACE
+
+    def _claim_tid(self):
+        """Return the current tid and advance it, atomically."""
+        with self._tid_lock:
+            tid = self.tid
+            self.tid = (self.tid + 1) % TID_SPACE
+        return tid
+
+    def _login_form(self):
+        return dict(
             emailaddress=self.user, password=self.passwd, op="login", redirect="/"
         )
-        headers = {
-            "user-agent": USER_AGENT,
-        }
-
-        res = requests.post(
-            self.login_url,
-            data=data,
-            headers=headers,
-            cookies={
-                "legal-acknowledge": "yes",
-                "energy-base-price": "0.15",
-                "temp_unit": "f",
-            },
-            timeout=TIMEOUT,
-            allow_redirects=False,
-        )
-        try:
-            self.sessionid = res.cookies["sessionid"]
-        except KeyError as e:
-            _LOGGER.exception(
-                "Did not find expected session cookie, login failed."
-                " A lot of debug info coming..."
-            )
-            _LOGGER.debug("Response: %s", res)
-            _LOGGER.debug("Response Cookies: %s", res.cookies)
-            _LOGGER.debug("Response Content: %s", res.content)
-            if FAILED_LOGIN in res.content:
-                _LOGGER.exception(
-                    "Failed to log in, are you sure your user / password are correct"
-                )
-                raise WFCredentialError() from e
-            else:
-                raise WFError() from e
 
-    def _login_ws(self):
-        # The following is needed to allow legacy negotiation because
-        # WF is kind of slow in updating infrastructure
-        sslopt = {}
-        ctx = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
-        ctx.options |= 0x4  # OP_LEGACY_SERVER_CONNECT
-        sslopt.update({"context": ctx})
-
-        self.ws = websocket.create_connection(
-            self.ws_url, timeout=TIMEOUT, sslopt=sslopt
-        )
-        login = {
+    def _login_request(self):
+        return {
             "cmd": "login",
             "tid": self.tid,
             "source": "consumer dashboard",
             "sessionid": self.sessionid,
         }
-        self.ws.send(json.dumps(login))
-        # TODO(sdague): we should probably check the response, but
-        # it's not clear anything is useful in it.
-        recv = self.ws.recv()
-        data = json.loads(recv)
-        _LOGGER.debug("Login response: %s", data)
 
+    def _handle_login(self, data):
+        """Pick the location and gateway out of the websocket login response."""
         if "key" in data:
             self.account_id = data["key"]
 
@@ -306,10 +1327,226 @@ class SymphonyGeothermal:
                 self.device,
             )
 
-        self.gwid = device["gwid"]
+        self.gwid = device["gwid"]
+
+    @property
+    def locations(self):
+        """Get all available locations"""
+        if not isinstance(self._location_data, list):
+            return None
+
+        return [WFLocation(loc) for loc in self._location_data]
+
+    @property
+    def devices(self):
+        """Get all devices for the current location."""
+
+        if self.locations is None:
+            return None
+
+        target_location = None
+        if isinstance(self.location, int):
+            try:
+                target_location = self.locations[self.location]
+            except IndexError as e:
+                raise WFError(
+                    f"Location index out of range. "
+                    f"Max index is {len(self.locations) - 1}"
+                ) from e
+        else:
+            raise WFError("Unknown location type")
+
+        return target_location.gateways
+
+    def _read_request(self, tid, gwid=None, rlist=READ_RLIST):
+        """Serialized read request, built from the cached template."""
+        prefix, suffix = read_request_template(gwid or self.gwid, rlist)
+        return f"{prefix}{tid:d}{suffix}"
+
+    def _write_request(self, tid, gwid=None, **kwargs):
+        req = {
+            "cmd": "write",
+            "tid": tid,
+            "awlid": gwid or self.gwid,
+            "source": "tstat",
+        }
+        req.update(kwargs)
+        return self.codec.dumps(req)
+
+    def _energy_url(self, start_date, end_date, frequency, timezone_str):
+        if not self.sessionid or not self.gwid:
+            raise WFCredentialError("Must login before getting energy data")
+
+        # Validate frequency
+        valid_frequencies = ["1D", "1H", "15min"]
+        if frequency not in valid_frequencies:
+            raise ValueError(f"Invalid frequency. Must be one of {valid_frequencies}")
+
+        # Build the API URL
+        return (
+            f"{self.base_url}/api.php/v2/gateway/{self.gwid}/energy"
+            f"?freq={frequency}&start={start_date}"
+            f"&timezone={timezone_str}&end={end_date}"
+        )
+
+
+class SymphonyGeothermal(SymphonyBase):
+    def __init__(
+        self,
+        base_url,
+        login_url,
+        ws_url,
+        user,
+        passwd,
+        max_fails=5,
+        device=0,
+        location=0,
+        sessionid=None,
+        http_session=None,
+        http_pool=None,
+        session_store=None,
+        energy_cache=None,
+        codec=None,
+        request_timeout=REQUEST_TIMEOUT,
+        scheduler=None,
+        retry_policy=None,
+        instrumentation=None,
+        settings_max_age=SETTINGS_MAX_AGE,
+    ):
+        super().__init__(
+            base_url,
+            login_url,
+            ws_url,
+            user,
+            passwd,
+            max_fails,
+            device,
+            location,
+            sessionid=sessionid,
+            codec=codec,
+            retry_policy=retry_policy,
+            instrumentation=instrumentation,
+            settings_max_age=settings_max_age,
+        )
+        # HTTP connections are pooled per base URL unless a session is given
+        self.http_pool = http_pool if http_pool is not None else DEFAULT_HTTP_POOL
+        self._http_session = http_session
+        # Optional waterfurnace.session_store.SessionStore
+        self.session_store = session_store
+        # Optional waterfurnace.energy_cache.EnergyCache
+        self.energy_cache = energy_cache
+        # Seconds before an unanswered request aborts the websocket, the
+        # watchdogs run on a DeadlineScheduler shared by all clients
+        self.request_timeout = request_timeout
+        self.scheduler = scheduler if scheduler is not None else DEFAULT_SCHEDULER
+        self.ws = None
+        self._mux = None
+        _LOGGER.debug(self)
+
+    @property
+    def http(self):
+        """The HTTP session used for login, session check and energy calls."""
+        if self._http_session is not None:
+            return self._http_session
+        return self.http_pool.get(self.base_url)
+
+    def _check_session_id(self):
+        """Check an existing session ID."""
+        _LOGGER.debug("Checking existing session.")
+        headers = {
+            "user-agent": USER_AGENT,
+        }
+        res = self.http.get(
+            f"{self.base_url}/api.php/user",
+            headers=headers,
+            cookies={
+                "legal-acknowledge": "yes",
+                "sessionid": self.sessionid,
+            },
+            timeout=TIMEOUT,
+            allow_redirects=False,
+        )
+        try:
+            res.json()["emailaddress"]
+        except KeyError as e:
+            _LOGGER.exception(
+                "Existing session is not valid A lot of debug info coming..."
+            )
+            _LOGGER.debug("Response: %s", res)
+            _LOGGER.debug("Response Cookies: %s", res.cookies)
+            _LOGGER.debug("Response Content: %s", res.content)
+            raise WFCredentialError() from e
+
+    def _get_session_id(self):
+        data = self._login_form()
+        headers = {
+            "user-agent": USER_AGENT,
+        }
+
+        res = self.http.post(
+            self.login_url,
+            data=data,
+            headers=headers,
+            cookies={
+                "legal-acknowledge": "yes",
+                "energy-base-price": "0.15",
+                "temp_unit": "f",
+            },
+            timeout=TIMEOUT,
+            allow_redirects=False,
+        )
+        try:
+            self.sessionid = res.cookies["sessionid"]
+        except KeyError as e:
+            _LOGGER.exception(
+                "Did not find expected session cookie, login failed."
+                " A lot of debug info coming..."
+            )
+            _LOGGER.debug("Response: %s", res)
+            _LOGGER.debug("Response Cookies: %s", res.cookies)
+            _LOGGER.debug("Response Content: %s", res.content)
+            content = res.content
+            if isinstance(content, bytes):
+                content = content.decode("utf-8", "replace")
+            if FAILED_LOGIN in content:
+                _LOGGER.exception(
+                    "Failed to log in, are you sure your user / password are correct"
+                )
+                raise WFCredentialError() from e
+            else:
+                raise WFError() from e
+
+    def _login_ws(self):
+        if self._mux is not None:
+            self._mux.close()
+            self._mux = None
+        hooks = self.instrumentation
+        sslopt = {"context": legacy_ssl_context()}
+        with hooks.phase("ws_connect", self.gwid):
+            self.ws = websocket.create_connection(
+                self.ws_url, timeout=TIMEOUT, sslopt=sslopt
+            )
+        with hooks.phase("ws_login", self.gwid):
+            req = self.codec.dumps(self._login_request())
+            self.ws.send(req)
+            # TODO(sdague): we should probably check the response, but
+            # it's not clear anything is useful in it.
+            recv = self.ws.recv()
+            data = self.codec.loads(recv)
+        _LOGGER.debug("Login response: %s", data)
+
+        self._handle_login(data)
+        hooks.count("bytes_out", len(req), self.gwid)
+        hooks.count("bytes_in", len(recv), self.gwid)
         self.next_tid()
+        self._mux = WSMultiplexer(
+            self.ws,
+            name=f"waterfurnace-recv-{self.gwid}",
+            codec=self.codec,
+            instrumentation=hooks,
+        )
 
-    def login(self):
+    def _login_http(self):
         if self.sessionid:
             try:
                 self._check_session_id()
@@ -317,246 +1554,416 @@ class SymphonyGeothermal:
                 self._get_session_id()
         else:
             self._get_session_id()
-        # reset the transaction id if we start over
-        self.tid = 1
-        self._login_ws()
-
-    @property
-    def locations(self):
-        """Get all available locations"""
-        if not isinstance(self._location_data, list):
-            return None
 
-        return [WFLocation(loc) for loc in self._location_data]
-
-    @property
-    def devices(self):
-        """Get all devices for the current location."""
-
-        if self.locations is None:
-            return None
+    def _login_http_cached(self):
+        """HTTP login through the shared session store.
 
-        target_location = None
-        if isinstance(self.location, int):
-            try:
-                target_location = self.locations[self.location]
-            except IndexError as e:
-                raise WFError(
-                    f"Location index out of range. "
-                    f"Max index is {len(self.locations) - 1}"
-                ) from e
-        else:
-            raise WFError("Unknown location type")
+        The store lock is held for the whole exchange, so concurrent
+        processes wait for one login rather than each doing their own.
+        """
+        store = self.session_store
+        vendor = self.vendor or self.base_url
+        with store.lock():
+            entry = store.get(vendor, self.user)
+            if self.sessionid is None and entry is not None:
+                self.sessionid = entry.sessionid
+                if store.is_fresh(entry):
+                    _LOGGER.debug("Reusing recently validated cached session.")
+                    return
+            self._login_http()
+            store.put(vendor, self.user, self.sessionid)
 
-        return target_location.gateways
+    def login(self):
+        with self.instrumentation.phase("http_login", self.gwid):
+            if self.session_store is not None:
+                self._login_http_cached()
+            else:
+                self._login_http()
+        # reset the transaction id if we start over
+        self.tid = 1
+        try:
+            self._login_ws()
+        except Exception:
+            if self.session_store is not None:
+                # don't hand a session the websocket rejected to anyone else
+                self.session_store.invalidate(self.vendor or self.base_url, self.user)
+            raise
 
     def _abort(self, *args, **kwargs):
         _LOGGER.warning("Timeout on websocket request. Aborting websocket")
+        self.instrumentation.count("timeouts", 1, self.gwid)
         try:
             self.ws.abort()
         except Exception:
             _LOGGER.exception("Can't abort, this might be interesting....")
 
-    def _ws_read(self):
-        req = copy.deepcopy(DATA_REQUEST)
-        req["tid"] = self.tid
-        req["awlid"] = self.gwid
+    def _ws_submit(self, build, **kwargs):
+        """Send a request without waiting, returning its PendingReply.
 
+        Args:
+            build: Builder taking the tid and returning the serialized
+                request, e.g. self._read_request
+        """
+        if self._mux is None:
+            raise websocket.WebSocketConnectionClosedException("Not logged in")
+        tid = self._claim_tid()
+        req = build(tid, **kwargs)
         _LOGGER.debug("Req: %s", req)
-        timer = threading.Timer(10.0, self._abort, [self])
-        timer.start()
-        self.ws.send(json.dumps(req))
+        reply = self._mux.submit(tid, req, kwargs.get("gwid") or self.gwid)
         _LOGGER.debug("Successful send")
-        data = self.ws.recv()
-        _LOGGER.debug("Successful recv")
-        timer.cancel()
-        return data
+        return reply
 
-    def _ws_write(self, **kwargs):
-        req = {
-            "cmd": "write",
-            "tid": self.tid,
-            "awlid": self.gwid,
-            "source": "tstat",
-        }
-        req.update(kwargs)
+    def _ws_request(self, build, timeout=None, **kwargs):
+        """Send a request and wait for the decoded reply with the same tid.
 
-        _LOGGER.debug("Write req: %s", req)
-        timer = threading.Timer(10.0, self._abort, [self])
-        timer.start()
+        If no reply comes within ``timeout`` seconds (default
+        ``request_timeout``) the websocket is aborted, failing the request.
+        """
+        if timeout is None:
+            timeout = self.request_timeout
+        watchdog = self.scheduler.schedule(timeout, self._abort)
         try:
-            self.ws.send(json.dumps(req))
-            data = self.ws.recv()
-            timer.cancel()
-            self.next_tid()
-            datadecoded = json.loads(data)
-            _LOGGER.debug("Write resp: %s", datadecoded)
-            if datadecoded["err"]:
-                raise WFError(datadecoded["err"])
-            return datadecoded
-        except WFError:
-            raise
+            reply = self._ws_submit(build, **kwargs)
+            data = reply.result(max(timeout, TIMEOUT))
+            _LOGGER.debug("Successful recv")
+            return data
+        finally:
+            watchdog.cancel()
+
+    def _ws_read(self, rlist=READ_RLIST, timeout=None, gwid=None):
+        return self._ws_request(
+            self._read_request, timeout=timeout, gwid=gwid, rlist=rlist
+        )
+
+    def _ws_write(self, timeout=None, **kwargs):
+        gwid = kwargs.pop("gwid", None)
+        [(datadecoded, error)] = self._ws_writes([kwargs], timeout, gwid)
+        if error is not None:
+            raise error
+        return datadecoded
+
+    def _ws_writes(self, writes, timeout=None, gwid=None):
+        """Pipeline writes to one gateway, each with its own tid.
+
+        ``writes`` are dicts of ``*_write`` parameters. All of them are
+        sent before any reply is waited for, so together they take
+        about one round trip. Returns a ``(reply, error)`` per write, in
+        order, the error being the WFException of a write that failed.
+        """
+        if timeout is None:
+            timeout = self.request_timeout
+        watchdog = self.scheduler.schedule(timeout, self._abort)
+        try:
+            sent = [
+                self._write_outcome(
+                    self._ws_submit, self._write_request, gwid=gwid, **params
+                )
+                for params in writes
+            ]
+            return [
+                (reply, error)
+                if error is not None
+                else self._write_outcome(self._write_reply, reply, timeout)
+                for reply, error in sent
+            ]
+        finally:
+            watchdog.cancel()
+            self.settings_cache.invalidate(gwid or self.gwid)
+
+    @staticmethod
+    def _write_reply(reply, timeout):
+        datadecoded = reply.result(max(timeout, TIMEOUT))
+        _LOGGER.debug("Write resp: %s", datadecoded)
+        if datadecoded["err"]:
+            raise WFError(datadecoded["err"])
+        return datadecoded
+
+    @staticmethod
+    def _write_outcome(call, *args, **kwargs):
+        """``(call(*args, **kwargs), None)``, or ``(None, error)`` if it failed."""
+        try:
+            return call(*args, **kwargs), None
+        except WFError as e:
+            return None, e
         except websocket.WebSocketConnectionClosedException as e:
             _LOGGER.exception("Websocket closed, probably from a timeout")
-            raise WFWebsocketClosedError() from e
+            error = WFWebsocketClosedError()
+            error.__cause__ = e
         except ValueError as e:
-            _LOGGER.exception("Unable to decode data as json: %s", data)
-            raise WFWebsocketClosedError() from e
+            _LOGGER.exception("Unable to decode write response")
+            error = WFWebsocketClosedError()
+            error.__cause__ = e
         except Exception as e:
             _LOGGER.exception("Unknown exception, socket probably failed")
-            raise WFWebsocketClosedError() from e
-        finally:
-            timer.cancel()
+            error = WFWebsocketClosedError()
+            error.__cause__ = e
+        return None, error
+
+    def _decode_reading(self, datadecoded):
+        _LOGGER.debug("Resp: %s", datadecoded)
+        if not datadecoded["err"]:
+            gwid = datadecoded.get("awlid") or self.gwid
+            with self.instrumentation.phase("model", gwid):
+                return WFReading(datadecoded)
+        else:
+            raise WFError(datadecoded["err"])
+
+    def read(self, sensors=None, timeout=None):
+        """Read the current sensor values.
 
-    def read(self):
+        Args:
+            sensors: Optional subset to request, a SENSOR_PROFILES name
+                     or a list of sensor names (see resolve_sensors).
+                     Fields that weren't requested are None.
+            timeout: Seconds to wait for the reply, instead of the
+                     client's request_timeout
+        """
+        return self._read(resolve_sensors(sensors), timeout)
+
+    def _read(self, rlist, timeout=None, gwid=None):
         try:
-            data = self._ws_read()
-            self.next_tid()
-            datadecoded = json.loads(data)
-            _LOGGER.debug("Resp: %s", datadecoded)
-            if not datadecoded["err"]:
-                return WFReading(datadecoded)
-            else:
-                raise WFError(datadecoded["err"])
+            sent = time.perf_counter()
+            data = self._ws_read(rlist, timeout, gwid)
+            reading = self._decode_reading(data)
         except websocket.WebSocketConnectionClosedException as e:
             _LOGGER.exception("Websocket closed, probably from a timeout")
             raise WFWebsocketClosedError() from e
         except ValueError as e:
-            _LOGGER.exception("Unable to decode data as json: %s", data)
+            _LOGGER.exception("Unable to decode read response")
             raise WFWebsocketClosedError() from e
         except Exception as e:
             _LOGGER.exception("Unknown exception, socket probably failed")
             raise WFWebsocketClosedError() from e
-
-    def read_with_retry(self):
-        while self.fails <= self.max_fails:
+        self.settings_cache.update(reading.awlid or self.gwid, data, sent)
+        return reading
+
+    def read_with_retry(self, sensors=None, block=True):
+        """Read, logging in again on failure.
+
+        Failures back off as set by ``retry_policy`` and are counted by
+        the gateway's CircuitBreaker (see ``breaker()``). With
+        ``block=False`` nothing sleeps: a failed attempt raises straight
+        away, and while the breaker is open WFCircuitOpenError is raised
+        without contacting the gateway, so a poll loop can move on and
+        call again on its next tick.
+        """
+        resolve_sensors(sensors)
+        breaker = self.breaker()
+        while True:
+            if not breaker.allow():
+                if not block:
+                    raise WFCircuitOpenError(self.gwid, breaker.retry_in)
+                time.sleep(breaker.retry_in)
+                continue
             try:
                 if self.fails >= 1:
                     self.login()
                     _LOGGER.debug("Reconnected to furnace")
-                data = self.read()
+                data = self.read(sensors)
+            except (requests.exceptions.RequestException, WFWebsocketClosedError) as e:
+                if isinstance(e, WFWebsocketClosedError):
+                    _LOGGER.exception("websocket read failed, reconnecting")
+                else:
+                    _LOGGER.exception("relogin failed, trying again")
+                self.fails = self.fails + 1
+                self.instrumentation.count("retries", 1, self.gwid)
+                delay = breaker.record_failure()
+                if not block:
+                    raise
+            else:
                 self.fails = 0
+                breaker.record_success()
                 return data
-            except requests.exceptions.RequestException:  # noqa: PERF203
-                self.fails = self.fails + 1
-                _LOGGER.exception("relogin failed, trying again")
-                time.sleep(self.fails * ERROR_INTERVAL)
-            except WFWebsocketClosedError:
-                self.fails = self.fails + 1
-                _LOGGER.exception("websocket read failed, reconnecting")
-                time.sleep(self.fails * ERROR_INTERVAL)
-        raise WFWebsocketClosedError("Failed to refresh credentials after retries")
+            if self.fails > self.max_fails:
+                raise WFWebsocketClosedError(
+                    "Failed to refresh credentials after retries"
+                )
+            if breaker.retry_in == 0:
+                time.sleep(delay)
+
+    def _stream_reading(self, request):
+        """Wait for a ScheduledRead's reply and decode it.
+
+        Any failure is a WFWebsocketClosedError, as for read(), so that
+        stream() retries it.
+        """
+        try:
+            reply = request.reply(self.request_timeout)
+            data = reply.result(self.request_timeout)
+            reading = self._decode_reading(data)
+        except (websocket.WebSocketTimeoutException, FutureTimeoutError) as e:
+            # a socket that stopped answering gets a fresh one
+            request.cancel()
+            self._abort()
+            raise WFWebsocketClosedError(str(e) or "Stream request not sent") from e
+        except Exception as e:
+            raise WFWebsocketClosedError(str(e)) from e
+        self.settings_cache.update(reading.awlid or self.gwid, data, reply.sent)
+        return reading
+
+    def stream(self, interval=STREAM_INTERVAL, sensors=None):
+        """Yield a reading every ``interval`` seconds, forever.
+
+        The request for each tick is sent on time by the client's
+        DeadlineScheduler, so it is usually answered by the time the
+        caller asks for the next reading. A caller that falls more than
+        a tick behind doesn't queue requests up: the missed ticks are
+        skipped and it gets a fresh reading. A failed read reconnects
+        through read_with_retry, with its backoff and circuit breaker.
+
+        Args:
+            interval: Seconds between readings, keep it under 30
+            sensors: Optional subset to request, as for read()
+        """
+        if interval <= 0:
+            raise ValueError(f"interval must be positive, got: {interval}")
+        rlist = resolve_sensors(sensors)
+        tick = time.monotonic()
+        request = None
+        try:
+            while True:
+                if request is None:
+                    request = ScheduledRead(self, rlist, 0)
+                try:
+                    reading = self._stream_reading(request)
+                except WFWebsocketClosedError:
+                    _LOGGER.warning("Stream read failed, reconnecting", exc_info=True)
+                    self.fails = self.fails + 1
+                    self.instrumentation.count("retries", 1, self.gwid)
+                    self.breaker().record_failure()
+                    reading = self.read_with_retry(sensors)
+                    tick = time.monotonic()
+                else:
+                    self.fails = 0
+                    self.breaker().record_success()
+                tick += interval
+                # sent at the tick even if the caller is still busy
+                request = ScheduledRead(self, rlist, max(0.0, tick - time.monotonic()))
+                yield reading
+                behind = time.monotonic() - tick
+                if behind >= interval:
+                    missed = int(behind // interval)
+                    _LOGGER.debug("Stream fell behind, skipping %d ticks", missed)
+                    request.cancel()
+                    request = None
+                    tick += missed * interval
+        finally:
+            if request is not None:
+                request.cancel()
 
-    def set_mode(self, mode):
+    def set_mode(self, mode, timeout=None):
         """Set the active thermostat mode.
 
         Args:
             mode: Integer 0-4 (Off=0, Auto=1, Cool=2, Heat=3, E-Heat=4)
+            timeout: Seconds to wait for the reply, as for read()
         """
-        if isinstance(mode, bool) or not isinstance(mode, int) or mode < 0 or mode > 4:
-            raise ValueError(f"mode must be an integer 0-4, got: {mode}")
-        return self._ws_write(activemode_write=mode)
+        return self._ws_write(timeout, **mode_write(mode))
 
-    def set_cooling_setpoint(self, temperature):
+    def set_cooling_setpoint(self, temperature, timeout=None):
         """Set the cooling temperature setpoint.
 
         Only effective when in Cool or Auto mode.
 
         Args:
             temperature: Temperature in degrees Fahrenheit (60-90)
+            timeout: Seconds to wait for the reply, as for read()
         """
-        if not isinstance(temperature, (int, float)):
-            raise ValueError(
-                f"temperature must be numeric, got: {type(temperature).__name__}"
-            )
-        if temperature < 60 or temperature > 90:
-            raise ValueError(
-                f"cooling temperature must be between 60-90F, got: {temperature}"
-            )
-        return self._ws_write(coolingsp_write=temperature)
+        return self._ws_write(timeout, **cooling_setpoint_write(temperature))
 
-    def set_heating_setpoint(self, temperature):
+    def set_heating_setpoint(self, temperature, timeout=None):
         """Set the heating temperature setpoint.
 
         Only effective when in Heat, Auto, or E-Heat mode.
 
         Args:
             temperature: Temperature in degrees Fahrenheit (40-80)
+            timeout: Seconds to wait for the reply, as for read()
         """
-        if not isinstance(temperature, (int, float)):
-            raise ValueError(
-                f"temperature must be numeric, got: {type(temperature).__name__}"
-            )
-        if temperature < 40 or temperature > 80:
-            raise ValueError(
-                f"heating temperature must be between 40-80F, got: {temperature}"
-            )
-        return self._ws_write(heatingsp_write=temperature)
+        return self._ws_write(timeout, **heating_setpoint_write(temperature))
 
-    def set_fan_mode(self, mode, intertimeon=None, intertimeoff=None):
+    def set_fan_mode(self, mode, intertimeon=None, intertimeoff=None, timeout=None):
         """Set the fan mode.
 
         Args:
             mode: Integer 0-2 (Auto=0, Continuous=1, Intermittent=2)
             intertimeon: Minutes on-time, required when mode=2
             intertimeoff: Minutes off-time, required when mode=2
+            timeout: Seconds to wait for the reply, as for read()
         """
-        if isinstance(mode, bool) or not isinstance(mode, int) or mode < 0 or mode > 2:
-            raise ValueError(f"fan mode must be an integer 0-2, got: {mode}")
-        if mode == 2:
-            if intertimeon is None or intertimeoff is None:
-                raise ValueError(
-                    "intertimeon and intertimeoff are required for intermittent mode"
-                )
-            if not isinstance(intertimeon, int) or intertimeon <= 0:
-                raise ValueError(
-                    f"intertimeon must be a positive integer, got: {intertimeon}"
-                )
-            if not isinstance(intertimeoff, int) or intertimeoff <= 0:
-                raise ValueError(
-                    f"intertimeoff must be a positive integer, got: {intertimeoff}"
-                )
-            return self._ws_write(
-                fanmode_write=mode,
-                intertimeon_write=intertimeon,
-                intertimeoff_write=intertimeoff,
-            )
-        else:
-            if intertimeon is not None or intertimeoff is not None:
-                raise ValueError(
-                    "intertimeon and intertimeoff are only valid for intermittent mode"
-                )
-            return self._ws_write(fanmode_write=mode)
+        return self._ws_write(
+            timeout, **fan_mode_write(mode, intertimeon, intertimeoff)
+        )
 
-    def set_humidity(self, humidity):
+    def set_humidity(self, humidity, timeout=None):
         """Set the humidification target.
 
-        Reads current sensor values first to preserve existing
-        humidity_offset_settings and dehumidification setpoint.
+        Sends back the current humidity_offset_settings and
+        dehumidification setpoint, taken from a reading within
+        ``settings_max_age`` seconds, or else read first.
 
         Args:
             humidity: Target humidity percentage (15-95)
+            timeout: Seconds to wait for each reply, as for read()
         """
-        if (
-            isinstance(humidity, bool)
-            or not isinstance(humidity, int)
-            or humidity < 15
-            or humidity > 95
-        ):
-            raise ValueError(
-                f"humidity must be an integer between 15-95, got: {humidity}"
-            )
-        reading = self.read()
-        return self._ws_write(
-            humidity_offset_settings=reading.raw_humidity_offset_settings,
-            dehumid_humid_sp={
-                "dehumidification": reading.tstatdehumidsetpoint,
-                "humidification": humidity,
-            },
-        )
+        validate_humidity(humidity)
+        return self._set_humidity(humidity, timeout)
+
+    def _set_humidity(self, humidity, timeout=None, gwid=None):
+        reading = self._cached_reading(HUMIDITY_WRITE_SENSORS, gwid)
+        if reading is None:
+            reading = self._read(resolve_sensors(HUMIDITY_WRITE_SENSORS), timeout, gwid)
+        return self._ws_write(timeout, gwid=gwid, **humidity_write(humidity, reading))
+
+    def apply(self, settings, timeout=None, gwid=None):
+        """Write several settings in as few round trips as possible.
+
+        ``settings`` maps any of SETTINGS to a value, as passed to the
+        setter of the same name, e.g. ``{"mode": 3, "heating_setpoint":
+        68, "fan_mode": 0}``. Everything is validated first. Mode is
+        written first, on its own, then the setpoints and fan mode are
+        sent together as separate writes, each with its own reply.
+        Humidity is set after, as by set_humidity.
+
+        Returns a WriteResult with the reply or error per setting;
+        failed writes don't raise.
+
+        Args:
+            settings: Dict of setting name to value
+            timeout: Seconds to wait for each reply, as for read()
+            gwid: Another gateway of the account to write to, over this
+                  client's websocket, instead of the client's own
+        """
+        writes, humidity = settings_write(settings)
+        result = WriteResult()
+        start = time.monotonic()
+        if writes and writes[0][0] == ("mode",):
+            # the setpoints are written to the unit once it's in the new mode
+            batches = [writes[:1], writes[1:]]
+        else:
+            batches = [writes]
+        for batch in batches:
+            if not batch:
+                continue
+            outcomes = self._ws_writes([params for _, params in batch], timeout, gwid)
+            for (fields, _), (reply, error) in zip(batch, outcomes, strict=True):
+                result.record(fields, reply, error)
+        if humidity is not None:
+            try:
+                reply = self._set_humidity(humidity, timeout, gwid)
+                result.record(("humidity",), reply)
+            except WFException as e:
+                result.record(("humidity",), error=e)
+        result.elapsed = time.monotonic() - start
+        return result
 
     def get_energy_data(
-        self, start_date, end_date, frequency="1H", timezone_str="America/New_York"
+        self,
+        start_date,
+        end_date,
+        frequency="1H",
+        timezone_str="America/New_York",
+        stream=False,
     ):
         """Get energy data for a date range.
 
@@ -566,6 +1973,13 @@ class SymphonyGeothermal:
             frequency: Data frequency - "1D" (daily),
                        "1H" (hourly), or "15min" (15 minutes)
             timezone_str: Timezone string (e.g., "America/New_York")
+            stream: Parse the response as it downloads, filling the
+                    columns directly, so the body and a parsed copy of
+                    it are never held in memory
+
+        With an ``energy_cache``, closed days already fetched are served
+        from it, only the rest are requested, and the result covers
+        start_date through end_date inclusive.
 
         Returns:
             WFEnergyData object containing energy readings
@@ -574,21 +1988,23 @@ class SymphonyGeothermal:
             WFCredentialError: If not logged in or session invalid
             WFError: If API request fails
         """
-        if not self.sessionid or not self.gwid:
-            raise WFCredentialError("Must login before getting energy data")
-
-        # Validate frequency
-        valid_frequencies = ["1D", "1H", "15min"]
-        if frequency not in valid_frequencies:
-            raise ValueError(f"Invalid frequency. Must be one of {valid_frequencies}")
-
-        # Build the API URL
-        url = (
-            f"{self.base_url}/api.php/v2/gateway/{self.gwid}/energy"
-            f"?freq={frequency}&start={start_date}"
-            f"&timezone={timezone_str}&end={end_date}"
+        if self.energy_cache is None:
+            return self._fetch_energy_data(
+                start_date, end_date, frequency, timezone_str, stream
+            )
+        self._energy_url(start_date, end_date, frequency, timezone_str)
+        return self.energy_cache.get_energy_data(
+            self.gwid,
+            start_date,
+            end_date,
+            frequency,
+            timezone_str,
+            lambda start, end: self._fetch_energy_data(
+                start, end, frequency, timezone_str, stream
+            ),
         )
 
+    def _energy_get(self, url, **kwargs):
         headers = {
             "user-agent": USER_AGENT,
         }
@@ -599,20 +2015,49 @@ class SymphonyGeothermal:
         }
 
         _LOGGER.debug(f"Requesting energy data from: {url}")
+        res = self.http.get(
+            url,
+            headers=headers,
+            cookies=cookies,
+            timeout=TIMEOUT,
+            **kwargs,
+        )
+        res.raise_for_status()
+        return res
+
+    def _fetch_energy_data(
+        self, start_date, end_date, frequency, timezone_str, stream=False
+    ):
+        url = self._energy_url(start_date, end_date, frequency, timezone_str)
+        with self.instrumentation.phase("energy", self.gwid):
+            return self._download_energy_data(url, start_date, end_date, stream)
+
+    def _energy_body(self, res):
+        """Yield the chunks of a streamed energy response, counting them."""
+        for chunk in res.iter_content(ENERGY_STREAM_CHUNK):
+            self.instrumentation.count("bytes_in", len(chunk), self.gwid)
+            yield chunk
 
+    def _download_energy_data(self, url, start_date, end_date, stream):
         try:
-            res = requests.get(
-                url,
-                headers=headers,
-                cookies=cookies,
-                timeout=TIMEOUT,
-            )
-            res.raise_for_status()
+            if stream:
+                with self._energy_get(url, stream=True) as res:
+                    data = WFEnergyData.from_events(
+                        energy_events(self._energy_body(res))
+                    )
+                if not data.columns:
+                    raise WFNoDataError(
+                        f"No energy data available for {start_date} to {end_date}"
+                    )
+                _LOGGER.debug(f"Received energy data: {len(data)} records")
+                return data
+            res = self._energy_get(url)
+            self.instrumentation.count("bytes_in", len(res.content), self.gwid)
             if not res.text.strip():
                 raise WFNoDataError(
                     f"No energy data available for {start_date} to {end_date}"
                 )
-            data = res.json()
+            data = self.codec.loads(res.content)
             _LOGGER.debug(f"Received energy data: {len(data.get('index', []))} records")
             return WFEnergyData(data)
         except WFNoDataError:
@@ -627,9 +2072,137 @@ class SymphonyGeothermal:
             _LOGGER.exception(f"Error parsing energy data response: {e}")
             raise WFError(f"Invalid energy data response: {e}") from e
 
+    def iter_energy_data(
+        self, start_date, end_date, frequency="1H", timezone_str="America/New_York"
+    ):
+        """Yield energy readings for a date range as they download.
+
+        Takes the same arguments as get_energy_data. Readings come in
+        the order of the response, and the first ones can be used
+        before the rest of the body has arrived.
+
+        Raises:
+            WFCredentialError: If not logged in
+            WFNoDataError: If there is no data for the range
+            WFError: If the request fails or the response is invalid
+        """
+        url = self._energy_url(start_date, end_date, frequency, timezone_str)
+        columns = None
+        timestamps = deque()
+        rows = deque()
+        try:
+            with self._energy_get(url, stream=True) as res:
+                for key, value in energy_events(self._energy_body(res)):
+                    if key == "index":
+                        timestamps.append(value)
+                    elif key == "data":
+                        rows.append(value)
+                    elif key == "columns":
+                        columns = value
+                    while columns is not None and timestamps and rows:
+                        yield WFEnergyReading(
+                            timestamps.popleft(), rows.popleft(), columns
+                        )
+        except requests.exceptions.RequestException as e:
+            _LOGGER.exception(f"Request error getting energy data: {e}")
+            raise WFError(f"Failed to get energy data: {e}") from e
+        except ValueError as e:
+            _LOGGER.exception(f"Error parsing energy data response: {e}")
+            raise WFError(f"Invalid energy data response: {e}") from e
+        if columns is None:
+            raise WFNoDataError(
+                f"No energy data available for {start_date} to {end_date}"
+            )
+
+    def _energy_chunk(self, start_date, end_date, frequency, timezone_str, retries):
+        for attempt in range(retries + 1):
+            try:
+                return self.get_energy_data(
+                    start_date, end_date, frequency, timezone_str
+                )
+            except WFNoDataError:  # noqa: PERF203
+                return None
+            except WFError as e:
+                if attempt == retries:
+                    raise WFError(
+                        f"Failed to get energy data for {start_date} to {end_date}"
+                        f" after {retries + 1} attempts: {e}"
+                    ) from e
+                _LOGGER.warning(
+                    "Energy data for %s to %s failed, retrying", start_date, end_date
+                )
+                time.sleep(ENERGY_RETRY_DELAY * (attempt + 1))
+
+    def get_energy_data_bulk(
+        self,
+        start_date,
+        end_date,
+        frequency="1H",
+        timezone_str="America/New_York",
+        chunk_days=None,
+        max_workers=ENERGY_WORKERS,
+        retries=ENERGY_RETRIES,
+    ):
+        """Get energy data for a long date range in parallel chunks.
+
+        The range is split into chunks of ``chunk_days`` days (by default
+        from ENERGY_CHUNK_DAYS for the frequency), fetched by up to
+        ``max_workers`` threads over the pooled HTTP session. A failing
+        chunk is retried on its own ``retries`` times.
+
+        Returns:
+            WFEnergyData object with the readings of all chunks, in
+            timestamp order
+
+        Raises:
+            WFCredentialError: If not logged in
+            WFNoDataError: If no chunk has any data
+            WFError: If a chunk still fails after its retries
+        """
+        # check login and frequency before starting any threads
+        self._energy_url(start_date, end_date, frequency, timezone_str)
+        if chunk_days is None:
+            chunk_days = ENERGY_CHUNK_DAYS[frequency]
+        chunks = energy_chunks(start_date, end_date, chunk_days)
+        _LOGGER.debug("Requesting energy data in %d chunks", len(chunks))
+
+        pool = ThreadPoolExecutor(
+            max_workers=max(1, min(max_workers, len(chunks))),
+            thread_name_prefix="waterfurnace-energy",
+        )
+        try:
+            futures = [
+                pool.submit(
+                    self._energy_chunk, start, end, frequency, timezone_str, retries
+                )
+                for start, end in chunks
+            ]
+            parts = [future.result() for future in futures]
+        finally:
+            # don't start the remaining chunks if one failed
+            pool.shutdown(cancel_futures=True)
+
+        parts = [part for part in parts if part is not None]
+        if not parts:
+            raise WFNoDataError(
+                f"No energy data available for {start_date} to {end_date}"
+            )
+        return WFEnergyData.merge(parts)
+
 
 class WaterFurnace(SymphonyGeothermal):
-    def __init__(self, user, passwd, max_fails=5, device=0, location=0, sessionid=None):
+    vendor = "waterfurnace"
+
+    def __init__(
+        self,
+        user,
+        passwd,
+        max_fails=5,
+        device=0,
+        location=0,
+        sessionid=None,
+        **kwargs,
+    ):
         super().__init__(
             WF_BASE_URL,
             WF_LOGIN_URL,
@@ -640,11 +2213,23 @@ class WaterFurnace(SymphonyGeothermal):
             device,
             location,
             sessionid=sessionid,
+            **kwargs,
         )
 
 
 class GeoStar(SymphonyGeothermal):
-    def __init__(self, user, passwd, max_fails=5, device=0, location=0, sessionid=None):
+    vendor = "geostar"
+
+    def __init__(
+        self,
+        user,
+        passwd,
+        max_fails=5,
+        device=0,
+        location=0,
+        sessionid=None,
+        **kwargs,
+    ):
         super().__init__(
             GS_BASE_URL,
             GS_LOGIN_URL,
@@ -655,10 +2240,26 @@ class GeoStar(SymphonyGeothermal):
             device,
             location,
             sessionid=sessionid,
+            **kwargs,
         )
 
 
 class ActiveSettings:
+    __slots__ = (
+        "activemode",
+        "heatingsp_read",
+        "coolingsp_read",
+        "fanmode_read",
+        "temporaryoverride",
+        "permanenthold",
+        "vacationhold",
+        "onpeakhold",
+        "superboost",
+        "tstatmode",
+        "intertimeon_read",
+        "intertimeoff_read",
+    )
+
     def __init__(self, data=None):
         if data is None:
             data = {}
@@ -689,6 +2290,36 @@ class ActiveSettings:
 
 
 class WFReading:
+    # Readings are kept by the hundred thousand for history, so no
+    # per-instance __dict__.
+    __slots__ = (
+        "zone",
+        "err",
+        "awlid",
+        "tid",
+        "compressorpower",
+        "fanpower",
+        "auxpower",
+        "looppumppower",
+        "totalunitpower",
+        "modeofoperation",
+        "airflowcurrentspeed",
+        "actualcompressorspeed",
+        "tstatdehumidsetpoint",
+        "tstathumidsetpoint",
+        "tstatrelativehumidity",
+        "leavingairtemp",
+        "tstatroomtemp",
+        "enteringwatertemp",
+        "leavingwatertemp",
+        "tstatheatingsetpoint",
+        "tstatcoolingsetpoint",
+        "tstatactivesetpoint",
+        "waterflowrate",
+        "raw_humidity_offset_settings",
+        "activesettings",
+    )
+
     def __init__(self, data=None):
         if data is None:
             data = {}
@@ -740,21 +2371,57 @@ class WFReading:
 
     @property
     def mode(self):
-        return FURNACE_MODE[self.modeofoperation]
+        if self.modeofoperation is not None:
+            return FURNACE_MODE[self.modeofoperation]
+        return None
 
     def __repr__(self):
+        def fmt(value, spec):
+            return "None" if value is None else format(value, spec)
+
         return (
-            f"<FurnaceReading power={self.totalunitpower:d}, mode={self.mode}, "
+            f"<FurnaceReading power={fmt(self.totalunitpower, 'd')}, mode={self.mode}, "
             f"activemode={self.activesettings.mode}, "
-            f"looptemp={self.enteringwatertemp:.1f}, "
-            f"airtemp={self.leavingairtemp:.1f}, roomtemp={self.tstatroomtemp:.1f}, "
-            f"setpoint={self.tstatactivesetpoint:d}>"
+            f"looptemp={fmt(self.enteringwatertemp, '.1f')}, "
+            f"airtemp={fmt(self.leavingairtemp, '.1f')}, "
+            f"roomtemp={fmt(self.tstatroomtemp, '.1f')}, "
+            f"setpoint={fmt(self.tstatactivesetpoint, 'd')}>"
         )
 
 
 class WFEnergyReading:
     """Represents a single energy data reading for a specific time period."""
 
+    __slots__ = (
+        "timestamp_ms",
+        "timestamp",
+        "total_heat_1",
+        "total_heat_2",
+        "total_cool_1",
+        "total_cool_2",
+        "total_electric_heat",
+        "total_fan_only",
+        "total_loop_pump",
+        "total_dehumidification",
+        "total_power",
+        "total_records",
+        "runtime_heat_1",
+        "runtime_heat_2",
+        "runtime_cool_1",
+        "runtime_cool_2",
+        "runtime_electric_heat",
+        "runtime_fan_only",
+        "runtime_dehumidification",
+        "cool_runtime",
+        "heat_runtime",
+        "id",
+        "defrost_runtime",
+        "dehumidification_runtime",
+        "time_zone",
+        "_columns",
+        "_values",
+    )
+
     def __init__(self, timestamp_ms, values, columns):
         """Initialize energy reading.
 
@@ -802,8 +2469,15 @@ class WFEnergyReading:
         self.dehumidification_runtime = data_dict.get("dehumidification_runtime")
         self.time_zone = data_dict.get("time_zone")
 
-        # Store all raw data for any custom access
-        self._raw_data = data_dict
+        # Keep the row and the (shared) column list rather than a dict per
+        # reading, _raw_data rebuilds the mapping on demand
+        self._columns = columns
+        self._values = values
+
+    @property
+    def _raw_data(self):
+        """All raw data for any custom access, keyed by column name."""
+        return dict(zip(self._columns, self._values, strict=False))
 
     def get(self, key, default=None):
         """Get any field by column name.
@@ -821,8 +2495,85 @@ class WFEnergyReading:
         return f"<WFEnergyReading timestamp={self.timestamp}, power={self.total_power}>"
 
 
-class WFEnergyData:
-    """Container for energy data with multiple readings."""
+class _IntColumn(array):
+    """An integer energy column with missing values.
+
+    Packed as ``array("d")`` so NaN can mark the missing values; the
+    rest are read back as ints.
+    """
+
+    __slots__ = ()
+
+
+def _pack_column(values):
+    """Pack one energy column into a contiguous array.
+
+    Integer columns become ``array("q")``, or an _IntColumn if some
+    values are missing, and other numeric ones ``array("d")``, with NaN
+    standing in for missing values. Anything else (e.g. the time_zone
+    strings) is kept as a list.
+    """
+    if all(type(v) is int for v in values):
+        try:
+            return array("q", values)
+        except OverflowError:
+            pass
+    if all(v is None or type(v) in (int, float) for v in values):
+        packed = [math.nan if v is None else v for v in values]
+        if all(v is None or type(v) is int for v in values):
+            return _IntColumn("d", packed)
+        return array("d", packed)
+    return list(values)
+
+
+def _unpack_value(column, i):
+    value = column[i]
+    if value != value:  # NaN marks a missing value
+        return None
+    if type(column) is _IntColumn:
+        return int(value)
+    return value
+
+
+class _ColumnBuffer:
+    """An energy column filled value by value, packed as _pack_column does."""
+
+    __slots__ = ("values",)
+
+    def __init__(self):
+        self.values = array("q")
+
+    def append(self, value):
+        values = self.values
+        if isinstance(values, list):
+            values.append(value)
+            return
+        if type(value) is int and values.typecode == "q":
+            try:
+                values.append(value)
+                return
+            except OverflowError:
+                pass
+        if value is None or type(value) in (int, float):
+            if values.typecode == "q":
+                kind = _IntColumn if value is None or type(value) is int else array
+                self.values = values = kind("d", values)
+            elif type(value) is float and type(values) is _IntColumn:
+                self.values = values = array("d", values)
+            values.append(math.nan if value is None else value)
+            return
+        self.values = [_unpack_value(values, i) for i in range(len(values))]
+        self.values.append(value)
+
+
+class WFEnergyData(Sequence):
+    """Container for energy data with multiple readings.
+
+    The data is held column-wise, one array per column plus an array of
+    timestamps, so a year of 15min data doesn't turn into tens of
+    thousands of objects. Indexing and iteration build WFEnergyReading
+    views on demand, and sum / min / max / mean work on the columns.
+    """
 
     def __init__(self, data=None):
         """Initialize energy data from API response.
@@ -833,37 +2584,194 @@ class WFEnergyData:
         if data is None:
             data = {}
         self.columns = data.get("columns", [])
-        self.index = data.get("index", [])
-        self.data = data.get("data", [])
+        index = data.get("index", [])
+        rows = data.get("data", [])
+        count = min(len(index), len(rows))
+
+        # Timestamps in milliseconds, one per row
+        self.timestamps = _pack_column(index[:count])
+
+        width = len(self.columns)
+        padded = (
+            row if len(row) == width else (list(row[:width]) + [None] * width)[:width]
+            for row in rows[:count]
+        )
+        values = list(zip(*padded, strict=True)) if count else [()] * width
+        self._data = {
+            col: _pack_column(values[i]) for i, col in enumerate(self.columns)
+        }
+
+    @classmethod
+    def from_events(cls, events):
+        """Build energy data from ``energy_events`` without the full tree.
+
+        Rows go straight into the column buffers as they are parsed.
+        """
+        columns = None
+        buffers = None
+        pending = []
+        timestamps = _ColumnBuffer()
+        rows = 0
+
+        def add(row):
+            for i, buffer in enumerate(buffers):
+                buffer.append(row[i] if i < len(row) else None)
+
+        for key, value in events:
+            if key == "index":
+                timestamps.append(value)
+            elif key == "data":
+                rows += 1
+                if buffers is None:
+                    pending.append(value)
+                else:
+                    add(value)
+            elif key == "columns" and columns is None:
+                columns = value
+                buffers = [_ColumnBuffer() for _ in columns]
+                for row in pending:
+                    add(row)
+                pending = None
+
+        energy = cls()
+        if columns is None:
+            return energy
+        count = min(len(timestamps.values), rows)
+        del timestamps.values[count:]
+        energy.columns = columns
+        energy.timestamps = timestamps.values
+        for col, buffer in zip(columns, buffers, strict=True):
+            del buffer.values[count:]
+            energy._data[col] = buffer.values
+        return energy
+
+    @property
+    def index(self):
+        """Timestamps in milliseconds, as in the API response."""
+        return list(self.timestamps)
+
+    @property
+    def data(self):
+        """Rows of values, as in the API response."""
+        return [self._row(i) for i in range(len(self))]
+
+    @property
+    def readings(self):
+        """The readings, kept for compatibility; this is a sequence of them."""
+        return self
+
+    def _row(self, i):
+        return [_unpack_value(self._data[col], i) for col in self.columns]
 
-        # Create reading objects for easier access
-        self.readings = []
-        for i, timestamp in enumerate(self.index):
-            if i < len(self.data):
-                reading = WFEnergyReading(timestamp, self.data[i], self.columns)
-                self.readings.append(reading)
+    def column(self, name):
+        """Get the values of one column.
+
+        Returns the packed array, with NaN for missing numeric values.
+
+        Raises:
+            KeyError: If there is no such column
+        """
+        return self._data[name]
+
+    def _present(self, name):
+        column = self.column(name)
+        values = [v for v in column if v is not None and v == v]
+        if type(column) is _IntColumn:
+            return [int(v) for v in values]
+        return values
+
+    def sum(self, name):
+        """Sum of a column, ignoring missing values."""
+        return math.fsum(self._present(name))
+
+    def min(self, name):
+        """Smallest value of a column, or None if it has no values."""
+        return min(self._present(name), default=None)
+
+    def max(self, name):
+        """Largest value of a column, or None if it has no values."""
+        return max(self._present(name), default=None)
+
+    def mean(self, name):
+        """Mean of a column, or None if it has no values."""
+        values = self._present(name)
+        if not values:
+            return None
+        return math.fsum(values) / len(values)
 
-    def __iter__(self):
-        """Allow iteration over readings."""
-        return iter(self.readings)
+    def to_numpy(self, name):
+        """Get a column as a NumPy array (needs the optional numpy package)."""
+        try:
+            import numpy
+        except ImportError as e:
+            raise ImportError("WFEnergyData.to_numpy requires numpy") from e
+        return numpy.asarray(self.column(name))
+
+    @classmethod
+    def merge(cls, parts):
+        """Merge several WFEnergyData into one, in timestamp order.
+
+        Columns are the union of all the parts'. A timestamp that is in
+        more than one part (chunks overlapping at their boundaries) is
+        only kept once, with the first part's value for each column
+        that has one and the next part's for the rest.
+        """
+        columns = []
+        for part in parts:
+            columns.extend(col for col in part.columns if col not in columns)
+        rows = {}
+        for part in parts:
+            for i, timestamp in enumerate(part.timestamps):
+                values = [
+                    _unpack_value(part._data[col], i) if col in part._data else None
+                    for col in columns
+                ]
+                row = rows.setdefault(timestamp, values)
+                if row is not values and None in row:
+                    for n, value in enumerate(values):
+                        if row[n] is None:
+                            row[n] = value
+        index = sorted(rows)
+        return cls(
+            {"columns": columns, "index": index, "data": [rows[ts] for ts in index]}
+        )
 
     def __len__(self):
         """Return number of readings."""
-        return len(self.readings)
+        return len(self.timestamps)
 
     def __getitem__(self, index):
         """Allow indexed access to readings."""
-        return self.readings[index]
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("energy reading index out of range")
+        return WFEnergyReading(self.timestamps[index], self._row(index), self.columns)
 
     def __repr__(self):
-        return (
-            f"<WFEnergyData records={len(self.readings)}, columns={len(self.columns)}>"
-        )
+        return f"<WFEnergyData records={len(self)}, columns={len(self.columns)}>"
 
 
 class WFGateway:
     """Represents a Symphony gateway/device."""
 
+    __slots__ = (
+        "gwid",
+        "description",
+        "type",
+        "awltstattype",
+        "awltstattypedesc",
+        "iz2_max_zones",
+        "awlabctypedesc",
+        "awlabctype",
+        "blowertype",
+        "online",
+        "tstat_name",
+        "_raw",
+    )
+
     def __init__(self, data):
         if "gwid" not in data:
             raise ValueError("Gateway data must contain 'gwid' field")
@@ -895,6 +2803,18 @@ class WFGateway:
 class WFLocation:
     """Represents a Symphony location."""
 
+    __slots__ = (
+        "description",
+        "postal",
+        "city",
+        "state",
+        "country",
+        "latitude",
+        "longitude",
+        "gateways",
+        "_raw",
+    )
+
     def __init__(self, data):
         self.description = data.get("description", "Unknown")
         self.postal = data.get("postal")